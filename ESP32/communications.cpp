@@ -258,6 +258,14 @@ void handleSerialCommands() {
       magDrop = true;
       Serial.println("CMD: DROP mottatt");
     }
+    else if (cmd.equalsIgnoreCase("BIN")) {
+      binaryOutput = true;        // binære COBS-rammer (se send_run_binary)
+      Serial.println("CMD: BIN mottatt");
+    }
+    else if (cmd.equalsIgnoreCase("JSON")) {
+      binaryOutput = false;       // serializeJson som før
+      Serial.println("CMD: JSON mottatt");
+    }
     // legg på flere kommandoer om ønskelig
   }
 }
\ No newline at end of file
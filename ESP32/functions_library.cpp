@@ -69,6 +69,10 @@ void check_button()
 // Function for running the test
 void run_test()
 {
+  // Nullstill flagget med en gang: en START som kommer mens testen pågår
+  // (f.eks. rett etter at nyttelasten er sendt) gir en ny test etterpå
+  // i stedet for å bli slettet når testen avsluttes
+  testStart = false;
   firstRead = true; // Reset filter for accelerometer
 
   //calibrateOffset(); // Calibrate accelerometer
@@ -80,13 +84,7 @@ void run_test()
   raise_arm(); // Raise arm
   Serial.println("raise_arm() completed");
 
-  // Create Json structure
-  JsonDocument data;
-  data.clear(); // Tøm JSON-strukturen
-  data["encoder"] = JsonArray();
-  data["test_time_ms"] = JsonArray();
-  data["temp"] = JsonArray();
-  data["hum"] = JsonArray();
+  runCount = 0; // Tøm rå buffer
 
   Serial.println("Starter test...");
   tft.fillScreen(ST77XX_BLACK);
@@ -105,19 +103,19 @@ void run_test()
   Serial.println("Test while loop");
   while ((millis() - startTime) < data_collection_time)
   {
-    get_data(data);
+    get_data();
     vTaskDelay(pdMS_TO_TICKS(step_length));
   }
-  data["temp"].add(bme.readTemperature());
-  data["hum"].add(bme.readHumidity());
+  float temp = bme.readTemperature();
+  float hum = bme.readHumidity();
   
   // Data collection complete, publish to serial monitor and mqtt
   Serial.println("Data Collection Complete:");
-  serializeJson(data, Serial); // Data to serial monitor for debug
-  Serial.println();            // avslutt med newline
-  // publish_json(data);                // Publish data to MQTT
+  if (!binaryOutput || !send_run_binary(temp, hum))
+  {
+    send_run_json(temp, hum); // JSON også som reserve hvis delta ikke passer
+  }
   system_reset(); // Prepare system for new test
-  testStart = false; // Reset flag
 }
 
 double readEncoderAngle()
@@ -140,12 +138,16 @@ double readEncoderAngle()
   return angleRad;
 }
 
-// Takes measurement, stores data in Json
-void get_data(JsonDocument &data)
+// Takes measurement, stores raw pulses and timestamp
+void get_data()
 {
-  // Get angle data and add to JSON
-  double angle = readEncoderAngle();
-  data["encoder"].add(angle);
+  if (runCount >= MAX_SAMPLES)
+  {
+    return; // Buffer full, ignorer resten
+  }
+  // Update totalPulses (angle is computed when the run is sent)
+  readEncoderAngle();
+  runPulses[runCount] = totalPulses;
 
   // Read accelerometer, nofilter
   //sensors_event_t accel, gyro, temp;
@@ -154,9 +156,134 @@ void get_data(JsonDocument &data)
   // Offset from calibration 
   //float relZ = accel.acceleration.z - offsetZ;
 
-  // Add data to Json
- // data["accelerometer"].add(relZ);
-  data["test_time_ms"].add(millis() - startTime); // Add timestamp
+  // Add timestamp
+  runTimes[runCount] = millis() - startTime;
+  runCount++;
+}
+
+// Send run as JSON, same format as before: angle = totalPulses / CPR * 360
+void send_run_json(float temp, float hum)
+{
+  JsonDocument data;
+  JsonArray encoder = data["encoder"].to<JsonArray>();
+  JsonArray time_ms = data["test_time_ms"].to<JsonArray>();
+  for (uint16_t i = 0; i < runCount; i++)
+  {
+    encoder.add(((double)runPulses[i] / (double)CPR) * 360);
+    time_ms.add(runTimes[i]);
+  }
+  data["temp"].add(temp);
+  data["hum"].add(hum);
+
+  serializeJson(data, Serial); // Data to serial monitor for debug
+  Serial.println();            // avslutt med newline
+  // publish_json(data);                // Publish data to MQTT
+}
+
+/* ---------------- Binær ramme (se pendel/binframe.py) ----------------
+   0x00 | COBS(nyttelast + CRC16) | 0x00, little-endian nyttelast:
+   u8 versjon, u16 CPR, u16 n, i32 p0, u32 t0, f32 temp, f32 hum,
+   i16 dp[n], u16 dt[n]  (delta mot forrige sample, første = 0)
+   ------------------------------------------------------------------- */
+
+// CRC-16/CCITT-FALSE (poly 0x1021, start 0xFFFF)
+static uint16_t crc16_update(uint16_t crc, const uint8_t *data, size_t len)
+{
+  for (size_t i = 0; i < len; i++)
+  {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++)
+    {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+// COBS-koder som skriver blokkvis rett til Serial (maks 254 byte per blokk)
+struct CobsWriter
+{
+  uint8_t block[255];
+  uint8_t n = 1;
+  uint16_t crc = 0xFFFF;
+
+  void put(uint8_t b)
+  {
+    if (b == 0)
+    {
+      flush();
+      return;
+    }
+    block[n++] = b;
+    if (n == 255)
+    {
+      flush(); // Full blokk, ingen 0 underforstått
+    }
+  }
+
+  void flush()
+  {
+    block[0] = n;
+    Serial.write(block, n);
+    n = 1;
+  }
+
+  // Little-endian felt, med CRC
+  void field(const void *p, size_t len)
+  {
+    const uint8_t *bytes = (const uint8_t *)p;
+    crc = crc16_update(crc, bytes, len);
+    for (size_t i = 0; i < len; i++)
+    {
+      put(bytes[i]);
+    }
+  }
+};
+
+bool send_run_binary(float temp, float hum)
+{
+  // Alle deltaer må passe i i16/u16, ellers sendes JSON
+  for (uint16_t i = 1; i < runCount; i++)
+  {
+    int32_t dp = runPulses[i] - runPulses[i - 1];
+    uint32_t dt = runTimes[i] - runTimes[i - 1];
+    if (dp < INT16_MIN || dp > INT16_MAX || dt > UINT16_MAX)
+    {
+      return false;
+    }
+  }
+
+  CobsWriter w;
+  uint8_t version = BIN_FORMAT_VERSION;
+  uint16_t cpr = (uint16_t)CPR;
+  uint16_t n = runCount;
+  int32_t p0 = runCount ? runPulses[0] : 0;
+  uint32_t t0 = runCount ? runTimes[0] : 0;
+
+  Serial.write((uint8_t)0x00); // Rammestart
+  w.field(&version, 1);
+  w.field(&cpr, 2);
+  w.field(&n, 2);
+  w.field(&p0, 4);
+  w.field(&t0, 4);
+  w.field(&temp, 4);
+  w.field(&hum, 4);
+  for (uint16_t i = 0; i < runCount; i++)
+  {
+    int16_t dp = i ? (int16_t)(runPulses[i] - runPulses[i - 1]) : 0;
+    w.field(&dp, 2);
+  }
+  for (uint16_t i = 0; i < runCount; i++)
+  {
+    uint16_t dt = i ? (uint16_t)(runTimes[i] - runTimes[i - 1]) : 0;
+    w.field(&dt, 2);
+  }
+  uint16_t crc = w.crc;
+  w.put(crc & 0xFF); // CRC selv er ikke med i CRC
+  w.put(crc >> 8);
+  w.flush();
+  Serial.write((uint8_t)0x00); // Rammeslutt
+  return true;
 }
 
 // Function to control the process after a test
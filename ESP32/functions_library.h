@@ -19,8 +19,14 @@ void run_test();
 // Data from encoder
 double readEncoderAngle();
 
-// Fetch measurement data and store it in a JSON object
-void get_data(JsonDocument &data);
+// Fetch measurement data and store raw pulses/time in runPulses/runTimes
+void get_data();
+
+// Send collected run as JSON (serializeJson)
+void send_run_json(float temp, float hum);
+
+// Send collected run as binary COBS frame, false if deltas do not fit
+bool send_run_binary(float temp, float hum);
 
 // Reset the system after a test
 void system_reset();
@@ -44,6 +44,12 @@ const long CPR = 2048;  // juster etter din encoder
 long totalPulses = 0;
 double angleRad = 0;
 
+// Rå måledata for én test, sendes som binær ramme eller JSON etter testen
+int32_t runPulses[MAX_SAMPLES];
+uint32_t runTimes[MAX_SAMPLES];
+uint16_t runCount = 0;
+volatile bool binaryOutput = true;              // Velges med seriekommando BIN / JSON
+
 // global_declarations.h
 
 SemaphoreHandle_t extSenseSem = nullptr;
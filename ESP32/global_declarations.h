@@ -42,6 +42,12 @@
 // Debounce‑filter i µs (ignorer pulser kortere enn dette)
 #define PCNT_FILTER_US   (100)
 
+// Maks antall samples per test (rå buffer for binær/JSON-utsending)
+#define MAX_SAMPLES      (8192)
+
+// Binær ramme: formatversjon (må matche pendel/binframe.py)
+#define BIN_FORMAT_VERSION (1)
+
 
 
 // ------------------ STRUCT FOR PINS ------------------
@@ -85,6 +91,12 @@ extern const long CPR;
 extern long totalPulses;
 extern double angleRad;
 
+// Rå måledata for én test
+extern int32_t runPulses[MAX_SAMPLES];
+extern uint32_t runTimes[MAX_SAMPLES];
+extern uint16_t runCount;
+extern volatile bool binaryOutput;              // true: binær ramme, false: JSON
+
 // Semaforlogikk
 extern SemaphoreHandle_t extSenseSem;
 extern SemaphoreHandle_t retSenseSem;
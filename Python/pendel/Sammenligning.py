@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+import matplotlib.pyplot as plt
+from collections import defaultdict
+import numpy as np
+
+from .batch_analyse import run_batch, load_results, RESULTS_NAME, _sort_key
+
+
+def plot_comparison(data):
+    """data: liste av (ringnummer, runde, Δθ [°])"""
+
+    # -------------------------------------------------
+    # 2) Lag kompakt x-akse uten hull (1, 2, 3 …)
+    # -------------------------------------------------
+    rings_sorted = sorted({r for r, _, _ in data}, key=lambda r: _sort_key(str(r)))
+    x_map = {ring: idx + 1 for idx, ring in enumerate(rings_sorted)}
+
+    # -------------------------------------------------
+    # 3) Forbered x-, y- og etikettlister
+    # -------------------------------------------------
+    x_vals, y_vals, labels = [], [], []
+    ring_groups: defaultdict[int, list[float]] = defaultdict(list)
+
+    for ring, rnd, dtheta in data:
+        x_vals.append(x_map[ring])
+        y_vals.append(dtheta)
+        labels.append(str(rnd))
+        ring_groups[ring].append(dtheta)
+
+
+    # -------------------------------------------------
+    # 4) Gjennomsnitt per ring med NumPy
+    # -------------------------------------------------
+    avg_x = [x_map[ring] for ring in ring_groups]
+    avg_y = [np.mean(vals) for vals in ring_groups.values()]
+
+
+    # -------------------------------------------------
+    # 5) Plot
+    # -------------------------------------------------
+    fig, ax = plt.subplots(figsize=(10, 5))
+
+    # Enkeltmålinger
+    ax.scatter(x_vals, y_vals, color="#1f77b4", marker="o",
+               label="Enkeltmålinger")
+
+    # Gjennomsnitt
+    ax.scatter(
+        avg_x,
+        avg_y,
+        color="#cc6666",   # lys/«svak» rødfarge
+        marker="x",
+        s=50,              # størrelsen på krysset (↓ fra 80)
+        linewidths=1.5,    # litt tynnere streker
+        alpha=0.85,        # ørlite gjennomsiktighet
+        zorder=3,
+        label="Gjennomsnitt",
+    )
+
+    # Runde-numrene
+    for x_pt, y_pt, txt in zip(x_vals, y_vals, labels):
+        ax.annotate(txt, (x_pt, y_pt),
+                    textcoords="offset points", xytext=(4, -6),
+                    fontsize=8)
+
+    ax.set_xlabel("Ringnummer")
+    ax.set_ylabel(r"$\Delta \theta$ [°]")
+    ax.set_title("Visualisering av resultater – utslagsvinkel")
+    ax.set_xticks(list(x_map.values()))
+    ax.set_xticklabels([str(r) for r in rings_sorted])
+    ax.legend(loc="upper right")
+    ax.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+# -------------------------------------------------
+# 1) Data  (ringnummer, runde, Δθ [°]) fra batch-analysen
+#    python -m pendel.Sammenligning ring_results.csv  – les ferdig tabell
+#    python -m pendel.Sammenligning data/             – analyser alle ringer først
+# -------------------------------------------------
+def from_database(**filters) -> list[tuple]:
+    """
+    Siste η̄ per (ring, runde) fra resultatdatabasen (resultdb). Uten
+    `trough` brukes analysens gjeldende bunnpunktmetode, så rå og
+    resamplede η̄ ikke blandes.
+    """
+    from .resultdb import ResultsDB
+    if filters.get("trough") is None:
+        from .analyser_ring import enable_raw_troughs
+        filters["trough"] = "raw" if enable_raw_troughs else "resampled"
+    with ResultsDB() as db:
+        rows = db.latest(**filters)
+    return [(r["ring"], r["round"], r["eta_mean"])
+            for r in rows if r["eta_mean"] is not None]
+
+
+def main(source: str | None = None, *, from_db: bool = False, **filters) -> None:
+    """
+    Sammenlign ringer fra en resultattabell, en rotmappe (analyseres
+    først) eller – med from_db – resultatdatabasen, filtrert på f.eks.
+    block_size / tol / range_tol.
+    """
+    if from_db:
+        plot_comparison(from_database(**filters))
+        plt.show()
+        return
+    source = Path(source or RESULTS_NAME)
+    results = run_batch(source) if source.is_dir() else load_results(source)
+
+    for _, row in results[results["error"] != ""].iterrows():
+        print(f"⚠️  Hopper over {row['directory']}: {row['error']}")
+    results = results[results["error"] == ""].sort_values(["ring", "round"])
+
+    plot_comparison(list(zip(results["ring"], results["round"],
+                             results["eta_mean"])))
+    plt.show()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
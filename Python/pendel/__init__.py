@@ -0,0 +1,7 @@
+"""
+Pendelrigg – datainnsamling fra ESP32 og analyse av første utslag.
+
+Kommandolinje: se pendel.cli (pendel acquire | analyze | compare).
+"""
+
+__version__ = "0.1.0"
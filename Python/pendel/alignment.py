@@ -0,0 +1,352 @@
+"""
+Fasejustering og resampling av alle runs i én operasjon.
+
+Erstatter løkkene i `process_dataset` (én listekomprehensjon for minima
+og én `np.interp` per run) med:
+
+1) begynnelsen av alle runs pakkes i en polstret 2-D matrise, og første
+   lokale minimum finnes for alle rader i ett vektorisert pass
+   (vinduet utvides bare for rader uten treff)
+2) tidsforskyvningen for alle runs beregnes samlet
+3) alle runs resamples til `t_new` rett inn i én ferdig matrise. Runs
+   som har identisk (forskjøvet) tidsmønster deler interpolasjons-
+   indekser og -vekter og interpoleres som én blokk.
+
+Resultatet er bit-identisk med den gamle løkka: samme formel som
+`np.interp` (slope * (x - xp[j]) + fp[j], randverdier utenfor).
+
+Trenger man bare første bunnpunkt (η), gir `first_troughs` verdien rett
+fra rå samples med parabolsk sub-sample-justering, uten resampling.
+"""
+
+import numpy as np
+
+from . import profiling
+
+# -----------------------------  PARAMETRE  -----------------------------
+MINIMA_WINDOW = 256     # første søkevindu (samples) for første minimum
+MIN_SHARED    = 4       # minste gruppe som bruker felles vekter
+TURN_WINDOW   = 64      # fremoversøk (samples) forbi første minimum
+# -----------------------------------------------------------------------
+
+
+# =======================================================================
+#  PAKKING  --------------------------------------------------------------
+# =======================================================================
+def pad_runs(arrays, fill: float = np.nan, *, start: int = 0,
+             stop: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pakk kolonnene [start, stop) av en liste 1-D arrays i en polstret
+    (n_runs, bredde)-matrise. Uten `stop` pakkes hele lengden.
+
+    Returns
+    -------
+    padded  : np.ndarray (float64), fylt med `fill` etter hver runs slutt
+    lengths : np.ndarray (int64), full lengde per run
+    """
+    lengths = np.fromiter((a.size for a in arrays), np.int64, len(arrays))
+    if stop is None:
+        stop = int(lengths.max()) if lengths.size else 0
+    width = max(stop - start, 0)
+
+    padded = np.full((len(arrays), width), fill, float)
+    for r, a in enumerate(arrays):
+        part = a[start:stop]
+        padded[r, :part.size] = part
+    return padded, lengths
+
+
+# =======================================================================
+#  FØRSTE MINIMUM  -------------------------------------------------------
+# =======================================================================
+def first_minima(enc_list, *, window: int = MINIMA_WINDOW) -> np.ndarray:
+    """
+    Indeks til første lokale minimum i hvert run (0 hvis ingen).
+
+    Samme kriterium som før: diff[j] < 0 og diff[j+1] >= 0 → indeks j+1.
+    NaN-polstring gir False i begge sammenligningene, så ingen treff
+    havner utenfor runnets lengde.
+
+    Første bunnpunkt ligger nesten alltid tidlig i serien, så søket
+    starter i de første `window` samplene og dobler vinduet bare for
+    radene som ikke har fått treff ennå.
+    """
+    n = len(enc_list)
+    idx = np.zeros(n, np.int64)
+    todo = np.arange(n)
+    width = max((e.size for e in enc_list), default=0)
+    start, stop = 0, min(window, width)
+
+    while todo.size and width >= 3:
+        block, _ = pad_runs([enc_list[r] for r in todo], start=start, stop=stop)
+        d = np.diff(block, axis=1)
+        minima = (d[:, :-1] < 0) & (d[:, 1:] >= 0)
+        hit = minima.any(axis=1)
+        idx[todo[hit]] = minima[hit].argmax(axis=1) + 1 + start
+        todo = todo[~hit]
+        if stop >= width:
+            break
+        start, stop = stop - 2, min(2 * stop, width)      # 2 kolonners overlapp
+    return idx
+
+
+def first_trough(enc: np.ndarray) -> tuple[int, float]:
+    """(indeks, |verdi|) for første lokale minimum i ett rått run."""
+    idx = int(first_minima([enc])[0])
+    return idx, (float(abs(enc[idx])) if enc.size else np.nan)
+
+
+# =======================================================================
+#  BUNNPUNKT PÅ RÅDATA  --------------------------------------------------
+# =======================================================================
+def first_turning(enc_list, start=None, *,
+                  window: int = TURN_WINDOW) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Første reelle bunnpunkt per run på rå samples, platåbevisst.
+
+    `first_minima` slår også til på kvantiseringsplatåer midt i et fall
+    (…, -25.5, -26.5, -26.5, -27.4, …). Her kreves det at første diff
+    ≠ 0 etter platået er positiv. Søket starter i `start` (standard:
+    `first_minima`, som aldri ligger etter det reelle bunnpunktet) og ser
+    `window` samples fremover; vinduet dobles for rader uten avklaring.
+
+    Returns
+    -------
+    idx : np.ndarray (int64)
+        Første sample i bunnplatået (0 hvis ingen minima).
+    end : np.ndarray (int64)
+        Siste sample i bunnplatået (== idx uten platå).
+    """
+    if start is None:
+        start = first_minima(enc_list)
+    idx = np.array(start, np.int64)
+    end = idx.copy()
+    lo = np.maximum(idx - 1, 0)
+    sizes = np.fromiter((e.size for e in enc_list), np.int64, len(enc_list))
+    todo = np.flatnonzero(idx > 0)
+
+    while todo.size:
+        block, _ = pad_runs([enc_list[r][lo[r]:lo[r] + window] for r in todo])
+        d = np.diff(block, axis=1)
+        sign = np.sign(d)                                  # NaN etter slutt
+        cols = np.arange(d.shape[1])
+        pos = np.where(sign != 0, cols, d.shape[1])        # NaN stopper også
+        nxt_pos = np.minimum.accumulate(pos[:, ::-1], axis=1)[:, ::-1]
+        nxt = np.take_along_axis(
+            np.hstack([sign, np.full((len(todo), 1), np.nan)]), nxt_pos, axis=1)
+
+        falling = d[:, :-1] < 0
+        turn = falling & (nxt[:, 1:] > 0)
+        hit = turn.any(axis=1)
+        j = turn.argmax(axis=1)
+        rows = todo[hit]
+        idx[rows] = lo[rows] + j[hit] + 1
+        end[rows] = lo[rows] + nxt_pos[hit, j[hit] + 1]
+
+        # uavklart: platå som går ut av vinduet; ellers fortsett med overlapp
+        open_ = falling & np.isnan(nxt[:, 1:])
+        has_open = open_.any(axis=1)
+        nxt_lo = np.where(has_open, lo[todo] + open_.argmax(axis=1),
+                          lo[todo] + max(block.shape[1] - 2, 1))
+        more = ~hit & (lo[todo] + window < sizes[todo])
+        lo[todo[more]] = nxt_lo[more]
+        todo = todo[more]                   # resten beholder `start`
+        window *= 2
+    return idx, end
+
+
+def refine_minima(enc_list, t_list, idx, end=None) -> np.ndarray:
+    """
+    Bunnverdi med parabolsk sub-sample-interpolasjon rundt bunnplatået.
+
+    En parabel legges gjennom (t, enc) i sample idx-1, platåets midtpunkt
+    (idx…end, samme verdi) og end+1 – ujevn tidsavstand tillates – og
+    toppunktets verdi brukes når det ligger mellom ytterpunktene. Ellers
+    (rand, like tidsstempler eller ikke-konveks parabel) brukes rå
+    sampleverdi.
+
+    Returns
+    -------
+    np.ndarray (float64), fortegnsbevart bunnverdi per run (NaN for tomme)
+    """
+    if end is None:
+        end = idx
+    n = len(enc_list)
+    y = np.full((n, 3), np.nan)
+    t = np.zeros((n, 3))
+    for r, (e, tt, i, k) in enumerate(zip(enc_list, t_list, idx, end)):
+        if 0 < i and k < e.size - 1:
+            y[r] = e[i - 1], e[i], e[k + 1]
+            t[r] = tt[i - 1], 0.5 * (tt[i] + tt[k]), tt[k + 1]
+        elif e.size:
+            y[r, 1] = e[min(i, e.size - 1)]
+
+    h0 = t[:, 0] - t[:, 1]                     # < 0
+    h2 = t[:, 2] - t[:, 1]                     # > 0
+    ok = np.isfinite(y).all(axis=1) & (h0 < 0) & (h2 > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        s0 = (y[:, 0] - y[:, 1]) / h0
+        s2 = (y[:, 2] - y[:, 1]) / h2
+        a = (s2 - s0) / (h2 - h0)
+        b = s2 - a * h2
+        x = -b / (2 * a)
+        ok &= (a > 0) & (x >= h0) & (x <= h2)
+        vertex = y[:, 1] - b * b / (4 * a)
+    return np.where(ok, vertex, y[:, 1])
+
+
+def first_troughs(enc_list, t_list, min_idx=None) -> np.ndarray:
+    """
+    |Første bunnpunkt| per run direkte på rå samples – uten resampling.
+
+    `min_idx` (f.eks. fra runcache) brukes som startpunkt for søket.
+    """
+    idx, end = first_turning(enc_list, min_idx)
+    return np.abs(refine_minima(enc_list, t_list, idx, end))
+
+
+# =======================================================================
+#  INTERPOLASJON  --------------------------------------------------------
+# =======================================================================
+def interp_weights(x: np.ndarray, xp: np.ndarray):
+    """
+    Forhåndsberegn indekser og vekter for `np.interp(x, xp, ·)`.
+
+    Returns
+    -------
+    j, num, den, left, right
+        Verdien blir (fp[j+1] - fp[j]) / den * num + fp[j] – samme
+        formel og rekkefølge som np.interp – med fp[0] der `left` og
+        fp[-1] der `right`.
+    """
+    j = np.searchsorted(xp, x, side="right") - 1           # xp[j] <= x
+    left  = j < 0
+    right = j >= xp.size - 1
+    j = np.clip(j, 0, max(xp.size - 2, 0))
+    j1 = np.minimum(j + 1, xp.size - 1)
+    num = x - xp[j]
+    den = xp[j1] - xp[j]
+    return j, num, den, left, right
+
+
+def _group_patterns(t_list, shift: np.ndarray) -> list[np.ndarray]:
+    """
+    Grupper runs med identisk forskjøvet tidsmønster (t + shift).
+
+    Et billig fingeravtrykk (lengde, første og siste forskjøvne tid)
+    plukker ut kandidatene; bare de som deler fingeravtrykk hashes fullt.
+
+    Returns
+    -------
+    Liste med radindekser per gruppe, én gruppe per unike mønster.
+    """
+    n = len(t_list)
+    lengths = np.fromiter((t.size for t in t_list), np.int64, n)
+    t_first = np.fromiter((t[0] for t in t_list), float, n) + shift
+    t_last  = np.fromiter((t[-1] for t in t_list), float, n) + shift
+    _, fp_inv = np.unique(np.stack([lengths, t_first, t_last], axis=1),
+                          axis=0, return_inverse=True)
+    fp_inv = fp_inv.reshape(-1)
+
+    counts = np.bincount(fp_inv)
+    groups = [np.array([r]) for r in np.flatnonzero(counts[fp_inv] == 1)]
+
+    seen: dict[tuple, list[int]] = {}
+    for r in np.flatnonzero(counts[fp_inv] > 1):
+        key = (fp_inv[r], shift[r], t_list[r].tobytes())
+        seen.setdefault(key, []).append(r)
+    groups.extend(np.asarray(g) for g in seen.values())
+    return groups
+
+
+def interp_runs(x: np.ndarray, t_list, shift: np.ndarray,
+                enc_list) -> np.ndarray:
+    """
+    `np.interp(x, t + shift, enc)` for alle runs, skrevet rett inn i én
+    (n_runs, x.size)-matrise.
+
+    Grupper med minst MIN_SHARED runs som deler tidsmønster beregner
+    indekser og vekter én gang og interpoleres som én blokk. Resten går
+    direkte til np.interp – søket der er allerede én C-løkke, og en ren
+    numpy-versjon er målt tregere når ingenting kan gjenbrukes.
+    """
+    out = np.empty((len(enc_list), x.size))
+
+    for rows in _group_patterns(t_list, shift):
+        r0 = rows[0]
+        xp = t_list[r0] + shift[r0]
+        if rows.size < MIN_SHARED:
+            for r in rows:
+                out[r] = np.interp(x, t_list[r] + shift[r], enc_list[r])
+            continue
+
+        j, num, den, left, right = interp_weights(x, xp)
+        fp = np.array([enc_list[r] for r in rows], float)     # (g, n_s)
+        fp0 = fp.take(j, axis=1)
+        blk = fp.take(np.minimum(j + 1, xp.size - 1), axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            blk -= fp0
+            blk /= den
+            blk *= num
+            blk += fp0
+        blk[:, left]  = fp[:, :1]
+        blk[:, right] = fp[:, -1:]
+        out[rows] = blk
+    return out
+
+
+# =======================================================================
+#  HELE PIPELINEN  -------------------------------------------------------
+# =======================================================================
+def align_and_resample(enc_list, t_list, idx: np.ndarray | None = None):
+    """
+    Fasejuster alle runs på første minimum og resample til felles akse.
+
+    `idx` er indeksen til første minimum per run; den beregnes her hvis
+    den ikke er gitt (f.eks. fra runcache).
+
+    Tidsaksen `t_new` bygges fra første run (samme regel som før):
+    dt = middel tidssteg, fra min til max av forskjøvet tid.
+
+    Returns
+    -------
+    t_new   : np.ndarray
+    all_enc : np.ndarray (n_runs, t_new.size)
+    """
+    with profiling.span("align", runs=len(enc_list)):
+        if idx is None:
+            idx = first_minima(enc_list)
+        t_new, t_ref = reference_axis(t_list[0], idx[0])
+    with profiling.span("resample", runs=len(enc_list)):
+        return t_new, resample_runs(t_new, t_ref, enc_list, t_list, idx)
+
+
+def reference_axis(t0: np.ndarray, i0: int) -> tuple[np.ndarray, float]:
+    """
+    Felles tidsakse fra første run (t0, første minimum i0).
+
+    Returns
+    -------
+    t_new : np.ndarray
+    t_ref : float
+        Tiden ved første minimum i første run; alle runs forskyves slik
+        at sitt første minimum havner her.
+    """
+    t_ref = t0[i0]
+    st0 = t0 + (t_ref - t0[i0])
+    dt = np.mean(np.diff(st0))
+    return np.arange(min(st0), max(st0), dt), t_ref
+
+
+def resample_runs(t_new: np.ndarray, t_ref: float, enc_list, t_list,
+                  idx: np.ndarray) -> np.ndarray:
+    """
+    Fasejuster runs mot `t_ref` og resample til `t_new`, (n_runs, t_new.size).
+
+    Gir de samme radene som `align_and_resample` uansett hvordan runs
+    deles opp, så en serie kan resamples bit for bit (se stream_dataset).
+    """
+    t_at_min = np.fromiter((t[i] for t, i in zip(t_list, idx)), float,
+                           len(t_list))
+    shift = t_ref - t_at_min                             # ref_t0 - t[i]
+    return interp_runs(t_new, t_list, shift, enc_list)
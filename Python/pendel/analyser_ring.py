@@ -0,0 +1,821 @@
+import os
+import sys
+from pathlib import Path 
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.lines as mlines
+import matplotlib.gridspec as gridspec
+from matplotlib.collections import LineCollection
+import pandas as pd
+
+from .runcache import load_dataset, load_troughs as _cached_troughs
+from .alignment import align_and_resample
+from .block_stats import block_stats, BlockStats
+from . import profiling
+from . import spectral
+from .extrema import (find_extrema, bounce_angles, log_decrement, energy_loss,
+                      N_BOUNCES)
+
+
+# -----------------------------  PARAMETRE  -----------------------------
+COM_PORT  = "COM13"
+BAUDRATE  = 115200
+
+# -------------------------------
+# Aktiveringsvariabler
+# ------------------------------
+
+x_res = 15 # Oppløsning på x-akse for utslagsvinkel plot
+
+enable_avgstd = False # Plot med standardavvik og gjennomsnitt
+enable_vinkelutslag = False # Plot vinkelutslag med filtrering og median
+enable_vinkelutslag_enkel = False # Plot vinkelutslag uten filtrering og median
+enable_3_vinkelutslag = False # Plot med vinkelutslag for 3 sprett
+enable_all_series = False # Plot av alle måleserier over hverandre
+
+enable_angle_diff = False # Plot som differensierer sprettberegninger for forskjellige målinger
+interval_size = 15  # antall runs per gruppe
+
+# ---- Beregner gjennomsnitt for 1 sprett av hver ring med parameter som angir n-tester ---
+enable_avg_calc = False # Enable
+avg_tol = 0.25 # Feiltoleranse for avik i vinkelutslag
+DEFAULT_BLOCK_SIZE = 15   # Antall tester per rotasjon
+DEFAULT_TOL        = 0.3  # Toleranse for avvik i grader fra blokkvis snitt basert på typetall
+
+
+enable_vinkelutslag_enkel = True      # ← slå av/på plottet
+tick_size = 15                        # ← x-akse-tick-tetthet (15 er std)
+enable_cache = True                   # ← mellomlagre parsede runs (runcache)
+enable_raw_troughs = True             # ← bunnpunkt fra rå samples (ingen resampling)
+enable_compact_runs = False           # ← runs som pulstall/ms-delta i minnet (¼ minne, tregere)
+enable_results_db = True              # ← lagre hver analyse i resultatdatabasen (resultdb)
+enable_spectral = False               # ← periode og dempning per run/blokk (krever resampling)
+enable_env_model = True               # ← temperatur-/fuktighetskorrigert η̄ (miljo)
+enable_bootstrap = True               # ← konfidensintervall for η̄ og range (bootstrap)
+all_series_max_points = 2_000_000     # ← maks punkter i «alle måleserier» (tynnes ut)
+# --------------------------------------------------------------------
+
+
+# =======================================================================
+#  HJELPEFUNKSJONER  -----------------------------------------------------
+# =======================================================================
+
+
+# ------------------------------------------------------------------
+# 1) Fargegenerator -------------------------------------------------
+# ------------------------------------------------------------------
+def make_run_colours(n_runs: int,
+                     excluded_runs: set[int] | list[int] = (),
+                     *,
+                     cmap_name: str = "RdYlGn") -> list:
+    """
+    Returnerer en fargeliste med lengde n_runs.
+    Utkastede run (1-basert i excluded_runs) får grå farge ("0.5").
+
+    Eksempel
+    --------
+    colours = make_run_colours(len(trough_vals), excluded_runs)
+    """
+    cmap = plt.get_cmap(cmap_name)
+    base = [cmap(i / (n_runs - 1)) for i in range(n_runs)]
+    excluded = set(excluded_runs)
+    return ["0.5" if (i + 1) in excluded else base[i]
+            for i in range(n_runs)]
+
+
+
+
+
+
+# -------------------------------------------------------
+#  Variasjons­kontroll for indre variasjoner i ring
+# -------------------------------------------------------
+def check_block_variation(means, *,
+                          range_tol=None):
+    """Returnerer (bestått: bool, beregnet_mål: float)"""
+    means = np.array(means, float)
+
+    if range_tol is not None:                         
+        rng = means.max() - means.min()
+        return rng <= range_tol, rng
+
+    raise ValueError("Spesifiser nøyaktig én toleranse‐type")
+
+
+
+
+
+
+
+# ------------------------------------------------------------
+#  Visualisering av analyse. Plot og forskjellige parameter
+# ------------------------------------------------------------
+def _summary_lines(temps, hums, n_excluded, excl_pct, *,
+                   overall_mean, range_metric, range_tol,
+                   intervals=None) -> list[str]:
+    """Tekstpanelet under scatter-plottet (+ KI med bootstrap.Intervals)."""
+    avg_temp = np.nanmean(temps) if np.isfinite(temps).any() else np.nan
+    avg_hum  = np.nanmean(hums)  if np.isfinite(hums).any()  else np.nan
+
+    # Beregn temperatur‑variasjon og vurder status
+    temp_range = np.nanmax(temps) - np.nanmin(temps) if np.isfinite(temps).any() else np.nan
+    TEMP_TOL = 1.0  # ↔ ±0,5 °C
+    delta_t_status = "✅ Temperatur OK" if temp_range <= TEMP_TOL else "❌ Temperatur FOR STORE VARIASJONER"
+
+    # ---------- status på ekskluderte -------------------
+    excl_fail_threshold = 15.0       # grense i prosent
+    excl_status = "TEST UGYLDIG - for stor spredning i alle målinger" if excl_pct > excl_fail_threshold else "Spredning OK"
+    # -----------------------------------------------------
+
+    ci = intervals
+    return [
+     f"Gjennomsnittlig Δθ: {overall_mean:.3f}°"
+    + (f"  ({ci.level:.0%}-KI {ci.eta_lo:.3f}–{ci.eta_hi:.3f}°)" if ci else ""),
+    f"Indre spredning i ring: {range_metric:.3f}° ≤ {range_tol:.3f}°  →  "
+    + ("✅ OK" if range_metric <= range_tol else "❌ FAIL - store indre variasjoner"),
+    *([f"   KI {ci.range_lo:.3f}–{ci.range_hi:.3f}°, uten blokkeffekt "
+       f"≤ {ci.range_null:.3f}° (p = {ci.range_p:.3f})"] if ci else []),
+    f"Ekskluderte målinger: {n_excluded} "
+    f"({excl_pct:.1f} %)  →  {excl_status}",    # Feil hvis for stor spredning
+    f"Middel­temperatur: {avg_temp:.1f} °C",
+    f"Middel RH:         {avg_hum:.1f} %",
+    f"Temp‑variasjon ΔT: {temp_range:.2f} °C  →  {delta_t_status}",
+    ]
+
+
+class TestResultsFigure:
+    """
+    Figurmal for testresultatet: scatter (øverst) + tekstpanel (nederst).
+
+    Figur, akser, legender og alle kunstnere lages én gang; `update()`
+    bytter bare ut dataene. Samme mal kan dermed tegne ring etter ring
+    (f.eks. i en arbeidsprosess) uten å bygge GridSpec-oppsettet på nytt.
+
+    headless=True lager figuren uten pyplot (ren Agg-canvas), så den kan
+    lagres til fil uten vindu og uten å blokkere.
+    """
+
+    def __init__(self, *, tick_size: int = 15, cmap_name: str = "RdYlGn",
+                 headless: bool = False):
+        self.tick_size = tick_size
+        self.cmap_name = cmap_name
+        cmap = plt.get_cmap(cmap_name)
+
+        # ------------------ figuroppsett -------------------
+        if headless:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.fig = Figure(figsize=(7, 6))
+            FigureCanvasAgg(self.fig)
+        else:
+            self.fig = plt.figure(figsize=(7, 6))
+        gs  = gridspec.GridSpec(2, 1, height_ratios=[3, 1.3],
+                                hspace=0.35, figure=self.fig)
+
+        self.ax = ax = self.fig.add_subplot(gs[0])     # scatter
+        self.ax_txt  = self.fig.add_subplot(gs[1])     # tekstpanel
+        self.ax_txt.axis("off")
+
+        # --------------- scatter-plott ---------------------
+        self.scatter = ax.scatter([], [], zorder=3)
+        ax.set_xlabel("Test #")
+        ax.set_ylabel("Vinkel [°]")
+        ax.grid(True, zorder=0)
+
+        # --------------- blokk-vise senterlinjer -----------
+        self.centers = LineCollection([], colors="black", linestyles="--",
+                                      linewidth=1, zorder=2)
+        ax.add_collection(self.centers)
+
+        # --------------- sekundær akse (temp / RH) ---------
+        self.ax2 = ax2 = ax.twinx()
+        ax2.set_ylabel("Temp [°C] / RH [%]")
+        ax2.tick_params(axis="y", colors="black")
+        ax2.spines["right"].set_color("black")
+        self.hum_line,  = ax2.plot([], [], "k--", linewidth=1.2,
+                                   label="Relativ fukt (%)")
+        self.temp_line, = ax2.plot([], [], "b--", linewidth=1.2,
+                                   label="Temperatur (°C)")
+
+        # --------------- legende ---------------------------
+        red_dot   = mlines.Line2D([], [], color=cmap(0.0), marker="o",
+                                  linestyle="None", label="Første test")
+        green_dot = mlines.Line2D([], [], color=cmap(1.0), marker="o",
+                                  linestyle="None", label="Siste test")
+        grey_dot  = mlines.Line2D([], [], color="0.5", marker="o",
+                                  linestyle="None", label="Ekskludert")
+        proxy_center = mlines.Line2D([], [], color="black",
+                                     linestyle="--", label="Blokk-senterverdi")
+        self.legend = ax.legend(handles=[red_dot, green_dot, grey_dot, proxy_center],
+                                loc="upper left")
+        ax2.legend(loc="upper right")
+
+        # --------------- tekstpanel ------------------------
+        self.text = self.ax_txt.text(0.02, 0.9, "", fontsize=11, va="top",
+                                     family="monospace")
+
+    def update(self, trough_vals: np.ndarray,
+               temps: np.ndarray,
+               hums: np.ndarray,
+               excluded_runs: list[int],
+               base_name: str,
+               *,
+               overall_mean: float,
+               range_metric: float,
+               range_tol: float,
+               block_size: int,
+               blocks: BlockStats | None = None,
+               intervals=None):
+        """
+        Tegn én ring inn i malen. Returnerer figuren.
+
+        `blocks` er resultatet fra block_stats (fra compute_ring); uten
+        det beregnes blokksentrene her. `intervals` (bootstrap.Intervals)
+        legger konfidensintervallene til i tekstpanelet.
+        """
+        n_runs = trough_vals.size
+        x = np.arange(n_runs)
+        ax = self.ax
+
+        # ------------------ farger -------------------------
+        colours = make_run_colours(n_runs, excluded_runs, cmap_name=self.cmap_name)
+        excl_pct = 100 * len(excluded_runs) / n_runs
+
+        self.scatter.set_offsets(np.column_stack([x, trough_vals]))
+        self.scatter.set_facecolor(colours)
+        self.scatter.set_edgecolor(colours)
+        ax.set_title(f"{base_name}: Testresultat")
+        ax.set_xticks(np.arange(0, n_runs, self.tick_size))
+
+        # ---------- akser: som autoskalering + løft øvre y-grense med +2° ------
+        finite = trough_vals[np.isfinite(trough_vals)]
+        lo, hi = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+        pad = 0.05 * (hi - lo) or 0.5
+        ax.set_ylim(lo - pad, hi + pad + 2)
+        ax.set_xlim(-0.5 - 0.05 * n_runs, n_runs - 0.5 + 0.05 * n_runs)
+
+        if blocks is None:
+            blocks = block_stats(trough_vals, block_size, tol=0.0)
+        segs = []
+        for b in np.flatnonzero(np.isfinite(blocks.center)):
+            s, e = blocks.bounds(b)
+            segs.append([(s - 0.5, blocks.center[b]), (e - 0.5, blocks.center[b])])
+        self.centers.set_segments(segs)
+
+        self.hum_line.set_data(x, hums)
+        self.temp_line.set_data(x, temps)
+        self.ax2.relim()
+        self.ax2.autoscale_view()
+
+        self.legend.get_texts()[2].set_text(f"Ekskludert ({excl_pct:.1f} %)")
+        self.text.set_text("\n".join(_summary_lines(
+            temps, hums, len(excluded_runs), excl_pct,
+            overall_mean=overall_mean, range_metric=range_metric,
+            range_tol=range_tol, intervals=intervals)))
+        return self.fig
+
+    def save(self, path_stem: str | os.PathLike,
+             formats: tuple[str, ...] = ("png",), dpi: int = 120) -> list[Path]:
+        """Lagre som path_stem.<format> for hvert format (png, pdf, …)."""
+        paths = []
+        for fmt in formats:
+            p = Path(f"{path_stem}.{fmt}")
+            p.parent.mkdir(parents=True, exist_ok=True)
+            self.fig.savefig(p, dpi=dpi)
+            paths.append(p)
+        return paths
+
+
+def plot_test_results(trough_vals: np.ndarray,
+                      temps: np.ndarray,
+                      hums: np.ndarray,
+                      excluded_runs: list[int],
+                      base_name: str,
+                      *,
+                      overall_mean: float,
+                      range_metric: float,
+                      range_tol: float,
+                      block_size: int,  
+                      tick_size: int = 15,
+                      cmap_name: str = "RdYlGn",
+                      figure: TestResultsFigure | None = None,
+                      blocks: BlockStats | None = None,
+                      intervals=None):
+    """
+    Tegner scatter-plottet (øverst) + tekst med nøkkeldata (nederst).
+
+    Tilleggsparametre:
+        overall_mean : float  – samlet η̄ over blokker
+        range_metric : float  – faktisk maks-min mellom blokker
+        range_tol    : float  – akseptgrense for range
+        figure       : TestResultsFigure – gjenbruk en eksisterende mal
+        blocks       : BlockStats – blokkresultat fra block_stats/compute_ring
+        intervals    : bootstrap.Intervals – KI for η̄ og range i tekstpanelet
+    """
+    if figure is None:
+        figure = TestResultsFigure(tick_size=tick_size, cmap_name=cmap_name)
+    return figure.update(trough_vals, temps, hums, excluded_runs, base_name,
+                         overall_mean=overall_mean, range_metric=range_metric,
+                         range_tol=range_tol, block_size=block_size,
+                         blocks=blocks, intervals=intervals)
+
+
+def _new_figure(figsize, headless: bool):
+    """Figur uten pyplot (ren Agg-canvas) når headless, ellers plt.figure."""
+    if not headless:
+        return plt.figure(figsize=figsize)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def plot_bounces(angles: np.ndarray, base_name: str, *,
+                 tick_size: int = 15, headless: bool = False):
+    """Utslagsvinkel etter sprett 1–n for hver test (enable_3_vinkelutslag)."""
+    fig = _new_figure((7, 4.5), headless)
+    ax = fig.add_subplot()
+    x = np.arange(1, angles.shape[0] + 1)
+    for k in range(angles.shape[1]):
+        col = angles[:, k]
+        line = ax.scatter(x, col, s=12, zorder=3, label=f"Sprett {k+1}")
+        ax.axhline(np.nanmean(col), color=line.get_facecolor()[0],
+                   linestyle="--", linewidth=1)
+    ax.set_xlabel("Test #")
+    ax.set_ylabel("Vinkel [°]")
+    ax.set_title(f"{base_name}: Utslagsvinkel etter sprett 1–{angles.shape[1]}")
+    ax.set_xticks(np.arange(0, x.size + 1, tick_size))
+    ax.grid(True, zorder=0)
+    ax.legend(loc="best", fontsize="small")
+    fig.tight_layout()
+    return fig
+
+
+def plot_angle_diff(angles: np.ndarray, energy: np.ndarray, log_dec: np.ndarray,
+                    base_name: str, *, group_size: int = 15,
+                    tick_size: int = 15, headless: bool = False):
+    """
+    Forskjell mellom påfølgende sprett (øverst) og energitap per sprett
+    (nederst) for hver test, med gruppesnitt à `group_size` runs
+    (enable_angle_diff).
+    """
+    fig = _new_figure((7, 6), headless)
+    ax, ax_e = fig.subplots(2, 1, sharex=True)
+    x = np.arange(1, angles.shape[0] + 1)
+    diffs = angles[:, :-1] - angles[:, 1:]
+
+    for k in range(diffs.shape[1]):
+        sc = ax.scatter(x, diffs[:, k], s=12, zorder=3,
+                        label=f"θ{k+1} − θ{k+2}")
+        means = _group_means(diffs[:, k], group_size)
+        ax.step(np.arange(means.size) * group_size + 1, means, where="post",
+                color=sc.get_facecolor()[0], linewidth=1)
+        ax_e.scatter(x, 100 * energy[:, k], s=12, zorder=3,
+                     label=f"ΔE {k+1}→{k+2}")
+    ax.set_ylabel("Δθ [°]")
+    ax.set_title(f"{base_name}: Sprettforskjell og energitap "
+                 f"(δ̄ = {np.nanmean(log_dec):.4f})")
+    ax.grid(True, zorder=0)
+    ax.legend(loc="best", fontsize="small")
+
+    ax_e.set_xlabel("Test #")
+    ax_e.set_ylabel("Energitap [%]")
+    ax_e.set_xticks(np.arange(0, x.size + 1, tick_size))
+    ax_e.grid(True, zorder=0)
+    ax_e.legend(loc="best", fontsize="small")
+    fig.tight_layout()
+    return fig
+
+
+def plot_all_series(t_new: np.ndarray, encoder: np.ndarray, extrema,
+                    base_name: str, *, cmap_name: str = "RdYlGn",
+                    headless: bool = False):
+    """
+    Alle fasejusterte måleserier over hverandre med ekstremene markert
+    (enable_all_series). Seriene tynnes ut til all_series_max_points.
+    """
+    fig = _new_figure((8, 4.5), headless)
+    ax = fig.add_subplot()
+    n_runs, width = encoder.shape
+    step = max(1, -(-n_runs * width // all_series_max_points))
+    tt = t_new[::step]
+    segs = np.empty((n_runs, tt.size, 2))
+    segs[:, :, 0] = tt
+    segs[:, :, 1] = encoder[:, ::step]
+    colours = plt.get_cmap(cmap_name)(np.linspace(0, 1, max(n_runs, 1)))
+    ax.add_collection(LineCollection(segs, colors=colours, linewidths=0.6,
+                                     alpha=0.6))
+    ax.scatter(extrema.time, extrema.value, s=4, color="black", zorder=3,
+               label="topp/bunn")
+    ax.autoscale_view()
+    ax.set_xlabel("Tid [ms]")
+    ax.set_ylabel("Vinkel [°]")
+    ax.set_title(f"{base_name}: Alle måleserier ({n_runs} runs)")
+    ax.grid(True)
+    ax.legend(loc="upper right", fontsize="small")
+    fig.tight_layout()
+    return fig
+
+
+
+
+
+
+
+# ----------------------------------------------------
+# ---------- prosessér én katalog --------------------
+# ----------------------------------------------------
+
+def process_dataset(directory: os.PathLike):
+    """
+    Leser alle runs i `directory` (JSON-mappe eller runstore, se
+    runcache.load_dataset), fasejusterer og resampler til felles tidsakse.
+    """
+    enc_list, t_list, temps, hums, file_list, min_idx = load_dataset(
+        directory, cache=enable_cache, compact=enable_compact_runs)
+    if not file_list:                       # tom mappe?
+        raise FileNotFoundError("Ingen .json-filer!")
+
+    # ---------- fasejustering + resampling (vektorisert, se alignment) --
+    t_new, encoder = align_and_resample(enc_list, t_list, min_idx)
+
+    # ---------- retur --------------------------------------------------
+    return t_new, encoder, np.array(temps), np.array(hums), file_list   
+
+
+def load_troughs(directory: os.PathLike):
+    """
+    Som `process_dataset`, men returnerer bare |første bunnpunkt| per run,
+    funnet på rå samples med parabolsk sub-sample-justering. Ingen felles
+    tidsakse eller encoder-matrise bygges; med mellomlageret (enable_cache)
+    leses ferdige bunnpunkt, ellers beregnes de bit for bit.
+    """
+    with profiling.span("troughs"):
+        trough_vals, temps, hums, file_list = _cached_troughs(
+            directory, cache=enable_cache)
+    if not file_list:
+        raise FileNotFoundError("Ingen .json-filer!")
+    return trough_vals, temps, hums, file_list
+
+# ---------------------------------------------------------------------------
+# ---------- Hjelpefunksjon for å filtrere ut outliers -----------------------
+# -----------------------------------------------------------------------------
+
+def interval_stats(block_vals, tol):
+    """
+    Parameters
+    ----------
+    block_vals : 1-D np.ndarray  (én blokk på block_size verdier)
+    tol        : float          (± grense rundt senter)
+
+    Én blokk via block_stats; for mange blokker, kall block_stats direkte.
+    """
+    block_vals = np.asarray(block_vals, float)
+    if block_vals.size == 0:
+        return np.nan, np.ones(0, dtype=bool)
+    blk = block_stats(block_vals, block_vals.size, tol)
+    return float(blk.mean[0]), ~blk.keep     # bool-array: True = ekskludert
+
+
+
+# ------------------------------------------------------------
+#  Beregningskjerne (uten utskrift/plott) – brukes av analyze og batch
+# ------------------------------------------------------------
+def compute_ring(outdir, *, block_size=15, tol=0.25, range_tol=0.4,
+                 raw_troughs=None) -> dict:
+    """
+    Første bunnpunkt, blokkvis filtrert η̄ og variasjonskontroll for én ring.
+
+    raw_troughs=True (standard: enable_raw_troughs) finner bunnpunktet på
+    rå samples via `load_troughs`; False bruker resamplede serier som før.
+
+    Returns
+    -------
+    dict med trough_vals, temps, hums, files, blocks (BlockStats),
+    means_per_block, excl_masks (én per blokk), excluded_runs (1-basert),
+    overall_mean, range_ok, range_metric og trough ("raw" | "resampled")
+    """
+    if raw_troughs is None:
+        raw_troughs = enable_raw_troughs
+    if raw_troughs:
+        trough_vals, temps, hums, files = load_troughs(Path(outdir))
+    else:
+        t_new, encoder, temps, hums, files = process_dataset(Path(outdir))
+
+    # –– sjekk at antall filer er delelig med block_size ––
+    if len(files) % block_size:
+        raise ValueError(
+            f"Antall filer ({len(files)}) må være delelig med block_size={block_size}"
+        )
+
+    # Første bunnpunkt for hver måleserie (resamplet variant)
+    if not raw_troughs:
+        with profiling.span("troughs", runs=len(files)):
+            diffs = np.diff(encoder, axis=1)
+            minima = (diffs[:, :-1] < 0) & (diffs[:, 1:] >= 0)
+            idx_first = minima.argmax(axis=1) + 1          # 0 hvis ingen minima
+            trough_vals = np.abs(encoder[np.arange(encoder.shape[0]), idx_first])
+
+    # Blokk-vis gjennomsnitt med outlier-filtrering, alle blokker samtidig
+    with profiling.span("block_stats", runs=len(files)):
+        blocks = block_stats(trough_vals, block_size, tol)
+        means_per_block = blocks.mean.tolist()
+        excl_masks = [blocks.excl_mask(b) for b in range(blocks.n_blocks)]
+        excluded_runs = blocks.excluded_runs()
+        ok, metric = check_block_variation(means_per_block, range_tol=range_tol)
+    profiling.count("runs_excluded", len(excluded_runs))
+
+    return dict(trough_vals=trough_vals, temps=temps, hums=hums, files=files,
+                blocks=blocks, means_per_block=means_per_block, excl_masks=excl_masks,
+                excluded_runs=excluded_runs,
+                overall_mean=float(np.nanmean(means_per_block)),
+                range_ok=bool(ok), range_metric=float(metric),
+                trough="raw" if raw_troughs else "resampled")
+
+
+def _group_means(values: np.ndarray, group_size: int) -> np.ndarray:
+    """NaN-middel per gruppe à group_size (siste gruppe kan være kortere)."""
+    n_groups = -(-values.size // group_size)
+    padded = np.full(n_groups * group_size, np.nan)
+    padded[:values.size] = values
+    padded = padded.reshape(n_groups, group_size)
+    finite = np.isfinite(padded)
+    with np.errstate(invalid="ignore"):
+        return np.where(finite, padded, 0.0).sum(axis=1) / finite.sum(axis=1)
+
+
+def compute_bounces(outdir, *, n: int = N_BOUNCES) -> dict:
+    """
+    Alle ekstremer og sprettstørrelser for én ring (krever resampling).
+
+    Returns
+    -------
+    dict med t_new, encoder, files, extrema (Extrema), angles (n_runs, n),
+    log_dec (n_runs,) og energy_loss (n_runs, n-1)
+    """
+    t_new, encoder, temps, hums, files = process_dataset(Path(outdir))
+    with profiling.span("extrema", runs=len(files)):
+        ext = find_extrema(t_new, encoder)
+    return dict(t_new=t_new, encoder=encoder, files=files, extrema=ext,
+                angles=bounce_angles(ext, n), log_dec=log_decrement(ext),
+                energy_loss=energy_loss(ext, n))
+
+
+def bounce_table(bounces: dict, group_size: int = 15) -> pd.DataFrame:
+    """Gruppesnitt à group_size runs: sprettvinkler, δ og energitap."""
+    angles, energy = bounces["angles"], bounces["energy_loss"]
+    n_runs = angles.shape[0]
+    starts = np.arange(0, n_runs, group_size)
+    table = {"Runs": [f"{s+1}–{min(s + group_size, n_runs)}" for s in starts]}
+    for k in range(angles.shape[1]):
+        table[f"θ{k+1} [°]"] = _group_means(angles[:, k], group_size)
+    table["δ"] = _group_means(bounces["log_dec"], group_size)
+    for k in range(energy.shape[1]):
+        table[f"ΔE{k+1}→{k+2} [%]"] = 100 * _group_means(energy[:, k], group_size)
+    return pd.DataFrame(table)
+
+
+# ------------------------------------------------------------
+#  Hovedfunksjon for dataanalyse
+# ------------------------------------------------------------
+def analyze(outdir, base_name, *, block_size=15, tol=0.25, plot_first_bounce=False, range_tol=0.4,
+            show=True, save_to=None, formats=("png",)):
+    """
+    Kjører komplett η-analyse på katalogen `outdir`. Dette skal være en ring.
+
+    Parameters
+    ----------
+    outdir : str
+        Mappesti som inneholder .json-filene.
+    base_name : str
+        Navn som skal brukes i utskrifter / plott.
+    block_size : int, default 15
+        Antall filer per blokk (tidligere n_trials).
+    tol : float, default 0.25
+        Maksimalt avvik ±tol rundt senter for å inkludere en måling.
+    show : bool, default True
+        False: ingen vinduer (Agg-figur), kun lagring – blokkerer aldri.
+    save_to : str | None
+        Mappe for figuren som «<base_name>_testresultat.<format>».
+    formats : tuple, default ("png",)
+        Filformater for lagring, f.eks. ("png", "pdf").
+
+    Returns
+    -------
+    overall_mean : float
+        Gjennomsnittlig η over samtlige blokker (etter filtrering).
+    """
+    # --------------------------------------------------------
+    #  Pakk ut data, første bunnpunkt og blokkvis filtrering
+    # --------------------------------------------------------
+    res = compute_ring(outdir, block_size=block_size, tol=tol,
+                       range_tol=range_tol)
+    files         = res["files"]
+    trough_vals   = res["trough_vals"]
+    temps, hums   = res["temps"], res["hums"]
+    excluded_runs = res["excluded_runs"]
+    overall_mean  = res["overall_mean"]
+    ok, metric    = res["range_ok"], res["range_metric"]
+    n_blocks      = len(res["means_per_block"])
+
+
+    # --------------------------------------------------------
+    # Kvitter for rekkefølge på filer
+    # --------------------------------------------------------
+    df_files = pd.DataFrame({
+        "Run": range(1, len(files)+1),
+        "Filename": files
+    })
+    print(f"\nKvittering for «{base_name}» "
+          f"({len(files)} filer, block_size={block_size}):")
+    print(df_files.to_string(index=False))
+
+
+    # --------------------------------------------------------
+    # Blokk-vis gjennomsnitt med outlier-filtrering
+    # --------------------------------------------------------
+    for b, (mean_val, excl_mask) in enumerate(zip(res["means_per_block"],
+                                                  res["excl_masks"])):
+        start = b * block_size
+        # Kvittering for ekskludering
+        print(f"\nBlokk {b+1}/{n_blocks} "
+              f"(runs {start+1}–{start + block_size}):  η̄ = {mean_val:.2f}° "
+              f"({excl_mask.sum()} ekskludert)")
+
+    # Sjekker om intre variasjon er avvikende    
+    if ok:
+        print(f"\n✅ Indre variasjon OK: range = {metric:.3f}° ≤ {range_tol}")
+    else:
+        print(f"\n❌ Indre variasjon for stor: range = {metric:.3f}° > {range_tol}")
+
+    print(f"\n⟹  Samlet gjennomsnitt η over {n_blocks} blokker: "
+          f"{overall_mean:.2f}°")
+
+    intervals = None
+    if enable_bootstrap:
+        from . import bootstrap
+        intervals = bootstrap.ring_intervals(trough_vals, block_size, tol,
+                                             range_metric=metric)
+        print(f"   Bootstrap/permutasjon ({intervals.n_resamples} gjensamplinger, "
+              f"frø {intervals.seed}):")
+        for line in bootstrap.summary_lines(intervals, overall_mean=overall_mean,
+                                            range_metric=metric):
+            print(f"   {line}")
+
+    if excluded_runs:
+        print("   Ekskluderte målinger:", ", ".join(map(str, excluded_runs)))
+
+    if enable_env_model:
+        from . import miljo
+        env = miljo.compensate(outdir, trough_vals, temps, hums,
+                               block_size=block_size, tol=tol,
+                               files=files, name=base_name)
+        if env is not None:
+            print()
+            miljo.print_fit(env)
+            if np.isfinite(env["beta_t"]):
+                print(f"⟹  η̄ korrigert til {miljo.T_REF:.0f} °C / {miljo.RH_REF:.0f} % RH: "
+                      f"{env['overall_corr']:.2f}° (rå {overall_mean:.2f}°, "
+                      f"målt ved {env['temp_mean']:.1f} °C / {env['hum_mean']:.1f} % RH, "
+                      f"{int(env['blocks_corr'].n_excluded.sum())} ekskludert)")
+
+    if enable_results_db:
+        from .resultdb import record_analysis
+        record_analysis(outdir, source="analyze", name=base_name, files=files,
+                        block_size=block_size, tol=tol, range_tol=range_tol,
+                        eta_mean=overall_mean, range_metric=metric, range_ok=ok,
+                        excluded_runs=excluded_runs, n_runs=len(files),
+                        n_blocks=n_blocks, temps=temps, hums=hums,
+                        intervals=intervals,
+                        trough="raw" if enable_raw_troughs else "resampled")
+
+
+    # --------------------------------------------------------
+    # 5) Plot testresultater via egne plot-funksjoner
+    # --------------------------------------------------------
+    if plot_first_bounce or save_to is not None:
+        with profiling.span("plot.test_results"):
+            fig = TestResultsFigure(tick_size=tick_size, headless=not show)
+            plot_test_results(trough_vals, temps, hums,
+                          excluded_runs, base_name,
+                          overall_mean=overall_mean,
+                          range_metric=metric,
+                          range_tol=range_tol,
+                          block_size=block_size,
+                          figure=fig,
+                          blocks=res["blocks"],
+                          intervals=intervals)
+        if save_to is not None:
+            with profiling.span("plot.save", figure="testresultat"):
+                saved = fig.save(Path(save_to) / f"{base_name}_testresultat", formats)
+            for p in saved:
+                print(f"Figur lagret: {p}")
+
+    # --------------------------------------------------------
+    # 6) Sprett 1–3, dekrement og energitap (alle ekstremer)
+    # --------------------------------------------------------
+    bounces = None
+    if enable_3_vinkelutslag or enable_angle_diff or enable_all_series:
+        bounces = compute_bounces(outdir)
+        print(f"\nSprett 1–{N_BOUNCES} per gruppe à {interval_size} runs:")
+        print(bounce_table(bounces, interval_size).to_string(
+            index=False, float_format="%.3f"))
+
+        figures = {}
+        with profiling.span("plot.bounces"):
+            if enable_3_vinkelutslag:
+                figures["sprett"] = plot_bounces(
+                    bounces["angles"], base_name, tick_size=tick_size,
+                    headless=not show)
+            if enable_angle_diff:
+                figures["sprettdiff"] = plot_angle_diff(
+                    bounces["angles"], bounces["energy_loss"], bounces["log_dec"],
+                    base_name, group_size=interval_size, tick_size=tick_size,
+                    headless=not show)
+            if enable_all_series:
+                figures["alle_serier"] = plot_all_series(
+                    bounces["t_new"], bounces["encoder"], bounces["extrema"],
+                    base_name, headless=not show)
+        if save_to is not None:
+            Path(save_to).mkdir(parents=True, exist_ok=True)
+            for name, f in figures.items():
+                for fmt in formats:
+                    p = Path(save_to) / f"{base_name}_{name}.{fmt}"
+                    with profiling.span("plot.save", figure=name, format=fmt):
+                        f.savefig(p, dpi=120)
+                    print(f"Figur lagret: {p}")
+
+    # --------------------------------------------------------
+    # 7) Periode og dempning fra spektraltoppen (batchet FFT)
+    # --------------------------------------------------------
+    if enable_spectral:
+        if bounces is not None:                # gjenbruk resamplet matrise
+            t_new, encoder = bounces["t_new"], bounces["encoder"]
+        else:
+            t_new, encoder = process_dataset(Path(outdir))[:2]
+        spec = spectral.spectra(t_new, encoder)
+        print("\nPeriode og dempning (spektraltopp) per run:")
+        print(spectral.run_table(spec, trough_vals, excluded_runs).to_string(
+            index=False, float_format="%.3f"))
+        print(f"\nPer blokk à {block_size} runs:")
+        print(spectral.block_table(spec, block_size, res["means_per_block"]).to_string(
+            index=False, float_format="%.3f"))
+
+    if show:
+        with profiling.span("plot.show"):
+            plt.show()
+
+    return overall_mean
+
+
+# =======================================================================
+#  HOVEDPROGRAM 
+# Input for datamappe og input for navn på test er de som i hovedsak endres
+#                                                           
+# =======================================================================
+def main(outdir: str | None = None, base_name: str | None = None) -> None:
+    """Interaktiv analyse; spør etter det som ikke er gitt."""
+    try:
+        # ----------------- velg mappe -----------------
+        if outdir is None:
+            outdir = input("Oppgi datamappe for JSON-filer: ").strip()
+        if not os.path.isdir(outdir):          # Opretter ikke mappe som mangler
+            print(f"❌  Mappen «{outdir}» finnes ikke.")
+            sys.exit(1)
+
+        # ---------------- Angi navn på test -----------------
+        if base_name is None:
+            base_name = input("Angi navn på test [test]: ").strip() or "test"
+
+        # ------------- Antall målinger per rotasjon ---------------
+        bs_str = input(f"Block size – antall filer per blokk "
+                       f"[{DEFAULT_BLOCK_SIZE}]: ").strip()
+        block_size = int(bs_str) if bs_str else DEFAULT_BLOCK_SIZE
+        if block_size <= 0:
+            raise ValueError("block_size må være > 0")
+
+        # ----------------- tol (0.25) ----------------
+        tol_str = input(f"Toleranse tol i grader "
+                        f"[{DEFAULT_TOL}]: ").strip()
+        tol = float(tol_str) if tol_str else DEFAULT_TOL
+        if tol <= 0:
+            raise ValueError("tol må være > 0")
+        
+        # ---------- Presentasjon av testdata? ----------
+        resp = input("Presenter test-data? (J/n): ").strip().lower()
+        plot_first_bounce = (resp != "n")      # tom streng, “j”, “ja” → True
+        
+        range_tol_str = input("Tillatt forskjell maks–min mellom blokker [0.4]: ").strip()
+        range_tol = float(range_tol_str) if range_tol_str else 0.4
+
+        # -------------- kjør analyse -----------------
+        analyze(outdir, base_name, block_size=block_size, tol=tol, plot_first_bounce=plot_first_bounce, range_tol=range_tol)
+
+    except KeyboardInterrupt:
+        print("\nAvbrutt av bruker.")
+    
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Batch-analyse av mange ringer i parallell.
+
+Finner alle ringmapper under en rotmappe (mapper med run-filer i
+acquire-formatet, «<YYYYMMDD>_ring<ID>_test_<n>.json», eller et
+runs.pstore-lager; karantene-mapper hoppes over), kjører η-analysen fra `analyser_ring.compute_ring` på
+hver av dem i en prosesspool uten plotting, og samler resultatet i én
+tabell (CSV) som `Sammenligning.py` leser direkte:
+
+    ring, round, eta_mean, eta_lo, eta_hi, range_metric, range_lo,
+    range_hi, range_p, range_ok, excl_pct, temp_mean, hum_mean, n_runs,
+    n_blocks, directory, error
+
+eta_lo/eta_hi og range_lo/range_hi er bootstrap-intervaller og range_p
+permutasjons-p-verdien fra `bootstrap.ring_intervals` (--no-ci: tomme).
+
+Ringen hentes som i resultdb.describe_ring (fra filnavnene, ellers
+«ringN» i mappenavnene) og er alltid tekst. Runden hentes fra
+mappenavnene (f.eks. «ring7/runde2» eller «ring7_r2»). Mangler runden,
+nummereres mappene for samme ring 1, 2, 3 … i sortert rekkefølge.
+
+    python -m pendel.batch_analyse data/ [--block-size 15] [--tol 0.3] [--workers 8]
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .runstore import STORE_NAME, QUARANTINE, list_json_files
+from .resultdb import (RING_RE as _RING_RE, ROUND_RE as _ROUND_RE,
+                       _FILE_RE, describe_ring)
+
+# -----------------------------  PARAMETRE  -----------------------------
+RESULTS_NAME       = "ring_results.csv"   # skrives i rotmappen
+DEFAULT_BLOCK_SIZE = 15
+DEFAULT_TOL        = 0.3
+DEFAULT_RANGE_TOL  = 0.4
+# -----------------------------------------------------------------------
+
+COLUMNS = ["ring", "round", "eta_mean", "eta_lo", "eta_hi", "range_metric",
+           "range_lo", "range_hi", "range_p", "range_ok",
+           "excl_pct", "temp_mean", "hum_mean", "n_runs", "n_blocks",
+           "trough", "directory", "error"]
+CI_COLUMNS = ["eta_lo", "eta_hi", "range_lo", "range_hi", "range_p"]
+
+
+def _sort_key(name: str) -> list:
+    """Naturlig sortering: «ring9» før «ring12», «ring9_a» før «ring9_b»."""
+    return [(0, int(c)) if c.isdigit() else (1, c.lower())
+            for c in re.split(r"(\d+)", name)]
+
+
+# =======================================================================
+#  OPPDAGELSE  -----------------------------------------------------------
+# =======================================================================
+def discover_rings(root: str | os.PathLike) -> list[Path]:
+    """
+    Alle mapper under `root` (inkludert root) med run-filer i
+    acquire-formatet eller et runs.pstore-lager. Andre JSON-filer
+    (konfigurasjon, profilspor …) gjør ikke en mappe til en ring. Et lager
+    og karantene-mapper letes ikke gjennom.
+    """
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if QUARANTINE in dirnames:
+            dirnames.remove(QUARANTINE)
+        if STORE_NAME in dirnames:
+            dirnames.remove(STORE_NAME)
+            found.append(Path(dirpath))
+        elif any(fn.lower().endswith(".json") and _FILE_RE.match(fn)
+                 for fn in filenames):
+            found.append(Path(dirpath))
+        dirnames.sort(key=_sort_key)
+    return sorted(found, key=lambda p: [_sort_key(part) for part in p.parts])
+
+
+def parse_ring_round(directory: Path, root: Path,
+                     files: list[str] | None = None) -> tuple[str, int | None]:
+    """
+    (ring, runde|None) for `directory`. Ringen som i describe_ring (fra
+    `files`, ellers run-filene i mappen); runden fra mappenavnene mellom
+    `root` og `directory`.
+    """
+    if files is None:
+        files = list_json_files(directory)
+    parts = directory.relative_to(root).parts or (directory.name,)
+    ring = describe_ring(directory, files)[0]
+    rnd = None
+    for part in reversed(parts):                 # dypeste mappe først
+        if m := _RING_RE.search(part):           # «ring7_r2» → «_r2»
+            part = part[m.end():]
+        if m := _ROUND_RE.search(part):
+            rnd = int(m.group(1))
+            break
+    return ring, rnd
+
+
+# =======================================================================
+#  ARBEIDSPROSESS  -------------------------------------------------------
+# =======================================================================
+def _init_worker() -> None:
+    os.environ["MPLBACKEND"] = "Agg"         # ingen vinduer i arbeiderne
+    from . import parallel_load
+    parallel_load.LOAD_WORKERS = 1           # ingen pool i poolen
+
+
+def _analyze_one(job: tuple) -> dict:
+    """Analyser én ringmappe. Feil rapporteres i raden, ikke kastes."""
+    directory, block_size, tol, range_tol, ci = job
+    row = dict(directory=str(directory), error="")
+    try:
+        from .analyser_ring import compute_ring
+        res = compute_ring(directory, block_size=block_size, tol=tol,
+                           range_tol=range_tol)
+        n_runs = len(res["trough_vals"])
+        row.update(files=res["files"],
+                   date=describe_ring(directory, res["files"])[2],
+                   excluded_runs=res["excluded_runs"],
+                   eta_mean=res["overall_mean"],
+                   range_metric=res["range_metric"],
+                   range_ok=res["range_ok"],
+                   excl_pct=100 * len(res["excluded_runs"]) / n_runs if n_runs else np.nan,
+                   temp_mean=float(np.nanmean(res["temps"])) if n_runs else np.nan,
+                   hum_mean=float(np.nanmean(res["hums"])) if n_runs else np.nan,
+                   n_runs=n_runs, n_blocks=len(res["means_per_block"]),
+                   trough=res["trough"])
+        if ci:
+            from .bootstrap import ring_intervals
+            intervals = ring_intervals(res["trough_vals"], block_size, tol,
+                                       range_metric=res["range_metric"], workers=1)
+            row.update({c: getattr(intervals, c) for c in CI_COLUMNS})
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+# =======================================================================
+#  BATCH  ----------------------------------------------------------------
+# =======================================================================
+def run_batch(root: str | os.PathLike, *,
+              block_size: int = DEFAULT_BLOCK_SIZE,
+              tol: float = DEFAULT_TOL,
+              range_tol: float = DEFAULT_RANGE_TOL,
+              workers: int | None = None,
+              out: str | os.PathLike | None = None,
+              record: bool = True, ci: bool = True) -> pd.DataFrame:
+    """
+    Analyser alle ringmapper under `root` og skriv resultattabellen.
+
+    Parameters
+    ----------
+    workers : int | None
+        Antall prosesser (None → alle kjerner).
+    out : path | None
+        CSV-fil (None → root/ring_results.csv).
+    record : bool
+        Lagre de vellykkede radene i resultatdatabasen (resultdb).
+    ci : bool
+        Bootstrap-/permutasjonsintervaller per ring (bootstrap).
+
+    Returns
+    -------
+    pd.DataFrame med én rad per ringmappe (kolonner som i COLUMNS)
+    """
+    root = Path(root).resolve()
+    dirs = discover_rings(root)
+    if not dirs:
+        raise FileNotFoundError(f"Ingen ringmapper under {root}")
+
+    workers = min(workers or os.cpu_count() or 1, len(dirs))
+    jobs = [(d, block_size, tol, range_tol, ci) for d in dirs]
+    if workers == 1:
+        rows = [_analyze_one(j) for j in jobs]
+    else:
+        # små jobber i klumper, men nok klumper til å jevne ut ulik ringstørrelse
+        chunk = max(1, len(jobs) // (4 * workers))
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as ex:
+            rows = list(ex.map(_analyze_one, jobs, chunksize=chunk))
+
+    for d, row in zip(dirs, rows):
+        row["ring"], row["round"] = parse_ring_round(d, root, row.pop("files", None))
+
+    extra = pd.DataFrame(rows).reindex(columns=["date", "excluded_runs"])
+    df = pd.DataFrame(rows).reindex(columns=COLUMNS)
+    # runder uten nummer i mappenavnet: 1, 2, 3 … per ring i mappe-rekkefølge
+    missing = df["round"].isna()
+    if missing.any():
+        taken = df.groupby("ring")["round"].transform("max").fillna(0)
+        order = df[missing].groupby("ring").cumcount() + 1
+        df.loc[missing, "round"] = taken[missing] + order
+    df["round"] = df["round"].astype(int)
+
+    if record:
+        _record(df.join(extra), block_size, tol, range_tol)
+    df.to_csv(out or root / RESULTS_NAME, index=False)
+    return df
+
+
+def _record(df: pd.DataFrame, block_size: int, tol: float,
+            range_tol: float) -> None:
+    """Skriv de vellykkede radene til resultatdatabasen i én transaksjon."""
+    import sqlite3
+    from .resultdb import RESULTS_DB, ResultsDB
+
+    ok = df[df["error"] == ""]
+    rows = [dict(ring=str(r.ring), round=int(r.round), date=r.date,
+                 block_size=block_size, tol=tol, range_tol=range_tol,
+                 source="batch", eta_mean=r.eta_mean,
+                 range_metric=r.range_metric, range_ok=int(bool(r.range_ok)),
+                 excl_pct=r.excl_pct, excluded_runs=r.excluded_runs,
+                 n_runs=int(r.n_runs), n_blocks=int(r.n_blocks),
+                 temp_mean=None if np.isnan(r.temp_mean) else r.temp_mean,
+                 hum_mean=None if np.isnan(r.hum_mean) else r.hum_mean,
+                 directory=r.directory, trough=r.trough,
+                 **{c: None if np.isnan(getattr(r, c)) else getattr(r, c)
+                    for c in CI_COLUMNS})
+            for r in ok.itertuples()]
+    try:
+        with ResultsDB() as db:
+            db.record_many(rows)
+    except sqlite3.Error as e:
+        print(f"⚠️  Resultater ikke lagret i {RESULTS_DB}: {e}", file=sys.stderr)
+
+
+def load_results(path: str | os.PathLike) -> pd.DataFrame:
+    """Les en resultattabell skrevet av `run_batch`."""
+    return pd.read_csv(path, keep_default_na=True,
+                       dtype={"ring": str}).fillna({"error": ""})
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="η-analyse av alle ringer under en mappe")
+    p.add_argument("root")
+    p.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    p.add_argument("--tol", type=float, default=DEFAULT_TOL)
+    p.add_argument("--range-tol", type=float, default=DEFAULT_RANGE_TOL)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--out", default=None)
+    p.add_argument("--no-record", action="store_true",
+                   help="ikke lagre i resultatdatabasen")
+    p.add_argument("--no-ci", action="store_true",
+                   help="ingen bootstrap-/permutasjonsintervaller")
+    args = p.parse_args()
+
+    df = run_batch(args.root, block_size=args.block_size, tol=args.tol,
+                   range_tol=args.range_tol, workers=args.workers, out=args.out,
+                   record=not args.no_record, ci=not args.no_ci)
+    with pd.option_context("display.width", 140):
+        print(df.drop(columns="directory").to_string(index=False,
+                                                     float_format="%.2f"))
+    failed = df[df["error"] != ""]
+    if len(failed):
+        print(f"\n❌ {len(failed)} av {len(df)} mapper feilet", file=sys.stderr)
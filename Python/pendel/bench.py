@@ -0,0 +1,316 @@
+"""
+Ytelsesmåling av analysetrinnene på syntetiske data (uten rigg).
+
+Genererer ringer i firmware-format (se syntetisk.py) i flere størrelser
+og måler hvert trinn:
+
+*  process_dataset[json]   – analyser_ring, JSON uten mellomlager
+*  process_dataset[cache]  – samme, med varmt runcache
+*  load_troughs[json]      – bare første bunnpunkt på rå samples (uten resampling)
+*  load_troughs[cache]     – samme, med varmt runcache
+*  process_dataset[compact] – JSON inn i compact.RunSet, analyse via visningene
+*  block_stats             – blokkvis filtrering over alle blokker
+*  spectra                 – periode/dempning for alle runs (batchet rFFT)
+*  analyze                 – hele η-analysen uten vindu (show=False)
+*  stats                   – main_store_JSON_testserie.stats uten vindu
+*  rapport                 – hodeløs testresultat-figur til PNG
+*  import_json_dir         – bygging av runs.pstore
+*  process_dataset[store]  – innlesing fra runs.pstore
+*  load_troughs[store]     – bunnpunkt fra runs.pstore
+
+For hvert trinn rapporteres beste tid av `--repeat`, gjennomstrømning
+(runs/s og MiB JSON/s) og topp minnebruk (tracemalloc, egen kjøring).
+Resultatet kan lagres som JSON og sammenlignes med en tidligere kjøring.
+
+`--startup` måler i stedet importtiden til hver underkommando i pendel.cli
+i en ny prosess, sjekker den mot STARTUP_BUDGET_S og at tunge moduler ikke
+lastes der de ikke trengs (avslutter med kode 1 ved brudd):
+
+    python -m pendel.bench                         # 60, 600, 6000, 15000 runs
+    python -m pendel.bench --scales 60 600 --repeat 5 --json før.json
+    python -m pendel.bench --scales 60 600 --baseline før.json
+    python -m pendel.bench --startup
+"""
+
+import io
+import os
+import sys
+import json
+import subprocess
+import time
+import shutil
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+
+from .syntetisk import SynthConfig, write_ring
+from .block_stats import block_stats
+
+# -----------------------------  PARAMETRE  -----------------------------
+DEFAULT_SCALES  = (60, 600, 6000, 15000)   # delelig med blokkstørrelsen
+DEFAULT_SAMPLES = 6000                     # som data_collection_time = 6 s
+DEFAULT_REPEAT  = 3
+BLOCK_SIZE      = 15
+TOL             = 0.3
+
+# importbudsjett per underkommando [s] og moduler som ikke skal lastes
+STARTUP_BUDGET_S = {"--help": 0.2, "acquire": 0.5, "analyze": 1.5, "compare": 1.5,
+                    "results": 0.2}
+STARTUP_FORBIDDEN = {
+    "--help":  ("numpy", "pandas", "matplotlib", "serial", "scipy"),
+    "acquire": ("pandas", "matplotlib", "scipy"),
+    "analyze": ("serial", "scipy"),
+    "compare": ("serial", "scipy"),
+    "results": ("numpy", "pandas", "matplotlib", "serial", "scipy"),
+}
+# -----------------------------------------------------------------------
+
+
+# =======================================================================
+#  MÅLING  ---------------------------------------------------------------
+# =======================================================================
+def _quiet(fn, *args, **kw):
+    with redirect_stdout(io.StringIO()):
+        return fn(*args, **kw)
+
+
+def measure(fn, *, repeat: int, memory: bool) -> tuple[float, float]:
+    """(beste tid [s], topp minne [MiB] eller NaN) for fn()."""
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _quiet(fn)
+        best = min(best, time.perf_counter() - t0)
+
+    peak = np.nan
+    if memory:
+        tracemalloc.start()
+        try:
+            _quiet(fn)
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def _ring_dir(data_root: Path, n_runs: int, samples: int) -> Path:
+    """Syntetisk ring med n_runs filer (gjenbrukes hvis den finnes)."""
+    d = data_root / f"syn_{n_runs}x{samples}"
+    if not (d.is_dir() and len(list(d.glob("*.json"))) == n_runs):
+        shutil.rmtree(d, ignore_errors=True)
+        print(f"  genererer {n_runs} runs × {samples} samples ...", flush=True)
+        write_ring(d, SynthConfig(runs=n_runs, samples=samples), ring_id="0")
+    return d
+
+
+# =======================================================================
+#  TRINN  ----------------------------------------------------------------
+# =======================================================================
+def stages(directory: Path, cache_path: Path):
+    """(navn, funksjon) for alle trinn i rekkefølge – store-trinnene sist."""
+    from . import analyser_ring as ar
+    from .runcache import RunCache
+    from .runstore import import_json_dir, STORE_NAME
+
+    def with_cache(cache, fn):
+        def run():
+            old, ar.enable_cache = ar.enable_cache, cache
+            try:
+                return fn()
+            finally:
+                ar.enable_cache = old
+        return run
+
+    rc = RunCache(cache_path, max_bytes=2**40)
+    _quiet(with_cache(rc, lambda: ar.process_dataset(directory)))    # varm opp
+    res = _quiet(with_cache(False, lambda: ar.compute_ring(
+        directory, block_size=BLOCK_SIZE, tol=TOL)))
+    trough_vals = res["trough_vals"]
+
+    def blocks_all():
+        block_stats(trough_vals, BLOCK_SIZE, TOL)
+
+    yield "process_dataset[json]", with_cache(False, lambda: ar.process_dataset(directory))
+    yield "process_dataset[cache]", with_cache(rc, lambda: ar.process_dataset(directory))
+    yield "load_troughs[json]", with_cache(False, lambda: ar.load_troughs(directory))
+    yield "load_troughs[cache]", with_cache(rc, lambda: ar.load_troughs(directory))
+
+    def compact_dataset():
+        old, ar.enable_compact_runs = ar.enable_compact_runs, True
+        try:
+            return ar.process_dataset(directory)
+        finally:
+            ar.enable_compact_runs = old
+    yield "process_dataset[compact]", with_cache(False, compact_dataset)
+    yield "block_stats", blocks_all
+
+    from .spectral import spectra
+    t_new, encoder = _quiet(with_cache(rc, lambda: ar.process_dataset(directory)))[:2]
+    yield "spectra", lambda: spectra(t_new, encoder)
+    yield "analyze", with_cache(False, lambda: ar.analyze(
+        directory, "bench", block_size=BLOCK_SIZE, tol=TOL, show=False))
+
+    from . import main_store_JSON_testserie as ms
+
+    def run_stats():
+        old, ms.enable_cache = ms.enable_cache, False
+        try:
+            ms.stats(directory, "bench", show=False)
+        finally:
+            ms.enable_cache = old
+    yield "stats", run_stats
+
+    fig = ar.TestResultsFigure(headless=True)
+    png = cache_path.parent / "bench_rapport"
+
+    def render():
+        fig.update(trough_vals, res["temps"], res["hums"], res["excluded_runs"],
+                   "bench", overall_mean=res["overall_mean"],
+                   range_metric=res["range_metric"], range_tol=0.4,
+                   block_size=BLOCK_SIZE, blocks=res["blocks"])
+        fig.save(png, ("png",))
+    yield "rapport", render
+
+    store = directory / STORE_NAME
+
+    def build_store():
+        shutil.rmtree(store, ignore_errors=True)
+        import_json_dir(directory)
+    yield "import_json_dir", build_store
+    yield "process_dataset[store]", with_cache(False, lambda: ar.process_dataset(directory))
+    yield "load_troughs[store]", with_cache(False, lambda: ar.load_troughs(directory))
+    shutil.rmtree(store, ignore_errors=True)
+    rc.close()
+
+
+def run_bench(scales=DEFAULT_SCALES, *, samples: int = DEFAULT_SAMPLES,
+              repeat: int = DEFAULT_REPEAT, memory: bool = True,
+              data_root: str | os.PathLike | None = None) -> list[dict]:
+    """
+    Kjør alle trinn for hver skala.
+
+    Returns
+    -------
+    list av dict(scale, stage, seconds, runs_per_s, mib_per_s, peak_mib)
+    """
+    tmp = None
+    if data_root is None:
+        tmp = tempfile.TemporaryDirectory(prefix="pendel_bench_")
+        data_root = tmp.name
+    data_root = Path(data_root)
+    data_root.mkdir(parents=True, exist_ok=True)
+
+    rows = []
+    try:
+        for n in scales:
+            print(f"\n=== {n} runs ===", flush=True)
+            d = _ring_dir(data_root, n, samples)
+            mib = sum(p.stat().st_size for p in d.glob("*.json")) / 2**20
+            cache_path = data_root / f"cache_{n}x{samples}.sqlite"
+            cache_path.unlink(missing_ok=True)
+
+            for name, fn in stages(d, cache_path):
+                sec, peak = measure(fn, repeat=repeat, memory=memory)
+                rows.append(dict(scale=n, stage=name, seconds=sec,
+                                 runs_per_s=n / sec, mib_per_s=mib / sec,
+                                 peak_mib=peak))
+                print(f"  {name:24s} {sec:9.4f} s  {n / sec:10.0f} runs/s  "
+                      f"{mib / sec:8.1f} MiB/s  topp {peak:8.1f} MiB", flush=True)
+            cache_path.unlink(missing_ok=True)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+    return rows
+
+
+# =======================================================================
+#  OPPSTARTSTID  ---------------------------------------------------------
+# =======================================================================
+_STARTUP_SNIPPET = """
+import sys, time, json, importlib
+t0 = time.perf_counter()
+from pendel import cli
+cli.build_parser()
+for m in (cli.COMMAND_MODULES.get({cmd!r}, ())):
+    importlib.import_module(m)
+dt = time.perf_counter() - t0
+print(json.dumps([dt, sorted({{m.split('.')[0] for m in sys.modules}})]))
+"""
+
+
+def startup_times(repeat: int = 3) -> list[dict]:
+    """
+    Importtid for `pendel --help` og hver underkommando, beste av `repeat`
+    ferske prosesser, med brudd på budsjett/forbudte moduler.
+    """
+    rows = []
+    for cmd, budget in STARTUP_BUDGET_S.items():
+        best, loaded = np.inf, set()
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", _STARTUP_SNIPPET.format(cmd=cmd)],
+                                 capture_output=True, text=True, check=True).stdout
+            dt, mods = json.loads(out)
+            best, loaded = min(best, dt), set(mods)
+        bad = sorted(loaded & set(STARTUP_FORBIDDEN.get(cmd, ())))
+        rows.append(dict(command=cmd, seconds=best, budget=budget,
+                         forbidden_loaded=bad, ok=best <= budget and not bad))
+    return rows
+
+
+def print_table(rows: list[dict], baseline: list[dict] | None = None) -> None:
+    """Sluttabell; med baseline vises tid relativt til forrige kjøring."""
+    base = {(r["scale"], r["stage"]): r for r in baseline or []}
+    print(f"\n{'runs':>6} {'trinn':24s} {'tid [s]':>10} {'runs/s':>10} "
+          f"{'MiB/s':>8} {'topp MiB':>9}" + ("   vs. baseline" if base else ""))
+    for r in rows:
+        line = (f"{r['scale']:>6} {r['stage']:24s} {r['seconds']:>10.4f} "
+                f"{r['runs_per_s']:>10.0f} {r['mib_per_s']:>8.1f} {r['peak_mib']:>9.1f}")
+        b = base.get((r["scale"], r["stage"]))
+        if b and np.isfinite(b["seconds"]) and np.isfinite(r["seconds"]):
+            ratio = r["seconds"] / b["seconds"]
+            flag = "  ⚠️ tregere" if ratio > 1.1 else ("  ✅ raskere" if ratio < 0.9 else "")
+            line += f"   ×{ratio:.2f}{flag}"
+        print(line)
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Ytelsesmåling av analysetrinnene")
+    p.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    p.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    p.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    p.add_argument("--no-memory", action="store_true", help="dropp tracemalloc-kjøringen")
+    p.add_argument("--data", default=None, help="behold genererte data her")
+    p.add_argument("--json", default=None, help="lagre resultatet")
+    p.add_argument("--baseline", default=None, help="sammenlign med tidligere --json")
+    p.add_argument("--startup", action="store_true", help="sjekk importbudsjett per underkommando")
+    args = p.parse_args()
+
+    if args.startup:
+        rows = startup_times(args.repeat)
+        for r in rows:
+            extra = f"  lastet: {', '.join(r['forbidden_loaded'])}" if r["forbidden_loaded"] else ""
+            print(f"{'✅' if r['ok'] else '❌'} {r['command']:8s} {r['seconds']:.3f} s "
+                  f"(budsjett {r['budget']:.2f} s){extra}")
+        sys.exit(0 if all(r["ok"] for r in rows) else 1)
+
+    if any(n % BLOCK_SIZE for n in args.scales):
+        p.error(f"alle skalaer må være delelig med {BLOCK_SIZE}")
+
+    rows = run_bench(args.scales, samples=args.samples, repeat=args.repeat,
+                     memory=not args.no_memory, data_root=args.data)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(rows, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, default=float)
@@ -0,0 +1,300 @@
+"""
+Binær rammeformat for én run fra ESP32 (alternativ til serializeJson).
+
+På linja: 0x00 | COBS(nyttelast + CRC) | 0x00
+
+COBS fjerner alle 0-byte fra rammen, så 0x00 skiller rammene fra
+tekstlinjene (debugutskrift) i samme strøm. Nyttelasten er little-endian:
+
+    u8  versjon          (VERSION)
+    u16 CPR              pulser per omdreining
+    u16 n                antall samples
+    i32 p0               totalPulses i første sample
+    u32 t0               millis() - startTime i første sample
+    f32 temp, f32 hum
+    i16 dp[n]            puls-delta mot forrige sample (dp[0] = 0)
+    u16 dt[n]            tids-delta [ms] mot forrige sample (dt[0] = 0)
+    u16 crc              CRC-16/CCITT-FALSE over alt over
+
+Vinkelen regnes ut på verten som i firmware: totalPulses / CPR * 360.
+En run på 6000 samples blir ca. 24 kB mot ca. 90 kB JSON.
+
+`StreamDecoder` deler en rå bytestrøm i tekstlinjer, JSON-linjer og
+binære rammer (automatisk gjenkjent), og brukes både av SerialReader og
+til å dekode opptak/syntetiske rammer uten rigg:
+
+    python -m pendel.binframe decode opptak.bin utmappe/
+    python -m pendel.binframe encode ringmappe/ rammer.bin
+"""
+
+import binascii
+import json
+import re
+import struct
+from pathlib import Path
+
+import numpy as np
+
+# -----------------------------  PARAMETRE  -----------------------------
+VERSION = 1
+CPR     = 2048                          # som global_declarations.cpp
+HEADER  = struct.Struct("<BHHiIff")     # versjon, CPR, n, p0, t0, temp, hum
+# -----------------------------------------------------------------------
+
+
+class FrameError(ValueError):
+    """Ødelagt eller ukjent binær ramme (COBS, lengde, versjon eller CRC)."""
+
+
+# =======================================================================
+#  COBS + CRC  -----------------------------------------------------------
+# =======================================================================
+def crc16(data: bytes) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, start 0xFFFF) – som firmware."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    """COBS-kod `data` (resultatet inneholder ingen 0-byte)."""
+    out = bytearray()
+    start = 0
+    while True:
+        zero = data.find(b"\x00", start, start + 254)
+        if zero < 0:
+            block = data[start:start + 254]
+            if len(block) == 254:                # full blokk uten 0
+                out.append(0xFF)
+                out += block
+                start += 254
+                continue
+            out.append(len(block) + 1)
+            out += block
+            return bytes(out)
+        out.append(zero - start + 1)
+        out += data[start:zero]
+        start = zero + 1
+
+
+def cobs_decode(data: bytes) -> bytes:
+    """Reverser `cobs_encode`; FrameError ved ugyldig koding."""
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        code = data[i]
+        if code == 0:
+            raise FrameError("0-byte inne i COBS-ramme")
+        j = i + code
+        if j > n:
+            raise FrameError("avkuttet COBS-blokk")
+        out += data[i + 1:j]
+        i = j
+        if code < 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+# =======================================================================
+#  KODING / DEKODING AV ÉN RUN  ------------------------------------------
+# =======================================================================
+def encode_run(pulses, t_ms, temp: float, hum: float, *, cpr: int = CPR) -> bytes:
+    """
+    Bygg en komplett ramme (med 0x00 foran og bak) fra rå pulstall.
+
+    Raises
+    ------
+    OverflowError
+        Hvis en puls- eller tidsdelta ikke passer i i16/u16 (firmware
+        sender da JSON i stedet).
+    """
+    p = np.asarray(pulses, np.int64)
+    t = np.asarray(t_ms, np.int64)
+    dp = np.diff(p, prepend=p[:1])
+    dt = np.diff(t, prepend=t[:1])
+    if p.size and (dp.min() < -2**15 or dp.max() >= 2**15
+                   or dt.min() < 0 or dt.max() >= 2**16):
+        raise OverflowError("delta utenfor i16/u16")
+
+    payload = (HEADER.pack(VERSION, cpr, p.size,
+                           int(p[0]) if p.size else 0,
+                           int(t[0]) if t.size else 0, temp, hum)
+               + dp.astype("<i2").tobytes() + dt.astype("<u2").tobytes())
+    payload += struct.pack("<H", crc16(payload))
+    return b"\x00" + cobs_encode(payload) + b"\x00"
+
+
+def _payload(frame: bytes) -> bytes:
+    """Nyttelasten i én COBS-ramme; FrameError ved feil koding, CRC eller lengde."""
+    raw = cobs_decode(frame)
+    if len(raw) < HEADER.size + 2:
+        raise FrameError(f"for kort ramme ({len(raw)} B)")
+    payload, (crc,) = raw[:-2], struct.unpack("<H", raw[-2:])
+    if crc16(payload) != crc:
+        raise FrameError("CRC-feil")
+
+    version, _, n = HEADER.unpack_from(payload)[:3]
+    if version != VERSION:
+        raise FrameError(f"ukjent versjon {version}")
+    if len(payload) != HEADER.size + 4 * n:
+        raise FrameError(f"lengde {len(payload)} B passer ikke med n={n}")
+    return payload
+
+
+def decode_run(frame: bytes) -> dict:
+    """
+    Dekod én COBS-ramme (uten 0x00-skillene) til en run i firmware-
+    JSON-format: {"encoder", "test_time_ms", "temp", "hum"}.
+    """
+    payload = _payload(frame)
+    _, cpr, n, p0, t0, temp, hum = HEADER.unpack_from(payload)
+
+    dp = np.frombuffer(payload, "<i2", n, HEADER.size)
+    dt = np.frombuffer(payload, "<u2", n, HEADER.size + 2 * n)
+    pulses = p0 + np.cumsum(dp, dtype=np.int64)
+    t = t0 + np.cumsum(dt, dtype=np.int64)
+    return {"encoder": (pulses / cpr * 360).tolist(),
+            "test_time_ms": t.tolist(),
+            "temp": [float(str(np.float32(temp)))],      # korteste f32-form
+            "hum": [float(str(np.float32(hum)))]}
+
+
+def encode_json_run(data: dict, *, cpr: int = CPR) -> bytes:
+    """Ramme fra en run i JSON-format (vinkel → pulstall)."""
+    enc = np.asarray(data["encoder"], float)
+    pulses = np.rint(enc / 360 * cpr)
+    t = data.get("test_time_ms") or range(enc.size)
+    temp, hum = data.get("temp"), data.get("hum")
+    temp = temp[0] if isinstance(temp, list) and temp else temp
+    hum = hum[0] if isinstance(hum, list) and hum else hum
+    return encode_run(pulses, t,
+                      np.nan if temp is None else float(temp),
+                      np.nan if hum is None else float(hum), cpr=cpr)
+
+
+def to_json_bytes(data: dict) -> bytes:
+    """Kompakt JSON som serializeJson – formatet som lagres på disk."""
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+# =======================================================================
+#  STRØMDEKODER  ---------------------------------------------------------
+# =======================================================================
+_DELIM = re.compile(rb"[\n\x00]")
+
+
+class StreamDecoder:
+    """
+    Deler en bytestrøm i (kind, data): "line", "json" eller "bin".
+
+    Tekst avsluttes med \\n (JSON = linje som starter med { og slutter
+    med }); en 0x00 starter en binær ramme som varer til neste 0x00.
+    `data` for "bin" er COBS-bytes – dekodes med `decode_run`.
+
+    Feiler en ramme på koding, CRC eller lengde, er trolig en 0x00 mistet
+    og rammen slått sammen med det som fulgte. Den leveres likevel (så
+    mottakeren kan melde fra), men 0x00-en som avsluttet den regnes som
+    start på neste ramme – ellers ville tekst og rammer bytte plass og
+    alle senere rammer feile.
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self._scan = 0                       # buf[:scan] har ingen skilletegn
+        self._in_frame = False
+
+    def feed(self, data: bytes) -> list[tuple[str, bytes]]:
+        """Legg til bytes og returner alle elementer som nå er komplette."""
+        buf = self.buf
+        buf += data
+        items = []
+        while True:
+            if self._in_frame:
+                end = buf.find(b"\x00", self._scan)
+                if end < 0:
+                    self._scan = len(buf)
+                    return items
+                frame = bytes(buf[:end])
+                del buf[:end + 1]
+                self._scan = 0
+                if not frame:
+                    continue                     # tom ramme: 0x00 var start
+                items.append(("bin", frame))
+                try:
+                    _payload(frame)
+                except FrameError:               # synk på nytt fra denne 0x00
+                    continue
+                self._in_frame = False
+                continue
+
+            m = _DELIM.search(buf, self._scan)
+            if m is None:
+                self._scan = len(buf)
+                return items
+            pos = m.start()
+            frame_start = buf[pos] == 0
+            line = bytes(buf[:pos]).strip()
+            del buf[:pos + 1]
+            self._scan = 0
+            if line:
+                kind = "json" if line[:1] == b"{" and line[-1:] == b"}" else "line"
+                items.append((kind, line))
+            if frame_start:
+                self._in_frame = True
+
+    def clear(self) -> None:
+        self.buf.clear()
+        self._scan = 0
+        self._in_frame = False
+
+
+def decode_stream(data: bytes):
+    """
+    Alle runs i et opptak av serieporten (binære rammer og JSON-linjer).
+
+    Returns
+    -------
+    list av dict i firmware-format; ødelagte rammer hoppes over
+    """
+    runs = []
+    for kind, item in StreamDecoder().feed(data):
+        try:
+            if kind == "bin":
+                runs.append(decode_run(item))
+            elif kind == "json":
+                runs.append(json.loads(item))
+        except (FrameError, json.JSONDecodeError) as e:
+            print(f"Forkastet {kind}: {e}")
+    return runs
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Binære run-rammer (COBS + CRC)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("decode", help="opptak av serieporten → JSON-filer")
+    d.add_argument("capture")
+    d.add_argument("out_dir")
+    d.add_argument("--name", default="opptak", help="filnavn-prefiks")
+    e = sub.add_parser("encode", help="JSON-filer i en mappe → rammestrøm")
+    e.add_argument("ring_dir")
+    e.add_argument("out_file")
+    args = p.parse_args()
+
+    if args.cmd == "decode":
+        out = Path(args.out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        runs = decode_stream(Path(args.capture).read_bytes())
+        for i, run in enumerate(runs, start=1):
+            (out / f"{args.name}_{i}.json").write_bytes(to_json_bytes(run))
+        print(f"{len(runs)} runs skrevet til {out}")
+    else:
+        from .runcache import natural_key
+        files = sorted(Path(args.ring_dir).glob("*.json"),
+                       key=lambda f: natural_key(f.name))
+        with open(args.out_file, "wb") as f:
+            for path in files:
+                f.write(encode_json_run(json.loads(path.read_text(encoding="utf-8"))))
+        print(f"{len(files)} rammer skrevet til {args.out_file}")
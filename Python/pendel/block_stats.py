@@ -0,0 +1,143 @@
+"""
+Blokkvis førstesprett-statistikk for alle blokker på én gang.
+
+Samme regler som `interval_stats`, men uten Python-løkke over blokkene:
+
+*  verdiene deles i blokker à block_size (siste blokk kan være kortere)
+*  hver verdi legges i en bøtte (0.1° som np.round(x, 1), eller eksakt
+   verdi med resolution=None) og antall per (blokk, bøtte) telles
+*  mode1/mode2 = de to største antallene per blokk, minste verdi ved likt
+   antall (samme rekkefølge som lexsort((verdi, -antall)))
+*  senter = (mode1 + mode2) / 2, inkludert hvis |verdi - senter| <= tol
+*  filtrert middel per blokk over inkluderte verdier
+
+NaN telles ikke med i typetallene og blir alltid ekskludert.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+# -----------------------------  PARAMETRE  -----------------------------
+RESOLUTION  = 0.1            # bøttebredde [°] for typetall
+DENSE_LIMIT = 2**24          # maks blokker × bøtter for tett telling
+# -----------------------------------------------------------------------
+
+
+class BlockStats(NamedTuple):
+    block_size: int
+    mode1: np.ndarray        # (n_blocks,)
+    mode2: np.ndarray        # (n_blocks,)
+    center: np.ndarray       # (n_blocks,)  NaN hvis blokken bare har NaN
+    mean: np.ndarray         # (n_blocks,)  filtrert middel
+    n_excluded: np.ndarray   # (n_blocks,)
+    keep: np.ndarray         # (n_runs,)    True = inkludert
+
+    @property
+    def n_blocks(self) -> int:
+        return self.center.size
+
+    def bounds(self, b: int) -> tuple[int, int]:
+        """[start, slutt) for blokk b (0-basert)."""
+        s = b * self.block_size
+        return s, min(s + self.block_size, self.keep.size)
+
+    def excluded_runs(self) -> list[int]:
+        """1-baserte runnummer som er ekskludert, i rekkefølge."""
+        return (np.flatnonzero(~self.keep) + 1).tolist()
+
+    def excl_mask(self, b: int) -> np.ndarray:
+        s, e = self.bounds(b)
+        return ~self.keep[s:e]
+
+
+def _codes(vals: np.ndarray, resolution: float | None):
+    """Heltallskoder (stigende med verdien) og kode → verdi."""
+    if resolution is None:
+        uniq, inv = np.unique(vals, return_inverse=True)
+        return inv, uniq
+    scale = 1.0 / resolution                 # x * 10 / 10 som np.round(x, 1)
+    bins = np.rint(vals * scale).astype(np.int64)
+    lo = bins.min()
+    n_bins = int(bins.max() - lo) + 1
+    return bins - lo, (np.arange(n_bins) + lo) / scale
+
+
+def _top2(block_id: np.ndarray, code: np.ndarray, n_blocks: int, n_codes: int):
+    """(kode1, kode2, har_verdi) per blokk fra antall per (blokk, kode)."""
+    if n_blocks * n_codes <= DENSE_LIMIT:
+        counts = np.bincount(block_id * n_codes + code,
+                             minlength=n_blocks * n_codes).reshape(n_blocks, n_codes)
+        rows = np.arange(n_blocks)
+        c1 = counts.argmax(axis=1)                # første maks = minste verdi
+        has = counts[rows, c1] > 0
+        counts[rows, c1] = -1
+        c2 = counts.argmax(axis=1)
+        c2 = np.where(counts[rows, c2] > 0, c2, c1)
+        return c1, c2, has
+
+    # glissen telling når verdiområdet er stort
+    key, cnt = np.unique(block_id * n_codes + code, return_counts=True)
+    blk, cd = np.divmod(key, n_codes)
+    order = np.lexsort((cd, -cnt, blk))
+    blk, cd = blk[order], cd[order]
+    first = np.flatnonzero(np.r_[True, blk[1:] != blk[:-1]])
+    c1 = np.zeros(n_blocks, np.int64)
+    has = np.zeros(n_blocks, bool)
+    c1[blk[first]] = cd[first]
+    has[blk[first]] = True
+    c2 = c1.copy()
+    second = first + 1
+    ok = second < blk.size
+    second = second[ok]
+    same = blk[second] == blk[first[ok]]
+    c2[blk[second[same]]] = cd[second[same]]
+    return c1, c2, has
+
+
+def block_stats(values, block_size: int, tol: float, *,
+                resolution: float | None = RESOLUTION) -> BlockStats:
+    """
+    Typetall, senter, inkluderingsmaske og filtrert middel for alle blokker.
+
+    Parameters
+    ----------
+    values : 1-D array
+        Bunnverdier i testrekkefølge.
+    block_size : int
+        Tester per blokk; siste blokk kan være kortere.
+    tol : float
+        ± grense rundt senter.
+    resolution : float | None
+        Bøttebredde for typetall (0.1° som i analyser_ring). None bruker
+        eksakte verdier som i main_store_JSON_testserie.
+    """
+    vals = np.asarray(values, float)
+    n = vals.size
+    n_blocks = -(-n // block_size)
+    block_id = np.arange(n) // block_size
+    finite = np.isfinite(vals)
+
+    mode1 = np.full(n_blocks, np.nan)
+    mode2 = np.full(n_blocks, np.nan)
+    if finite.any():
+        code, code_vals = _codes(vals[finite], resolution)
+        c1, c2, has = _top2(block_id[finite], code, n_blocks, code_vals.size)
+        mode1[has] = code_vals[c1[has]]
+        mode2[has] = code_vals[c2[has]]
+    center = (mode1 + mode2) / 2
+
+    # (n_blocks, block_size) med NaN-utfylling for siste blokk
+    padded = np.full(n_blocks * block_size, np.nan)
+    padded[:n] = vals
+    padded = padded.reshape(n_blocks, block_size)
+    keep2d = np.abs(padded - center[:, None]) <= tol
+    n_keep = keep2d.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        mean = np.where(keep2d, padded, 0.0).sum(axis=1) / n_keep
+    mean[n_keep == 0] = np.nan
+
+    keep = keep2d.reshape(-1)[:n]
+    sizes = np.minimum(block_size, n - np.arange(n_blocks) * block_size)
+    return BlockStats(block_size, mode1, mode2, center, mean,
+                      sizes - n_keep, keep)
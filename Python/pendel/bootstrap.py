@@ -0,0 +1,198 @@
+"""
+Usikkerhet for η̄ og indre variasjon (maks–min mellom blokkene).
+
+`analyze()` gir ett tall for η̄ og bestått/ikke bestått for range. Her
+anslås usikkerheten ved gjensampling, med nøyaktig samme blokkfilter
+(block_stats: typetall, senter, ±tol) brukt på hver gjensampling:
+
+*  bootstrap     – runs trekkes med tilbakelegging *innen* hver blokk
+                   (blokkene er rotasjoner av ringen og beholdes).
+                   Skjevhetskorrigert persentilintervall (BC) for η̄ og
+                   for range – maks–min er skjev oppover under
+                   gjensampling, og typetallsfilteret gjør η̄ diskret,
+                   så rene persentiler kan bomme på selve estimatet.
+*  permutasjon   – runs stokkes *mellom* blokkene (nullhypotese: ingen
+                   forskjell mellom rotasjonene). Gir hvilken range som
+                   bare skyldes spredning (nivå-kvantilen) og p-verdien
+                   for observert range.
+
+Alle gjensamplinger i en bit behandles som én NumPy-operasjon: indeksene
+trekkes som en (n, n_runs)-matrise, og hver gjensampling blir egne
+blokker i ett block_stats-kall. Bitene (maks BOOT_CHUNK_VALUES verdier)
+kan fordeles på en prosesspool (BOOT_WORKERS). Hver bit har sin egen
+frø-strøm fra SeedSequence(seed), så resultatet er det samme uansett
+antall arbeidere.
+
+    python -m pendel.bootstrap ringmappe [--resamples 10000] [--seed 2024]
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+
+from .block_stats import block_stats
+from . import profiling
+
+# -----------------------------  PARAMETRE  -----------------------------
+N_RESAMPLES = 10_000         # gjensamplinger per metode
+CI_LEVEL    = 0.95           # konfidensnivå
+SEED        = 2024           # fast frø → reproduserbare intervaller
+BOOT_CHUNK_VALUES = 500_000  # verdier per bit (~130 B hver → ~65 MB)
+BOOT_WORKERS = 1             # prosesser (None → alle kjerner)
+# -----------------------------------------------------------------------
+
+
+class Intervals(NamedTuple):
+    level: float
+    n_resamples: int
+    seed: int
+    eta_lo: float            # bootstrap-intervall for η̄
+    eta_hi: float
+    eta_se: float            # bootstrap-standardfeil for η̄
+    range_lo: float          # bootstrap-intervall for maks–min
+    range_hi: float
+    range_null: float        # permutasjon: nivå-kvantil av range uten blokkeffekt
+    range_p: float           # permutasjon: P(range ≥ observert | ingen blokkeffekt)
+
+
+def _stats(vals: np.ndarray, block_size: int, tol: float):
+    """(η̄, range) per rad i vals (n, n_runs) – ett block_stats-kall."""
+    n = vals.shape[0]
+    means = block_stats(vals.reshape(-1), block_size, tol).mean.reshape(n, -1)
+    finite = np.isfinite(means)
+    with np.errstate(invalid="ignore"):
+        eta = np.where(finite, means, 0.0).sum(axis=1) / finite.sum(axis=1)
+    rng = (np.where(finite, means, -np.inf).max(axis=1)
+           - np.where(finite, means, np.inf).min(axis=1))
+    rng[~finite.any(axis=1)] = np.nan
+    return eta, rng
+
+
+def _bc_interval(boot: np.ndarray, estimate: float, level: float):
+    """Skjevhetskorrigert persentilintervall (Efron BC)."""
+    boot = boot[np.isfinite(boot)]
+    if not boot.size or not np.isfinite(estimate):
+        return np.nan, np.nan
+    nd = NormalDist()
+    frac = ((boot < estimate).sum() + 0.5 * (boot == estimate).sum()) / boot.size
+    frac = min(max(frac, 1 / (boot.size + 1)), boot.size / (boot.size + 1))
+    z0 = nd.inv_cdf(frac)
+    za = nd.inv_cdf((1 + level) / 2)
+    q = [nd.cdf(2 * z0 - za), nd.cdf(2 * z0 + za)]
+    return tuple(float(v) for v in np.quantile(boot, q))
+
+
+def _chunk(args) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Én bit: (bootstrap-η̄, bootstrap-range, permutasjons-range)."""
+    vals, block_size, tol, n, seed = args
+    rng = np.random.default_rng(seed)
+    n_runs = vals.size
+    n_blocks = n_runs // block_size
+    base = np.arange(n_blocks).repeat(block_size) * block_size
+    idx = base + rng.integers(0, block_size, (n, n_runs))
+    eta_b, range_b = _stats(vals[idx], block_size, tol)
+    perm = rng.permuted(np.broadcast_to(vals, (n, n_runs)), axis=1)
+    _, range_p = _stats(perm, block_size, tol)
+    return eta_b, range_b, range_p
+
+
+def ring_intervals(trough_vals, block_size: int, tol: float, *,
+                   range_metric: float | None = None,
+                   n_resamples: int | None = None, level: float | None = None,
+                   seed: int | None = None,
+                   workers: int | None = BOOT_WORKERS) -> Intervals:
+    """
+    Bootstrap- og permutasjonsintervaller for én ring.
+
+    Parameters
+    ----------
+    trough_vals : 1-D array
+        Første bunnpunkt per run; antall må være delelig med block_size.
+    range_metric : float | None
+        Observert maks–min (fra compute_ring); None → beregnes her.
+    n_resamples, level, seed : None → N_RESAMPLES, CI_LEVEL, SEED
+    workers : int | None
+        Prosesser for bitene (1: i denne prosessen, None: alle kjerner).
+    """
+    vals = np.asarray(trough_vals, float)
+    if vals.size == 0 or vals.size % block_size:
+        raise ValueError(f"Antall runs ({vals.size}) må være delelig med "
+                         f"block_size={block_size}")
+    n_resamples = n_resamples or N_RESAMPLES
+    level = level or CI_LEVEL
+    seed = SEED if seed is None else seed
+    eta_obs, range_obs = (float(v[0]) for v in _stats(vals[None], block_size, tol))
+    if range_metric is None:
+        range_metric = range_obs
+
+    chunk = max(1, BOOT_CHUNK_VALUES // vals.size)
+    sizes = [min(chunk, n_resamples - s) for s in range(0, n_resamples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(vals, block_size, tol, n, s) for n, s in zip(sizes, seeds)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with profiling.span("bootstrap", resamples=n_resamples, workers=workers):
+        if workers <= 1:
+            parts = [_chunk(j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(workers) as ex:
+                parts = list(ex.map(_chunk, jobs))
+    eta_b, range_b, range_p = (np.concatenate(p) for p in zip(*parts))
+
+    eta_lo, eta_hi = _bc_interval(eta_b, eta_obs, level)
+    range_lo, range_hi = _bc_interval(range_b, range_metric, level)
+    null = range_p[np.isfinite(range_p)]
+    return Intervals(
+        level=level, n_resamples=n_resamples, seed=seed,
+        eta_lo=eta_lo, eta_hi=eta_hi,
+        eta_se=float(np.nanstd(eta_b, ddof=1)),
+        range_lo=range_lo, range_hi=range_hi,
+        range_null=float(np.quantile(null, level)) if null.size else np.nan,
+        range_p=float((1 + (null >= range_metric - 1e-12).sum()) / (1 + null.size)),
+    )
+
+
+def summary_lines(ci: Intervals, *, overall_mean: float,
+                  range_metric: float) -> list[str]:
+    """Tekstlinjer for konsoll og tekstpanelet i testresultat-figuren."""
+    pct = f"{ci.level:.0%}"
+    return [
+        f"η̄ = {overall_mean:.3f}°, {pct}-KI [{ci.eta_lo:.3f}, {ci.eta_hi:.3f}]° "
+        f"(SE {ci.eta_se:.3f}°)",
+        f"Range = {range_metric:.3f}°, {pct}-KI [{ci.range_lo:.3f}, {ci.range_hi:.3f}]°, "
+        f"uten blokkeffekt ≤ {ci.range_null:.3f}° (p = {ci.range_p:.3f})",
+    ]
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+    import time
+    from pathlib import Path
+
+    p = argparse.ArgumentParser(description="Bootstrap-/permutasjonsintervaller for én ring")
+    p.add_argument("directory")
+    p.add_argument("--block-size", type=int, default=15)
+    p.add_argument("--tol", type=float, default=0.3)
+    p.add_argument("--resamples", type=int, default=N_RESAMPLES)
+    p.add_argument("--level", type=float, default=CI_LEVEL)
+    p.add_argument("--seed", type=int, default=SEED)
+    p.add_argument("--workers", type=int, default=BOOT_WORKERS)
+    args = p.parse_args()
+
+    from .analyser_ring import load_troughs
+    trough_vals = load_troughs(Path(args.directory))[0]
+    blocks = block_stats(trough_vals, args.block_size, args.tol)
+    t0 = time.perf_counter()
+    ci = ring_intervals(trough_vals, args.block_size, args.tol,
+                        n_resamples=args.resamples, level=args.level,
+                        seed=args.seed, workers=args.workers)
+    dt = time.perf_counter() - t0
+    means = blocks.mean[np.isfinite(blocks.mean)]
+    print("\n".join(summary_lines(ci, overall_mean=float(means.mean()),
+                                  range_metric=float(np.ptp(means)))))
+    print(f"\n{ci.n_resamples} gjensamplinger × 2 på {dt:.2f} s")
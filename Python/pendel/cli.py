@@ -0,0 +1,198 @@
+"""
+Kommandolinje for pendelriggen.
+
+    pendel acquire [utdatamappe] [--port COM13] [--series]
+    pendel acquire --rig COM13:7:data/ring7 --rig COM14:12:data/ring12
+    pendel analyze [ringmappe] [--name ring7] [--block-size 15] [--tol 0.3] [--bounces]
+    pendel compare [ring_results.csv | rotmappe] [--db [--block-size 15 --tol 0.3]]
+    pendel results history 7 | summary [--by ring round] | latest | rings
+    pendel analyze data/ring7 --no-show --profile [--profile-dir profiler]
+
+(også som pendel-acquire / pendel-analyze / pendel-compare)
+
+Bare argparse lastes ved oppstart. numpy, matplotlib, pandas og pyserial
+importeres først inne i underkommandoen som trenger dem, så `--help` og
+feil i argumentene svarer umiddelbart.
+"""
+
+import os
+import sys
+import argparse
+
+# underkommando → moduler den laster (brukes også av bench.startup_times)
+COMMAND_MODULES = {
+    "acquire": ("pendel.main_store_JSON_testserie", "pendel.multirig"),
+    "analyze": ("pendel.analyser_ring",),
+    "compare": ("pendel.Sammenligning",),
+    "results": ("pendel.resultdb",),
+}
+
+
+# =======================================================================
+#  UNDERKOMMANDOER  ------------------------------------------------------
+# =======================================================================
+def _acquire(args) -> None:
+    from . import main_store_JSON_testserie as acq
+    if args.no_live:                           # ingen live-figur
+        acq.enable_live_plot = False
+    if args.rig or args.config:
+        from .multirig import RigConfig, load_config, run_rigs
+        configs = load_config(args.config) if args.config else []
+        configs += [RigConfig(*r.split(":", 2)) for r in args.rig]
+        if len({c.ring for c in configs}) != len(configs):
+            sys.exit("ringID må være unik per rigg")
+        try:
+            run_rigs(configs)
+        except KeyboardInterrupt:
+            print("\nAvbrutt av bruker.")
+        return
+
+    acq.main(args.outdir, port=args.port or acq.COM_PORT,
+             series=True if args.series else None)
+
+
+def _analyze(args) -> None:
+    from . import analyser_ring as ar
+    if args.outdir is None:                    # interaktivt som før
+        ar.main()
+        return
+    if args.bounces:                           # sprett 1–3, δ, energitap
+        ar.enable_3_vinkelutslag = ar.enable_angle_diff = True
+    if args.spectral:                          # periode og dempning (FFT)
+        ar.enable_spectral = True
+    if args.no_env:                            # ingen miljøkorrigert η̄
+        ar.enable_env_model = False
+    if args.resamples is not None or args.seed is not None or args.boot_workers:
+        from . import bootstrap                # KI for η̄ og range
+        if args.resamples == 0:
+            ar.enable_bootstrap = False
+        bootstrap.N_RESAMPLES = args.resamples or bootstrap.N_RESAMPLES
+        bootstrap.SEED = bootstrap.SEED if args.seed is None else args.seed
+        bootstrap.BOOT_WORKERS = args.boot_workers or bootstrap.BOOT_WORKERS
+    if args.workers is not None:               # parallell JSON-innlesing
+        from . import parallel_load
+        parallel_load.LOAD_WORKERS = args.workers
+    ar.analyze(args.outdir, args.name or os.path.basename(os.path.normpath(args.outdir)),
+               block_size=args.block_size or ar.DEFAULT_BLOCK_SIZE,
+               tol=args.tol or ar.DEFAULT_TOL,
+               range_tol=args.range_tol,
+               plot_first_bounce=args.plot,
+               show=not args.no_show, save_to=args.save,
+               formats=tuple(args.format))
+
+
+def _compare(args) -> None:
+    from .Sammenligning import main as compare_main
+    compare_main(args.source, from_db=args.db, block_size=args.block_size,
+                 tol=args.tol, range_tol=args.range_tol, trough=args.trough)
+
+
+def _results(args) -> None:
+    from .resultdb import run_query
+    run_query(args)
+
+
+# =======================================================================
+#  PARSER  ---------------------------------------------------------------
+# =======================================================================
+def _profile_arguments(parser: argparse.ArgumentParser, profile, profile_dir) -> None:
+    parser.add_argument("--profile", action="store_true", default=profile,
+                        help="mål tid per trinn; Chrome-trace + sammendrag til --profile-dir")
+    parser.add_argument("--profile-dir", default=profile_dir,
+                        help="mappe for profilfilene (standard profiler/)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="pendel", description="Pendelrigg: innsamling og analyse")
+    _profile_arguments(p, False, "profiler")
+    # også etter underkommandoen (pendel-analyze --profile …); SUPPRESS så
+    # underkommandoen ikke overskriver verdien fra før den
+    prof = argparse.ArgumentParser(add_help=False)
+    _profile_arguments(prof, argparse.SUPPRESS, argparse.SUPPRESS)
+    sub = p.add_subparsers(dest="command", required=True)
+
+    a = sub.add_parser("acquire", help="datainnsamling fra ESP32", parents=[prof])
+    a.add_argument("outdir", nargs="?", help="utdatamappe (spørres om hvis utelatt)")
+    a.add_argument("--port", default=None, help="serieport (standard COM_PORT)")
+    a.add_argument("--series", action="store_true", help="testserie med rotasjoner")
+    a.add_argument("--rig", action="append", default=[], metavar="PORT:RING:OUTDIR",
+                   help="flere rigger samtidig (kan gjentas)")
+    a.add_argument("--config", default=None, help="JSON-fil med rigger (multirig)")
+    a.add_argument("--no-live", action="store_true",
+                   help="ingen levende førstesprett-figur under innsamlingen")
+    a.set_defaults(func=_acquire)
+
+    z = sub.add_parser("analyze", help="η-analyse av én ring", parents=[prof])
+    z.add_argument("outdir", nargs="?", help="ringmappe (interaktivt hvis utelatt)")
+    z.add_argument("--name", default=None)
+    z.add_argument("--block-size", type=int, default=None)
+    z.add_argument("--tol", type=float, default=None)
+    z.add_argument("--range-tol", type=float, default=0.4)
+    z.add_argument("--plot", action="store_true", help="tegn testresultat-figuren")
+    z.add_argument("--bounces", action="store_true",
+                   help="sprett 1–3, log. dekrement og energitap (tabell + figurer)")
+    z.add_argument("--spectral", action="store_true",
+                   help="periode og dempning per run og blokk fra spektraltoppen")
+    z.add_argument("--no-env", action="store_true",
+                   help="ikke oppdater miljømodellen / vis korrigert η̄")
+    z.add_argument("--resamples", type=int, default=None,
+                   help="bootstrap-/permutasjonsgjensamplinger (0: ingen KI; standard 10000)")
+    z.add_argument("--seed", type=int, default=None, help="frø for gjensamplingen")
+    z.add_argument("--boot-workers", type=int, default=None,
+                   help="prosesser for gjensamplingen (standard 1)")
+    z.add_argument("--workers", type=int, default=None,
+                   help="prosesser for JSON-innlesing (standard: alle kjerner)")
+    z.add_argument("--no-show", action="store_true", help="ingen vindu (hodeløst)")
+    z.add_argument("--save", default=None, help="lagre figuren i denne mappen")
+    z.add_argument("--format", nargs="+", default=["png"])
+    z.set_defaults(func=_analyze)
+
+    c = sub.add_parser("compare", help="sammenlign ringer (resultattabell)",
+                       parents=[prof])
+    c.add_argument("source", nargs="?", default=None,
+                   help="ring_results.csv eller rotmappe som analyseres først")
+    c.add_argument("--db", action="store_true",
+                   help="siste resultat per ring/runde fra resultatdatabasen")
+    c.add_argument("--block-size", type=int, default=None, help="filter for --db")
+    c.add_argument("--tol", type=float, default=None, help="filter for --db")
+    c.add_argument("--range-tol", type=float, default=None, help="filter for --db")
+    c.add_argument("--trough", default=None, choices=["raw", "resampled"],
+                   help="bunnpunktmetode for --db (standard: analysens gjeldende)")
+    c.set_defaults(func=_compare)
+
+    from .resultdb import add_arguments
+    r = sub.add_parser("results", help="historikk og aggregater fra resultatdatabasen",
+                       parents=[prof])
+    add_arguments(r)
+    r.set_defaults(func=_results)
+    return p
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        args.func(args)
+        return
+    import importlib
+    from . import profiling
+    profiling.enable()
+    try:
+        with profiling.span(args.command):
+            with profiling.span("import"):
+                for module in COMMAND_MODULES.get(args.command, ()):
+                    importlib.import_module(module)
+            args.func(args)
+    finally:
+        profiling.report(args.profile_dir)
+
+
+def acquire(argv: list[str] | None = None) -> None:
+    main(["acquire", *(sys.argv[1:] if argv is None else argv)])
+
+
+def analyze(argv: list[str] | None = None) -> None:
+    main(["analyze", *(sys.argv[1:] if argv is None else argv)])
+
+
+def compare(argv: list[str] | None = None) -> None:
+    main(["compare", *(sys.argv[1:] if argv is None else argv)])
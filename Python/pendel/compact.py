@@ -0,0 +1,219 @@
+"""
+Kompakt lagring av alle runs for én ring i minnet.
+
+Encoder-verdiene fra ESP32 er kvantiserte pulstall (totalPulses / CPR *
+360) og tidene er heltall millisekunder, men `load_dataset` holder dem
+som float64-arrays i lister (16 B per sample). `RunSet` lagrer i stedet
+rådataene flatt i `array.array` (CSR-aktig, som runstore):
+
+    pulses    int16 (int32 når et run ikke får plass)   pulstall
+    dt        uint16 (uint32 ved lange pauser)          tids-delta [ms]
+    offsets   int64, lengde n_runs + 1                   start per run
+    t0        int64                                      første tid per run
+    temps, hums, names
+
+med én felles skala (cpr). Det gir 4 B per sample, og ingen Python-
+objekter per run. Grader og float64-tid regnes først ut ved analysen:
+`enc_list` / `t_list` er late visninger som gir nøyaktig de samme
+float64-arrayene som før (p / cpr * 360 er eksakt for CPR = 2048), så
+eksisterende kode (alignment, extrema, …) kan bruke dem uendret.
+
+Runs som ikke er tapsfritt kvantiserbare (annen skala, ikke-heltallig
+eller synkende tid) lagres som float64 ved siden av, og gir samme
+visning.
+"""
+
+import os
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+from .binframe import CPR
+
+_INT = {"h": np.int16, "i": np.int32}
+_UINT = {"H": np.uint16, "I": np.uint32}
+
+
+class RunView(Sequence):
+    """Late float64-visning (enc_list eller t_list) av en RunSet."""
+
+    __slots__ = ("_runs", "_get")
+
+    def __init__(self, runs: "RunSet", get):
+        self._runs = runs
+        self._get = get
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._get(k) for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._get(i)
+
+
+class RunSet:
+    """
+    Parameters
+    ----------
+    cpr : int
+        Pulser per omdreining; grader = pulstall / cpr * 360.
+
+    Eksempel
+    --------
+    runs = RunSet.from_lists(enc_list, t_list, temps, hums, names)
+    t_new, enc = align_and_resample(runs.enc_list, runs.t_list)
+    """
+
+    __slots__ = ("cpr", "pulses", "dt", "offsets", "t0", "temps", "hums",
+                 "names", "_float")
+
+    def __init__(self, cpr: int = CPR):
+        self.cpr = cpr
+        self.pulses = array("h")
+        self.dt = array("H")
+        self.offsets = array("q", [0])
+        self.t0 = array("q")
+        self.temps = array("d")
+        self.hums = array("d")
+        self.names: list[str] = []
+        self._float: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.t0)
+
+    # ---------------- innlegging --------------------------------------
+    def append_pulses(self, pulses, t_ms, temp: float = np.nan,
+                      hum: float = np.nan, name: str = "") -> None:
+        """Legg til ett run som rå pulstall og heltalls-ms."""
+        p = np.asarray(pulses, np.int64)
+        t = np.asarray(t_ms, np.int64)
+        d = np.diff(t, prepend=t[:1])
+        if d.size and d.min() < 0:
+            raise ValueError("tiden må være stigende")
+        if p.size and self.pulses.typecode == "h" and (
+                p.min() < -2**15 or p.max() >= 2**15):
+            self.pulses = array("i", self.pulses)
+        if d.size and self.dt.typecode == "H" and d.max() >= 2**16:
+            self.dt = array("I", self.dt)
+        self.pulses.frombytes(p.astype(_INT[self.pulses.typecode]).tobytes())
+        self.dt.frombytes(d.astype(_UINT[self.dt.typecode]).tobytes())
+        self.offsets.append(self.offsets[-1] + p.size)
+        self.t0.append(int(t[0]) if t.size else 0)
+        self.temps.append(temp)
+        self.hums.append(hum)
+        self.names.append(str(name))
+
+    def append(self, enc, t, temp: float = np.nan, hum: float = np.nan,
+               name: str = "") -> bool:
+        """
+        Legg til ett run i grader / float-ms. Returnerer True hvis det
+        ble lagret kompakt, False hvis det måtte lagres som float64.
+        """
+        enc = np.asarray(enc, float)
+        t = np.asarray(t, float)
+        p = np.rint(enc / 360 * self.cpr)
+        ok = (enc.size == t.size and np.array_equal(p / self.cpr * 360, enc)
+              and np.array_equal(np.rint(t), t)
+              and not (np.diff(t) < 0).any())
+        if ok:
+            self.append_pulses(p, t, temp, hum, name)
+            return True
+        self._float[len(self)] = (enc.copy(), t.copy())
+        self.append_pulses(np.zeros(0), np.zeros(0), temp, hum, name)
+        return False
+
+    @classmethod
+    def from_lists(cls, enc_list, t_list, temps, hums, names=None, *,
+                   cpr: int = CPR) -> "RunSet":
+        runs = cls(cpr)
+        names = names if names is not None else [""] * len(enc_list)
+        for args in zip(enc_list, t_list, temps, hums, names):
+            runs.append(*args)
+        return runs
+
+    # ---------------- visning -----------------------------------------
+    def _slice(self, buf: array, dtypes: dict, i: int) -> np.ndarray:
+        s, e = self.offsets[i], self.offsets[i + 1]
+        return np.frombuffer(buf, dtypes[buf.typecode], e - s, s * buf.itemsize)
+
+    def pulse_counts(self, i: int) -> np.ndarray:
+        """Rå pulstall for run i (kopi, int64)."""
+        return self._slice(self.pulses, _INT, i).astype(np.int64)
+
+    def encoder(self, i: int) -> np.ndarray:
+        """Vinkel [°] for run i som float64 (som firmware: p / CPR * 360)."""
+        if i in self._float:
+            return self._float[i][0]
+        return self._slice(self.pulses, _INT, i) / self.cpr * 360
+
+    def time(self, i: int) -> np.ndarray:
+        """Tid [ms] for run i som float64."""
+        if i in self._float:
+            return self._float[i][1]
+        d = self._slice(self.dt, _UINT, i)
+        return (self.t0[i] + np.cumsum(d, dtype=np.int64)).astype(float)
+
+    @property
+    def enc_list(self) -> RunView:
+        return RunView(self, self.encoder)
+
+    @property
+    def t_list(self) -> RunView:
+        return RunView(self, self.time)
+
+    @property
+    def nbytes(self) -> int:
+        """Minne i arrayene (uten float64-reserven for ukvantiserte runs)."""
+        return sum(a.itemsize * len(a) for a in (self.pulses, self.dt, self.offsets,
+                                                 self.t0, self.temps, self.hums))
+
+    @property
+    def n_float(self) -> int:
+        """Antall runs lagret som float64."""
+        return len(self._float)
+
+
+def pack_dataset(directory: str | os.PathLike, *,
+                 cache=True) -> tuple[RunSet, np.ndarray]:
+    """
+    Les en ring (JSON-mappe eller runstore) bit for bit rett inn i en
+    RunSet, så float64-kopien aldri finnes for hele ringen samtidig.
+
+    Returns
+    -------
+    runs    : RunSet
+    min_idx : np.ndarray, indeks til første minimum per run
+    """
+    from .runcache import iter_dataset
+    runs = RunSet()
+    min_idx = [np.zeros(0, np.int64)]
+    for enc_list, t_list, temps, hums, names, idx in iter_dataset(directory,
+                                                                  cache=cache):
+        for args in zip(enc_list, t_list, temps, hums, names):
+            runs.append(*args)
+        min_idx.append(np.asarray(idx, np.int64))
+    return runs, np.concatenate(min_idx)
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Minnebruk: kompakt vs. float64")
+    p.add_argument("directory")
+    args = p.parse_args()
+
+    runs, _ = pack_dataset(args.directory)
+    n_samples = runs.offsets[-1] + sum(e.size for e, _ in runs._float.values())
+    f64 = 16 * n_samples
+    print(f"{len(runs)} runs, {n_samples} samples: {runs.nbytes / 2**20:.1f} MiB "
+          f"kompakt mot {f64 / 2**20:.1f} MiB float64 "
+          f"({runs.nbytes / f64:.0%}), {runs.n_float} ukvantiserte")
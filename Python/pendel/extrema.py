@@ -0,0 +1,179 @@
+"""
+Alle topp- og bunnpunkter i alle runs i ett vektorisert pass.
+
+Pendelen svinger om 0 (hvilestilling). En halvsving varer fra armen
+passerer ±HYSTERESIS til den passerer båndet på motsatt side, og har
+nøyaktig ett ekstremum. På den fasejusterte encoder-matrisen
+(align_and_resample):
+
+1) tilstand +1/-1 utenfor båndet, 0 innenfor – fylt fremover, så støy
+   rundt 0 ikke starter nye halvsvinger
+2) halvsvingene nummereres over hele (flate) matrisen, og maks |vinkel|
+   per halvsving finnes med np.maximum.reduceat
+3) toppunktet justeres med parabel gjennom nabosamplene (sub-sample)
+
+Ufullstendige halvsvinger (ved kanten av matrisen eller der armen ikke
+har snudd før dataene slutter) tas ikke med.
+
+Resultatet lagres «ragged» som i CSR: flate arrays for alle ekstremer og
+`offsets`, så run r er [offsets[r], offsets[r+1]). Av ekstremene avledes
+sprettvinkler, logaritmisk dekrement og energitap per sprett.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+# -----------------------------  PARAMETRE  -----------------------------
+HYSTERESIS = 1.0        # ± bånd [°] rundt 0 som må krysses for ny halvsving
+N_BOUNCES  = 3          # sprett som rapporteres (vinkel 1–3)
+# -----------------------------------------------------------------------
+
+
+class Extrema(NamedTuple):
+    offsets: np.ndarray      # (n_runs + 1,)
+    index: np.ndarray        # (n_ext,) kolonne i encoder-matrisen
+    time: np.ndarray         # (n_ext,) [ms], sub-sample
+    value: np.ndarray        # (n_ext,) fortegnsbevart vinkel [°], sub-sample
+
+    @property
+    def n_runs(self) -> int:
+        return self.offsets.size - 1
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Antall ekstremer per run."""
+        return np.diff(self.offsets)
+
+    @property
+    def is_peak(self) -> np.ndarray:
+        """True for topp (positiv vinkel), False for bunn."""
+        return self.value > 0
+
+    def run(self, r: int) -> tuple[np.ndarray, np.ndarray]:
+        """(tid, vinkel) for alle ekstremer i run r."""
+        s, e = self.offsets[r], self.offsets[r + 1]
+        return self.time[s:e], self.value[s:e]
+
+    def rank(self) -> np.ndarray:
+        """0-basert nummer på hvert ekstremum innen sitt run."""
+        runs = np.repeat(np.arange(self.n_runs), self.counts)
+        return np.arange(self.value.size) - self.offsets[runs]
+
+    def amplitudes(self, n: int) -> np.ndarray:
+        """|vinkel| for de n første ekstremene, (n_runs, n) med NaN-utfylling."""
+        out = np.full((self.n_runs, n), np.nan)
+        runs = np.repeat(np.arange(self.n_runs), self.counts)
+        k = self.rank()
+        sel = k < n
+        out[runs[sel], k[sel]] = np.abs(self.value[sel])
+        return out
+
+
+# =======================================================================
+#  EKSTREMER  ------------------------------------------------------------
+# =======================================================================
+def find_extrema(t_new: np.ndarray, encoder: np.ndarray, *,
+                 hysteresis: float = HYSTERESIS) -> Extrema:
+    """
+    Alle topp- og bunnpunkter i den fasejusterte encoder-matrisen.
+
+    Parameters
+    ----------
+    t_new : np.ndarray
+        Felles tidsakse (jevnt samplet).
+    encoder : np.ndarray (n_runs, t_new.size)
+        Fra align_and_resample / process_dataset.
+    hysteresis : float
+        Bånd [°] rundt 0 som må krysses før neste halvsving begynner.
+    """
+    x = np.asarray(encoder, float)
+    n_runs, w = x.shape
+    if w < 3 or n_runs == 0:
+        empty = np.zeros(0)
+        return Extrema(np.zeros(n_runs + 1, np.int64), empty.astype(np.int64),
+                       empty, empty)
+
+    # ---------- tilstand med hysterese, fylt fremover ------------------
+    state = np.where(x > hysteresis, 1, np.where(x < -hysteresis, -1, 0))
+    last = np.where(state != 0, np.arange(w), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    state = np.take_along_axis(state, last, axis=1)     # 0 før første utslag
+
+    # ---------- halvsvinger over hele den flate matrisen ---------------
+    change = np.ones((n_runs, w), bool)
+    change[:, 1:] = state[:, 1:] != state[:, :-1]
+    change = change.ravel()
+    starts = np.flatnonzero(change)
+    seg_id = np.cumsum(change) - 1
+    seg_end = np.r_[starts[1:], n_runs * w] - 1
+
+    v = (state * x).ravel()                  # utslag i svingens retning
+    seg_max = np.maximum.reduceat(v, starts)
+    seg_state = state.ravel()[starts]
+
+    # første posisjon med segmentmaks
+    pos = np.flatnonzero(v == seg_max[seg_id])
+    seg = seg_id[pos]
+    first = np.r_[True, seg[1:] != seg[:-1]]
+    pos, seg = pos[first], seg[first]
+    row, col = np.divmod(pos, w)
+
+    # ---------- bare fullførte halvsvinger -----------------------------
+    ends_in_row = seg_end[seg] % w != w - 1           # snudde til andre side
+    turned = seg_max[seg] - v[seg_end[seg]] >= hysteresis
+    ok = ((seg_state[seg] != 0) & (col > 0) & (col < w - 1)
+          & (ends_in_row | turned))
+    pos, row, col, sgn = pos[ok], row[ok], col[ok], seg_state[seg[ok]]
+
+    # ---------- parabolsk sub-sample-justering -------------------------
+    v0, v1, v2 = v[pos - 1], v[pos], v[pos + 1]
+    den = v0 - 2 * v1 + v2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = np.where(den < 0, 0.5 * (v0 - v2) / den, 0.0)
+    peak = v1 - 0.25 * (v0 - v2) * p
+    dt = t_new[1] - t_new[0]
+
+    offsets = np.searchsorted(row, np.arange(n_runs + 1))
+    return Extrema(offsets, col, t_new[col] + p * dt, sgn * peak)
+
+
+# =======================================================================
+#  AVLEDEDE STØRRELSER  --------------------------------------------------
+# =======================================================================
+def bounce_angles(ext: Extrema, n: int = N_BOUNCES) -> np.ndarray:
+    """Utslag [°] etter sprett 1…n per run, (n_runs, n) med NaN."""
+    return ext.amplitudes(n)
+
+
+def log_decrement(ext: Extrema, n: int | None = None) -> np.ndarray:
+    """
+    Logaritmisk dekrement δ per run (per hel periode).
+
+    δ = 2 · middel av ln(A_k / A_k+1) over påfølgende halvsvinger, fra de
+    n første ekstremene (alle hvis n er None). NaN med færre enn 2.
+    """
+    same = np.diff(np.repeat(np.arange(ext.n_runs), ext.counts)) == 0
+    k = ext.rank()[:-1]
+    if n is not None:
+        same &= k < n - 1
+    a = np.abs(ext.value)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lr = np.log(a[:-1] / a[1:])
+    runs = np.repeat(np.arange(ext.n_runs), ext.counts)[:-1][same]
+    total = np.bincount(runs, lr[same], minlength=ext.n_runs)
+    num = np.bincount(runs, minlength=ext.n_runs)
+    with np.errstate(invalid="ignore"):
+        return np.where(num > 0, 2 * total / num, np.nan)
+
+
+def energy_loss(ext: Extrema, n: int = N_BOUNCES) -> np.ndarray:
+    """
+    Relativt energitap fra sprett k til k+1, (n_runs, n-1).
+
+    Potensiell energi i vendepunktet ∝ 1 - cos(θ), så tapet er
+    1 - (1 - cos θ_k+1) / (1 - cos θ_k).
+    """
+    e = 1.0 - np.cos(np.radians(ext.amplitudes(n)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 1.0 - e[:, 1:] / e[:, :-1]
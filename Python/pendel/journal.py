@@ -0,0 +1,392 @@
+"""
+Krasjsikker innsamlingsjournal per ring.
+
+Hver ferdig test skrives atomisk (``<fil>.tmp`` → os.replace), så en
+JSON-fil på disk er enten komplett eller finnes ikke. Etter hver
+FSYNC_EVERY-te test (og ved slutten av hver rotasjon) fsynces filene og
+mappen, og testene føres i en append-only journal i utdatamappen:
+
+    ring<ID>_journal.jsonl     én JSON-post per linje
+      {"ev": "serie", "base": ..., "tests_per_rot": ..., "rotations": ...}
+      {"ev": "run", "test": 17, "file": ..., "bytes": ..., "crc32": ...}
+      {"ev": "rotert", "rot": 2}          operatøren har rotert ringen
+      {"ev": "karantene", "file": ..., "test": ..., "reason": ...}
+      {"ev": "tilbake", "test": 6}         serien tas på nytt etter test 6
+      {"ev": "ferdig"}
+
+En post som står i journalen er varig på disk. Ved omstart (`recover`):
+
+*  en avkuttet siste linje i journalen kuttes bort
+*  ``*.json.tmp`` (avbrutt skriving) settes i karantene
+*  journalførte filer som mangler eller har feil lengde/CRC settes i
+   karantene og strykes
+*  filer for serien som ikke er journalført (skrevet etter siste fsync)
+   tas med hvis de er gyldig JSON, ellers settes de i karantene
+*  mangler en test midt i serien, settes de senere testene i karantene
+   og serien tas på nytt fra hullet (`rewound`), så hver test havner i
+   riktig rotasjon
+
+`resume_index` er da antall tester som er gjort, og `position` gir
+rotasjon og plass i blokken, så serien fortsetter nøyaktig der den
+stoppet – med samme filnavn (base) og samme rotasjonsplan. En ferdig
+serie kan legges til side med `archive`, så en ny serie for ringen får
+en ny journal.
+"""
+
+import os
+import re
+import json
+import zlib
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from .runstore import (natural_key, list_json_files, parse_run, quarantine,
+                       BAD_RUN_ERRORS)
+
+# -----------------------------  PARAMETRE  -----------------------------
+FSYNC_EVERY  = 5                        # tester per fsync av filer + journal
+JOURNAL_NAME = "ring{ring}_journal.jsonl"
+TMP_SUFFIX   = ".tmp"
+# -----------------------------------------------------------------------
+
+
+def write_atomic(path: str | os.PathLike, payload: bytes, *,
+                 fsync: bool = False) -> None:
+    """Skriv via <path>.tmp + os.replace: filen er hel eller fraværende."""
+    tmp = f"{path}{TMP_SUFFIX}"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """fsync av mappen (nye/omdøpte filnavn); ikke mulig på Windows."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _check_run(raw: bytes) -> None:
+    """Kaster BAD_RUN_ERRORS hvis `raw` ikke er et gyldig run."""
+    enc = parse_run(json.loads(raw))[0]
+    if enc.size == 0:
+        raise ValueError("tom encoder-serie")
+
+
+class Journal:
+    """
+    Append-only journal for én ring i `outdir`.
+
+    Parameters
+    ----------
+    outdir : str | PathLike
+        Utdatamappen for ringen.
+    ring : str
+        RingID (journalen heter ring<ID>_journal.jsonl).
+    fsync_every : int
+        Antall tester mellom hver fsync av filer + journal.
+
+    Eksempel
+    --------
+    with Journal(outdir, "7") as jn:
+        jn.begin(base_name, tests_per_rot=20, rotations=5)
+        jn.recover()
+        start = jn.resume_index
+    """
+
+    def __init__(self, outdir: str | os.PathLike, ring: str, *,
+                 fsync_every: int = FSYNC_EVERY, log=print):
+        self.outdir = Path(outdir)
+        self.ring = str(ring)
+        self.path = self.outdir / JOURNAL_NAME.format(ring=self.ring)
+        self.fsync_every = max(1, fsync_every)
+        self.log = log
+        self.header: dict | None = None
+        self.runs: dict[int, dict] = {}        # testnr (1-basert) → post
+        self.rotated: set[int] = set()
+        self.done = False
+        self.rewound = 0                       # senere tester tatt bort av recover()
+        self._pending: list[tuple[Path, dict]] = []
+        self._lock = threading.Lock()
+
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self._read()
+        self._fh = open(self.path, "ab")
+
+    # ---------------- lesing ------------------------------------------
+    def _read(self) -> None:
+        if not self.path.is_file():
+            return
+        raw = self.path.read_bytes()
+        cut = raw.rfind(b"\n") + 1
+        if cut < len(raw):                     # krasj midt i en post
+            with open(self.path, "r+b") as f:
+                f.truncate(cut)
+            self.log(f"Journal: avkuttet siste post fjernet ({len(raw) - cut} B)")
+        for line in raw[:cut].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except ValueError:
+                self.log(f"Journal: ugyldig post hoppet over: {line[:60]!r}")
+
+    def _apply(self, rec: dict) -> None:
+        ev = rec.get("ev")
+        if ev == "serie":
+            self.header = rec
+        elif ev == "run":
+            self.runs[rec["test"]] = rec
+        elif ev == "rotert":
+            self.rotated.add(rec["rot"])
+        elif ev == "karantene":
+            self.runs.pop(rec.get("test"), None)
+        elif ev == "tilbake":                  # rotasjoner etter hullet gjøres på nytt
+            tpr = self.tests_per_rot or 0
+            self.rotated = {r for r in self.rotated if r * tpr <= rec["test"]}
+        elif ev == "ferdig":
+            self.done = True
+
+    def _append(self, records: list[dict]) -> None:
+        """Skriv poster og fsync journalen (kalles med låsen)."""
+        if not records:
+            return
+        self._fh.write(b"".join(json.dumps(r, ensure_ascii=False).encode() + b"\n"
+                                for r in records))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        for r in records:
+            self._apply(r)
+
+    # ---------------- serie -------------------------------------------
+    def begin(self, base_name: str, *, tests_per_rot: int | None = None,
+              rotations: int | None = None) -> dict:
+        """
+        Start (eller gjenoppta) serien. Finnes det allerede en serie i
+        journalen gjelder dens base og rotasjonsplan.
+        """
+        with self._lock:
+            if self.header is None:
+                self._append([dict(ev="serie", ring=self.ring, base=base_name,
+                                   tests_per_rot=tests_per_rot, rotations=rotations,
+                                   started=datetime.now().isoformat(timespec="seconds"))])
+            elif (tests_per_rot, rotations) != (self.header.get("tests_per_rot"),
+                                                self.header.get("rotations")):
+                self.log(f"Journal: beholder rotasjonsplanen fra serien "
+                         f"({self.header.get('tests_per_rot')} × "
+                         f"{self.header.get('rotations')})")
+        return self.header
+
+    @property
+    def base_name(self) -> str:
+        return self.header["base"]
+
+    @property
+    def tests_per_rot(self) -> int | None:
+        return self.header.get("tests_per_rot") if self.header else None
+
+    @property
+    def rotations(self) -> int | None:
+        return self.header.get("rotations") if self.header else None
+
+    @property
+    def resume_index(self) -> int:
+        """0-basert indeks for neste test (= antall tester før første hull)."""
+        n = 0
+        while n + 1 in self.runs:
+            n += 1
+        return n
+
+    def position(self, idx: int | None = None) -> tuple[int, int]:
+        """(rotasjon 1-basert, plass 0-basert i blokken) for test `idx`."""
+        idx = self.resume_index if idx is None else idx
+        tpr = self.tests_per_rot
+        if not tpr:                            # enkelt-modus: én blokk
+            return 1, idx
+        return idx // tpr + 1, idx % tpr
+
+    def needs_rotation(self, idx: int | None = None) -> bool:
+        """True hvis forrige rotasjon er ferdig, men ringen ikke rotert."""
+        idx = self.resume_index if idx is None else idx
+        tpr = self.tests_per_rot
+        if not tpr or idx == 0 or idx % tpr:
+            return False
+        return idx // tpr not in self.rotated and idx < tpr * (self.rotations or 0)
+
+    # ---------------- skriving ----------------------------------------
+    def add_run(self, filepath: str | os.PathLike, payload: bytes) -> None:
+        """Registrer en atomisk skrevet fil; journalføres ved neste fsync."""
+        filepath = Path(filepath)
+        rec = dict(ev="run", test=natural_key(filepath.name), file=filepath.name,
+                   bytes=len(payload), crc32=zlib.crc32(payload))
+        with self._lock:
+            self._pending.append((filepath, rec))
+            if len(self._pending) >= self.fsync_every:
+                self._commit()
+
+    def commit(self) -> None:
+        """fsync ventende filer + mappen og før dem i journalen."""
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        if not self._pending:
+            return
+        for filepath, _ in self._pending:
+            with open(filepath, "r+b") as f:   # skrivetilgang kreves på Windows
+                os.fsync(f.fileno())
+        _fsync_dir(self.outdir)
+        self._append([rec for _, rec in self._pending])
+        self._pending.clear()
+
+    def mark_rotated(self, rot: int) -> None:
+        """Operatøren har rotert ringen etter rotasjon `rot`."""
+        with self._lock:
+            self._commit()
+            self._append([dict(ev="rotert", rot=rot)])
+
+    def finish(self) -> None:
+        with self._lock:
+            self._commit()
+            self._append([dict(ev="ferdig")])
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._fh.close()
+
+    def archive(self) -> Path:
+        """
+        Legg serien til side (ring<ID>_journal_<base>.jsonl) og
+        start med en tom journal, så en ny serie for ringen kan begynne.
+        """
+        with self._lock:
+            self._commit()
+            self._fh.close()
+            dest = self.path.with_name(f"{self.path.stem}_{self.base_name}.jsonl")
+            n = 1
+            while dest.exists():               # behold tidligere utgaver
+                dest = self.path.with_name(f"{self.path.stem}_{self.base_name}.{n}.jsonl")
+                n += 1
+            os.replace(self.path, dest)
+            self.header = None
+            self.runs.clear()
+            self.rotated.clear()
+            self.done = False
+            self.rewound = 0
+            self._fh = open(self.path, "ab")
+        self.log(f"Journal: serien lagt til side som {dest.name}")
+        return dest
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------- gjenoppretting ----------------------------------
+    def _quarantine(self, path: Path, reason: str, test: int | None = None) -> None:
+        quarantine(path, reason, log=self.log)
+        self._append([dict(ev="karantene", file=path.name, test=test,
+                           reason=reason)])
+
+    def recover(self) -> dict:
+        """
+        Kontroller mappen mot journalen etter en omstart (se modulteksten).
+
+        Returns
+        -------
+        dict med antall «ok», «adopted» (gyldige, ikke journalførte) og
+        «quarantined» filer.
+        """
+        if self.header is None:
+            raise RuntimeError("recover() krever begin() først")
+        # bare seriens egne filer (<base>_<n>.json) kan settes i karantene
+        own = re.compile(rf"{re.escape(self.base_name)}_\d+\.json").fullmatch
+        n_ok = n_adopted = n_bad = 0
+        with self._lock:
+            self._commit()
+            # ---------- avbrutt skriving -------------------------------
+            for tmp in sorted(self.outdir.glob(f"*.json{TMP_SUFFIX}")):
+                if own(tmp.name[:-len(TMP_SUFFIX)]):
+                    self._quarantine(tmp, "avbrutt skriving")
+                    n_bad += 1
+
+            # ---------- journalførte filer -----------------------------
+            for test, rec in sorted(self.runs.items()):
+                path = self.outdir / rec["file"]
+                if not path.is_file():
+                    self.log(f"Journal: {rec['file']} mangler – strøket")
+                    self._append([dict(ev="karantene", file=rec["file"],
+                                       test=test, reason="mangler")])
+                    n_bad += 1
+                    continue
+                raw = path.read_bytes()
+                if len(raw) != rec["bytes"] or zlib.crc32(raw) != rec["crc32"]:
+                    self._quarantine(path, "lengde/CRC stemmer ikke med journalen", test)
+                    n_bad += 1
+                else:
+                    n_ok += 1
+
+            # ---------- filer skrevet etter siste fsync ----------------
+            known = {rec["file"] for rec in self.runs.values()}
+            for fn in list_json_files(self.outdir):
+                if not own(fn) or fn in known:
+                    continue
+                path = self.outdir / fn
+                raw = path.read_bytes()
+                try:
+                    _check_run(raw)
+                except BAD_RUN_ERRORS as e:
+                    self._quarantine(path, f"{type(e).__name__}: {e}")
+                    n_bad += 1
+                    continue
+                self._pending.append((path, dict(
+                    ev="run", test=natural_key(fn), file=fn,
+                    bytes=len(raw), crc32=zlib.crc32(raw))))
+                n_adopted += 1
+            self._commit()
+
+            # ---------- hull i serien ----------------------------------
+            resume = self.resume_index
+            later = sorted(t for t in self.runs if t > resume)
+            for test in later:                 # tas på nytt i riktig rotasjon
+                path = self.outdir / self.runs[test]["file"]
+                self._quarantine(path, f"test #{resume + 1} mangler – tas på nytt", test)
+            if later:
+                self._append([dict(ev="tilbake", test=resume)])
+            self.rewound = len(later)
+
+        if n_adopted or n_bad or later:
+            self.log(f"Journal: {n_ok} ok, {n_adopted} tatt med, "
+                     f"{n_bad} i karantene, {len(later)} tas på nytt – "
+                     f"fortsetter etter test #{self.resume_index}")
+        return dict(ok=n_ok, adopted=n_adopted, quarantined=n_bad,
+                    rewound=len(later))
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Kontroller/gjenopprett innsamlingsjournal")
+    p.add_argument("outdir")
+    p.add_argument("ring")
+    args = p.parse_args()
+
+    with Journal(args.outdir, args.ring) as jn:
+        if jn.header is None:
+            raise SystemExit(f"Ingen journal for ring {args.ring} i {args.outdir}")
+        res = jn.recover()
+        rot, k = jn.position()
+        print(f"Serie {jn.base_name}: {jn.resume_index} tester, "
+              f"rotasjon {rot} (plass {k}), "
+              f"{'ferdig' if jn.done else 'ikke ferdig'} | {res}")
@@ -0,0 +1,333 @@
+"""
+Levende visning av førstesprett under datainnsamling.
+
+Operatøren ser bunnverdien for hvert run, blokksentrene og temp/RH mens
+testene pågår, i stedet for bare RAW-linjer frem til stats() tegner til
+slutt. Samme utseende som testresultat-figuren (analyser_ring).
+
+Visningen kjører i en egen prosess med lavere prioritet. Innsamlingen
+legger bare (run, bunnverdi, temp, RH) i en multiprocessing-kø
+(`LiveView.push`, blokkerer aldri), så et tregt eller frosset vindu kan
+ikke forsinke neste START. Lukkes vinduet, fortsetter innsamlingen som
+før.
+
+Tegningen blitter, og kostnaden per run er konstant:
+
+*  ferdige blokker (punkter med endelig ekskludering, senterlinje,
+   temp/RH) ligger i bakgrunnsbildet og tegnes aldri på nytt
+*  per run gjenopprettes bakgrunnen, og bare den åpne blokken
+   (maks block_size punkter, senter, temp/RH-stykket, statuslinjen)
+   tegnes og blittes
+*  når en blokk er ferdig, brennes den inn i bakgrunnen
+
+Full omtegning skjer bare når aksene må utvides (verdi utenfor y-
+grensene, flere tester enn planlagt) eller vinduet endrer størrelse.
+Kommer flere runs mens vinduet tegner, slås de sammen til ett bilde.
+"""
+
+import os
+import multiprocessing as mp
+
+import numpy as np
+
+from .online_stats import OnlineBlockStats
+
+# -----------------------------  PARAMETRE  -----------------------------
+FRAME_INTERVAL = 0.05        # s: GUI-hendelser mellom hver sjekk av køen
+Y_MARGIN       = 1.0         # ° luft når vinkelaksen utvides
+ENV_MARGIN     = 2.0         # °C / % RH luft når miljøaksen utvides
+VIEWER_NICE    = 10          # lavere prioritet for visningsprosessen (POSIX)
+# -----------------------------------------------------------------------
+
+
+class LiveFigure:
+    """
+    Blittet førstesprett-figur som oppdateres ett run om gangen.
+
+    Parameters
+    ----------
+    block_size, tol : som OnlineBlockStats (senter og ekskludering)
+    n_total : int
+        Planlagt antall tester (x-akse og fargeskala).
+    headless : bool
+        Agg-figur uten pyplot (til filer/tidsmåling).
+    """
+
+    def __init__(self, block_size: int, tol: float, n_total: int,
+                 title: str = "", *, tick_size: int = 15,
+                 cmap_name: str = "RdYlGn", headless: bool = False):
+        import matplotlib.pyplot as plt
+        import matplotlib.lines as mlines
+        from matplotlib.collections import LineCollection
+
+        self.block_size = block_size
+        self.n_total = max(int(n_total), 1)
+        self.tick_size = tick_size
+        self.cmap = plt.get_cmap(cmap_name)
+        self.stats = OnlineBlockStats(block_size, tol, verbose=False)
+
+        if headless:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.fig = Figure(figsize=(7, 5))
+            FigureCanvasAgg(self.fig)
+        else:
+            self.fig = plt.figure(figsize=(7, 5))
+        self.canvas = self.fig.canvas
+        self.ax = ax = self.fig.add_subplot(111)
+        self.ax2 = ax2 = ax.twinx()
+        ax.set_title(f"{title}: innsamling" if title else "Innsamling")
+        ax.set_xlabel("Test #")
+        ax.set_ylabel("Vinkel [°]")
+        ax.grid(True, zorder=0)
+        ax2.set_ylabel("Temp [°C] / RH [%]")
+
+        # ferdige blokker: vanlige kunstnere, bare med i full tegning
+        self.done_sc = ax.scatter([], [], zorder=3)
+        self.done_centers = LineCollection([], colors="black", linestyles="--",
+                                           linewidth=1, zorder=2)
+        ax.add_collection(self.done_centers)
+        self.done_hum,  = ax2.plot([], [], "k--", linewidth=1.2, label="Relativ fukt (%)")
+        self.done_temp, = ax2.plot([], [], "b--", linewidth=1.2, label="Temperatur (°C)")
+
+        # åpen blokk: animerte kunstnere, tegnes ved hver blit
+        self.cur_sc = ax.scatter([], [], zorder=3, animated=True)
+        self.cur_center, = ax.plot([], [], "k--", linewidth=1, zorder=2,
+                                   animated=True)
+        self.cur_hum,  = ax2.plot([], [], "k--", linewidth=1.2, animated=True)
+        self.cur_temp, = ax2.plot([], [], "b--", linewidth=1.2, animated=True)
+        self.fig.subplots_adjust(bottom=0.16)
+        self.status = self.fig.text(0.01, 0.01, "", fontsize=9, family="monospace",
+                                    va="bottom", animated=True)
+        self._animated = (self.cur_center, self.cur_sc, self.cur_hum,
+                          self.cur_temp, self.status)
+
+        ax.legend(handles=[
+            mlines.Line2D([], [], color=self.cmap(0.0), marker="o",
+                          linestyle="None", label="Første test"),
+            mlines.Line2D([], [], color=self.cmap(1.0), marker="o",
+                          linestyle="None", label="Siste test"),
+            mlines.Line2D([], [], color="0.5", marker="o",
+                          linestyle="None", label="Ekskludert"),
+            mlines.Line2D([], [], color="black", linestyle="--",
+                          label="Blokk-senterverdi")], loc="upper left")
+        ax2.legend(loc="upper right")
+
+        # data: ferdige blokker (x, y, farge) og åpen blokk
+        self._done_xy = np.zeros((0, 2))
+        self._done_rgba = np.zeros((0, 4))
+        self._done_segs: list = []
+        self._done_env = np.zeros((0, 3))            # x, temp, hum
+        self._cur_block = None
+        self._cur_runs: list[tuple[int, float, float, float]] = []
+        self._last_env = None                        # siste innbrente (x, T, RH)
+
+        self._bg = None
+        self._full = True
+        self._ylim = self._envlim = None
+        self._set_xlim()
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    # ---------------- akser -------------------------------------------
+    def _set_xlim(self) -> None:
+        n = self.n_total
+        step = self.tick_size * -(-n // (10 * self.tick_size))   # maks ~10 ticks
+        self.ax.set_xlim(-0.5 - 0.05 * n, n - 0.5 + 0.05 * n)
+        self.ax.set_xticks(np.arange(0, n, step))
+
+    @staticmethod
+    def _grow(lim, lo: float, hi: float, margin: float):
+        """Nye grenser hvis [lo, hi] ikke får plass i lim, ellers None."""
+        if not (np.isfinite(lo) and np.isfinite(hi)):
+            return None
+        if lim is None:
+            return (lo - margin, hi + margin)
+        if lo >= lim[0] and hi <= lim[1]:
+            return None
+        return (min(lim[0], lo - margin), max(lim[1], hi + margin))
+
+    def _fit_axes(self, run_no: int, trough: float, temp: float, hum: float) -> None:
+        if run_no > self.n_total:                    # flere tester enn planlagt
+            self.n_total = max(2 * self.n_total, run_no)
+            self._set_xlim()
+            self._full = True
+        lim = self._grow(self._ylim, trough, trough, Y_MARGIN)
+        if lim is not None:
+            self._ylim = lim
+            self.ax.set_ylim(lim[0], lim[1] + 2)     # +2° over som i testresultatet
+            self._full = True
+        env = [v for v in (temp, hum) if np.isfinite(v)]
+        if env:
+            lim = self._grow(self._envlim, min(env), max(env), ENV_MARGIN)
+            if lim is not None:
+                self._envlim = lim
+                self.ax2.set_ylim(*lim)
+                self._full = True
+
+    # ---------------- data --------------------------------------------
+    def _colour(self, x: int) -> np.ndarray:
+        return np.array(self.cmap(x / max(self.n_total - 1, 1)))
+
+    def _block_artists(self):
+        """(xy, rgba, senter-segment, env) for den åpne blokken."""
+        blk = self.stats.blocks[self._cur_block]
+        keep = blk.keep_mask(self.stats.tol)
+        xy, rgba = [], []
+        for (run_no, trough, _, _), k in zip(self._cur_runs, keep):
+            if np.isfinite(trough):
+                xy.append((run_no - 1, trough))
+                rgba.append(self._colour(run_no - 1) if k else (0.5, 0.5, 0.5, 1.0))
+        seg = None
+        if np.isfinite(blk.center):
+            s = self._cur_block * self.block_size
+            seg = [(s - 0.5, blk.center), (s + self.block_size - 0.5, blk.center)]
+        env = [(r - 1, t, h) for r, _, t, h in self._cur_runs]
+        if self._last_env is not None:               # koble til forrige blokk
+            env.insert(0, self._last_env)
+        return (np.array(xy).reshape(-1, 2), np.array(rgba).reshape(-1, 4),
+                seg, np.array(env, float).reshape(-1, 3))
+
+    def _update_current(self) -> None:
+        if self._cur_block is None:
+            return
+        xy, rgba, seg, env = self._block_artists()
+        self.cur_sc.set_offsets(xy)
+        self.cur_sc.set_facecolor(rgba)
+        self.cur_sc.set_edgecolor(rgba)
+        self.cur_center.set_data(*(zip(*seg) if seg else ([], [])))
+        self.cur_temp.set_data(env[:, 0], env[:, 1])
+        self.cur_hum.set_data(env[:, 0], env[:, 2])
+
+    def _bake(self) -> None:
+        """Brenn den åpne blokken inn i bakgrunnen og i de ferdige kunstnerne."""
+        xy, rgba, seg, env = self._block_artists()
+        if self._bg is not None and not self._full:
+            self._update_current()
+            self.canvas.restore_region(self._bg)
+            for a in self._animated[:-1]:             # uten statuslinjen
+                self.fig.draw_artist(a)
+            self._bg = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._done_xy = np.vstack([self._done_xy, xy])
+        self._done_rgba = np.vstack([self._done_rgba, rgba])
+        self.done_sc.set_offsets(self._done_xy)
+        self.done_sc.set_facecolor(self._done_rgba)
+        self.done_sc.set_edgecolor(self._done_rgba)
+        if seg:
+            self._done_segs.append(seg)
+            self.done_centers.set_segments(self._done_segs)
+        new_env = env[1:] if self._last_env is not None else env
+        self._done_env = np.vstack([self._done_env, new_env])
+        self.done_temp.set_data(self._done_env[:, 0], self._done_env[:, 1])
+        self.done_hum.set_data(self._done_env[:, 0], self._done_env[:, 2])
+        if len(env):
+            self._last_env = tuple(env[-1])
+        self._cur_runs = []
+
+    def add(self, run_no: int, trough: float, temp: float = np.nan,
+            hum: float = np.nan) -> dict:
+        """Registrer ett run (1-basert nummer). Tegnes ved neste render()."""
+        b = (run_no - 1) // self.block_size
+        if self._cur_block is not None and b != self._cur_block:
+            self._bake()
+        self._cur_block = b
+        status = self.stats.add(run_no, trough)
+        self._cur_runs.append((run_no, trough, temp, hum))
+        self._fit_axes(run_no, trough, temp, hum)
+        self.status.set_text(
+            f"Test {run_no}/{self.n_total} | blokk {status['block']}: "
+            f"η̄ = {status['mean']:.2f}° ({status['excluded']}/{status['n']} ekskl.)"
+            f" | totalt ekskl. {status['excl_pct']:.1f} %")
+        return status
+
+    # ---------------- tegning -----------------------------------------
+    def _draw_animated(self) -> None:
+        for a in self._animated:
+            self.fig.draw_artist(a)
+
+    def _on_draw(self, event) -> None:
+        """Full tegning (første gang, ny akse, endret vindu): ny bakgrunn."""
+        self._bg = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def render(self) -> None:
+        """Vis det som er lagt til siden forrige render()."""
+        self._update_current()
+        if self._full or self._bg is None:
+            self._full = False
+            self.canvas.draw()                       # → _on_draw
+            self.canvas.blit(self.fig.bbox)
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+
+# =======================================================================
+#  VISNINGSPROSESS  ------------------------------------------------------
+# =======================================================================
+def _drain(q) -> list:
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except Exception:                            # queue.Empty
+            return items
+
+
+def _viewer(q, block_size: int, tol: float, n_total: int, title: str) -> None:
+    """Hovedløkke i visningsprosessen: tøm køen, tegn, behandle GUI-hendelser."""
+    if hasattr(os, "nice"):                          # innsamlingen først om CPU-en er full
+        os.nice(VIEWER_NICE)
+    import matplotlib.pyplot as plt
+
+    live = LiveFigure(block_size, tol, n_total, title)
+    num = live.fig.number
+    plt.show(block=False)
+    live.render()
+    finished = False
+    while plt.fignum_exists(num) and not finished:
+        items = _drain(q)
+        runs = [m for m in items if m is not None]
+        finished = len(runs) < len(items)
+        for m in runs:
+            live.add(*m)
+        if runs:
+            live.render()
+        live.canvas.start_event_loop(FRAME_INTERVAL)
+    if finished and plt.fignum_exists(num):
+        plt.show()                                   # åpent til operatøren lukker
+
+
+class LiveView:
+    """
+    Innsamlingens side: start visningsprosessen og send runs dit.
+
+    Eksempel
+    --------
+    live = LiveView(15, 0.2, n_total=60, title="20250101_ring7_test")
+    live.push(1, trough, temp, hum)      # etter hvert run, blokkerer aldri
+    live.close()                         # vinduet blir stående
+    """
+
+    def __init__(self, block_size: int, tol: float, n_total: int,
+                 title: str = ""):
+        ctx = mp.get_context("spawn")                # ingen fork av serietrådene
+        self._q = ctx.Queue()
+        self._proc = ctx.Process(target=_viewer, name="pendel-live", daemon=True,
+                                 args=(self._q, block_size, tol, n_total, title))
+        self._proc.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.is_alive()
+
+    def push(self, run_no: int, trough: float, temp: float = np.nan,
+             hum: float = np.nan) -> None:
+        """Send ett run til visningen (ingenting skjer hvis vinduet er lukket)."""
+        if self._proc.is_alive():
+            self._q.put_nowait((int(run_no), float(trough), float(temp), float(hum)))
+
+    def close(self) -> None:
+        """Ingen flere runs; vinduet står til operatøren lukker det."""
+        if self._proc.is_alive():
+            self._q.put_nowait(None)
@@ -0,0 +1,702 @@
+"""
+Datainnsamling fra ESP32 + påfølgende analyse.
+
+*  Enkelt-modus   → spør hvor mange tester (som før)
+*  Serie-modus    → NUM_TESTS_PER_ROT × NUM_ROTATIONS med pause/lyd mellom
+*  Analyse        → kjøres til slutt via stats(outdir, user_name)
+"""
+
+import os
+import sys
+import time
+import json
+from datetime import datetime
+import pathlib
+import numpy as np
+# matplotlib, pandas og pyserial importeres først der de brukes, så
+# innsamlingen starter raskt og analysen kan importeres uten rigg
+
+from .runcache import load_dataset, iter_dataset
+from .alignment import (align_and_resample, first_trough, first_troughs,
+                        reference_axis, resample_runs)
+from .profile_stats import ProfileStats
+from .serial_reader import SerialReader, FileWriter
+from .binframe import FrameError, decode_run, to_json_bytes
+from .online_stats import OnlineBlockStats
+from .runstore import parse_run, read_json_run
+from .journal import Journal
+from .block_stats import block_stats, BlockStats
+from . import spectral
+from . import profiling
+
+# -----------------------------  PARAMETRE  -----------------------------
+COM_PORT  = "COM13"
+BAUDRATE  = 115200
+RUN_TIMEOUT_S = 120             # maks ventetid på én run etter START [s]
+
+NUM_TESTS_PER_ROT = 15          # ← antall tester i hver rotasjon
+NUM_ROTATIONS     = 4          # ← antall rotasjoner i serien
+
+enable_vinkelutslag_enkel = True      # ← slå av/på plottet
+tick_size = 15                        # ← x-akse-tick-tetthet (15 er std)
+enable_cache = True                   # ← mellomlagre parsede runs (runcache)
+enable_raw_troughs = True             # ← η-bunnpunkt fra rå samples (ikke resamplet)
+enable_online_stats = True            # ← blokkstatistikk fortløpende under innsamling
+enable_plot_window  = False           # ← True: vis figurer i vindu etter serien (blokkerer)
+report_formats      = ("png",)        # ← figurer lagres i <utdatamappe>/rapport
+enable_binary_frames = True           # ← be ESP32 sende binære rammer (JSON gjenkjennes fortsatt)
+enable_journal      = True            # ← journal per ring: atomisk lagring + fortsett etter krasj
+enable_results_db   = True            # ← lagre η̄ fra stats() i resultatdatabasen (resultdb)
+enable_spectral     = False           # ← periode og dempning per run/blokk (spectral, FFT)
+enable_live_plot    = True            # ← levende førstesprett-figur under innsamling (live_plot)
+# -----------------------------------------------------------------------
+
+
+
+
+# =======================================================================
+#  HJELPEFUNKSJONER  -----------------------------------------------------
+# =======================================================================
+def beep(duration_ms: int = 200, freq: int = 880) -> None:
+    try:
+        import winsound
+    except ImportError:             # Linux/macOS: terminalens bjelle
+        sys.stdout.write("\a")
+        sys.stdout.flush()
+    else:
+        winsound.MessageBeep(-1) 
+
+
+def _run_trough(enc: np.ndarray, t: np.ndarray) -> float:
+    """Bunnverdien til ett run for online-statistikken (som i analysen)."""
+    if enable_raw_troughs:
+        return float(first_troughs([enc], [t])[0])
+    return first_trough(enc)[1]
+
+
+def open_journal(outdir, ring_id: str, *, tests_per_rot: int | None = None,
+                 rotations: int | None = None, new_series: bool = False,
+                 log=print) -> Journal:
+    """
+    Åpne journalen for ringen, start eller gjenoppta serien og kontroller
+    mappen (avkuttede/ødelagte filer settes i karantene). Er forrige serie
+    ferdig (eller `new_series`), legges journalen til side og en ny serie
+    startes; samme dato ville gitt samme filnavn, og da må en annen
+    utdatamappe velges.
+    """
+    journal = Journal(outdir, ring_id, log=log)
+    base_name = f"{datetime.now().strftime('%Y%m%d')}_ring{ring_id}_test"
+    if journal.header is not None and (journal.done or new_series):
+        if journal.base_name == base_name:
+            journal.close()
+            raise RuntimeError(f"Ring {ring_id} har allerede en serie "
+                               f"({base_name}) i {outdir} – velg en annen utdatamappe")
+        journal.archive()
+    journal.begin(base_name, tests_per_rot=tests_per_rot, rotations=rotations)
+    journal.recover()
+    return journal
+
+
+def replay_online(journal: Journal, online: OnlineBlockStats | None,
+                  live=None) -> None:
+    """Fyll online-statistikken (og live-visningen) med testene som allerede er gjort."""
+    if online is None and live is None:
+        return
+    if online is not None:
+        verbose, online.verbose = online.verbose, False
+    try:
+        for test, rec in sorted(journal.runs.items()):
+            enc, t, temp, hum = read_json_run(journal.outdir / rec["file"])
+            trough = _run_trough(enc, t)
+            if online is not None:
+                online.add(test, trough)
+            if live is not None:
+                live.push(test, trough, temp, hum)
+    finally:
+        if online is not None:
+            online.verbose = verbose
+
+
+def open_live(block_size: int, n_total: int, title: str):
+    """Start live-visningen (egen prosess), eller None hvis den er slått av."""
+    if not enable_live_plot:
+        return None
+    from .live_plot import LiveView
+    return LiveView(block_size, AVG_TOL, n_total, title=title)
+
+
+def open_serial(port: str = COM_PORT, *, log=print):
+    import serial
+    log(f"Åpner {port} @ {BAUDRATE} bps ...")
+    with profiling.span("serial.open", port=port):
+        ser_obj = serial.Serial(port, BAUDRATE, timeout=1)
+    with profiling.span("serial.reset_wait"):
+        time.sleep(2)               # ESP32 resettes ved åpning
+    # eldre firmware ignorerer ukjente kommandoer og sender JSON som før
+    ser_obj.write(b"BIN\n" if enable_binary_frames else b"JSON\n")
+    return ser_obj
+
+
+def _acquire_tests(ser, outdir, base_name, *, start_idx, stop_idx,
+                   online: OnlineBlockStats | None = None,
+                   journal: Journal | None = None,
+                   log=print, on_test=None, live=None):
+    """
+    Henter tester i området [start_idx, stop_idx).
+
+    Med `online` beregnes bunnverdien til hvert run så snart JSON er
+    mottatt, og blokkstatistikken oppdateres/skrives ut fortløpende.
+    Med `live` (live_plot.LiveView) sendes bunnverdi, temp og RH til
+    live-visningen; tegningen skjer i en annen prosess og venter aldri
+    på neste START.
+
+    Serieporten leses i en egen tråd (SerialReader) og filene skrives i
+    en egen tråd (FileWriter), så neste START sendes så snart JSON er
+    mottatt og validert. Nyttelasten lagres som mottatt fra ESP32.
+    Med `journal` føres hver lagrede fil i innsamlingsjournalen.
+
+    `log` erstatter print (f.eks. for å prefikse/dempe utskrift når flere
+    rigger kjører samtidig), og `on_test(dict)` kalles etter hver test med
+    tidsmålingen og eventuell online-status.
+
+    Returnerer en liste med tidsmålinger per test (sekunder):
+    START → første byte, overføring av JSON og skrivetid.
+    """
+    reader = SerialReader(ser)
+    writer = FileWriter(journal=journal)
+    reader.start()
+    writer.start()
+    timings = []
+
+    try:
+        for i in range(start_idx, stop_idx):
+            filename = f"{base_name}_{i+1}.json"
+            reader.arm()
+            t_start = time.perf_counter()
+            ser.write(b'START\n')
+            log(f"\nTest #{i+1} ({filename}): START sendt, venter på JSON ...")
+
+            # mottakssløyfe (kun korte debuglinjer skrives ut)
+            deadline = t_start + RUN_TIMEOUT_S
+            with profiling.span("serial.wait", test=i + 1):
+                while True:
+                    frame = reader.get()       # kaster hvis porten har feilet
+                    if frame is None:
+                        if time.perf_counter() > deadline:
+                            raise TimeoutError(f"Ingen run fra ESP32 innen "
+                                               f"{RUN_TIMEOUT_S} s etter START (test #{i+1})")
+                        continue
+                    if frame.kind == "line":
+                        log(f"RAW > {frame.data.decode('utf-8', errors='replace')}")
+                        continue
+                    if frame.kind == "bin":
+                        try:
+                            data = decode_run(frame.data)
+                            payload = to_json_bytes(data)
+                            break
+                        except FrameError as e:
+                            log(f"Binær ramme forkastet: {e}")
+                            continue
+                    try:
+                        data = json.loads(frame.data)
+                        payload = frame.data
+                        break
+                    except json.JSONDecodeError as e:
+                        log(f"JSON decode error: {e}")
+            profiling.count("serial_bytes", len(frame.data))
+
+            # lagre i bakgrunnen (alltid som JSON på disk)
+            filepath = os.path.join(outdir, filename)
+            writer.submit(filepath, payload)
+            timings.append({
+                "Test": i + 1,
+                "Fil": filepath,
+                "Bytes": len(frame.data),
+                "START→byte [s]": frame.t_first_byte - t_start,
+                "Overføring [s]": frame.t_end - frame.t_start,
+            })
+            fmt = "Binær ramme" if frame.kind == "bin" else "JSON"
+            log(f"{fmt} mottatt ({len(frame.data)} B), lagrer til: {filepath}")
+
+            status = None
+            if online is not None or live is not None:
+                with profiling.span("online_stats", test=i + 1):
+                    enc, t, temp, hum = parse_run(data)
+                    trough = _run_trough(enc, t)
+                    if online is not None:
+                        status = online.add(i + 1, trough)
+                if live is not None:
+                    live.push(i + 1, trough, temp, hum)
+            if on_test is not None:
+                on_test(dict(timings[-1], online=status))
+    finally:
+        reader.stop()
+        write_times = writer.close()
+
+    # ---- tidsbruk per test --------------------------------------------
+    for t in timings:
+        t["Skriving [s]"] = write_times.get(t["Fil"], np.nan)
+    if timings:
+        import pandas as pd
+        df = pd.DataFrame(timings).drop(columns="Fil")
+        log("\nTidsbruk per test:")
+        log(df.to_string(index=False, float_format="%.3f"))
+    return timings
+
+
+
+
+
+
+
+
+# =======================================================================
+#  ANALYSE  --------------------------------------------------------------
+# =======================================================================
+
+
+
+# ---------- KONFIG -----------------------------------------------------
+AVG_TOL = 0.2                     # feiltoleranse for vinkelavvik
+
+# ---------- hjelpefunksjoner -------------------------------------------
+def autocorr(x: np.ndarray, maxlag: int) -> np.ndarray:
+    """Normalisert autokorrelasjon, lag 0..maxlag (FFT, se spectral.autocorr)."""
+    return spectral.autocorr(x, maxlag)
+
+# ---------- Interval_stats -----------------------
+def _report_interval(trough_vals, blocks: BlockStats, b: int, tol, *,
+                     offset: int = 0) -> dict:
+    """Skriv ut og returner resultatet for blokk b fra block_stats."""
+    import pandas as pd
+    start, end = blocks.bounds(b)
+    block = trough_vals[start:end]
+    mask  = blocks.keep[start:end]
+    start, end = start + offset, end + offset      # runnummer i hele serien
+    runs  = np.arange(start + 1, end + 1)
+    mode1, mode2 = blocks.mode1[b], blocks.mode2[b]
+    center, mean_val = blocks.center[b], float(blocks.mean[b])
+
+    included_runs = runs[mask]
+    excluded_runs = runs[~mask]
+
+    df = pd.DataFrame({"Run": runs, "Value": block, "Included": mask})
+
+    print(f"\nInterval {start+1}–{end}: "
+          f"mode1={mode1:.2f}, mode2={mode2:.2f}, "
+          f"center={center:.2f}, mean etter filter={mean_val:.2f}")
+    print(df.to_string(index=False))
+
+    if excluded_runs.size:
+        excl_str = ", ".join(map(str, excluded_runs))
+        print(f"   → Ekskluderte målinger (pga ±{tol}): {excl_str}")
+    else:
+        print("   → Ingen ekskluderte målinger")
+
+    return {
+        "mode1": mode1, "mode2": mode2, "center": center,
+        "mean": mean_val,
+        "included_runs": included_runs.tolist(),
+        "excluded_runs": excluded_runs.tolist(),
+        "df": df
+    }
+
+
+def interval_stats(trough_vals, start, end, tol):
+    """Én blokk [start, end); typetall på 0.1°-bøtter som i analyze()."""
+    block = trough_vals[start:end]
+    blocks = block_stats(block, max(block.size, 1), tol)
+    return _report_interval(block, blocks, 0, tol, offset=start)
+
+# ---------- prosessér én katalog ---------------------------------------
+def process_dataset(directory: os.PathLike):
+    """
+    Hele datasettet i minnet: (t_new, encoder-matrise, temps, hums).
+    stats() bruker `stream_dataset`; denne beholdes for skript som
+    trenger hele matrisen.
+    """
+    stats_drop = dict(const=0, extreme=0)
+
+    # JSON-mappe eller runstore, se runcache.load_dataset
+    enc_list, t_list, temps, hums, _, min_idx = load_dataset(
+        directory, cache=enable_cache)
+
+    # ---------- fasejustering + resampling (vektorisert, se alignment) --
+    t_new, all_enc = align_and_resample(enc_list, t_list, min_idx)
+
+    # ---------- retur --------------------------------------------------
+    return t_new, all_enc, np.asarray(temps, float), np.asarray(hums, float)
+
+
+def _resampled_troughs(enc_arr: np.ndarray) -> list[float]:
+    """|første minimum| per rad i den resamplede matrisen (gammel regel)."""
+    trough_vals = []
+    for series in enc_arr:
+        diffs = np.diff(series)
+        minima = np.where((diffs[:-1] < 0) & (diffs[1:] >= 0))[0]
+        idx = (minima[0] + 1) if minima.size else 0
+        trough_vals.append(abs(series[idx]))
+    return trough_vals
+
+
+def stream_dataset(directory: os.PathLike):
+    """
+    Som `process_dataset`, men runs leses og resamples én bit om gangen
+    (runcache.iter_dataset) og vinkelprofilen samles i en ProfileStats i
+    stedet for hele encoder-matrisen. Minnet vokser bare med én verdi
+    per run (bunnpunkt, temp, fukt, og periode/dempning med
+    enable_spectral).
+
+    Returns
+    -------
+    t_new, profile, temps, hums, troughs, spec (Spectra eller None)
+    """
+    t_new = t_ref = profile = None
+    temps, hums, troughs, spec = [], [], [], []
+    for enc_list, t_list, tp, hm, _, min_idx in iter_dataset(
+            directory, cache=enable_cache):
+        if not enc_list:
+            continue
+        if profile is None:                    # tidsakse fra første run
+            with profiling.span("align"):
+                t_new, t_ref = reference_axis(t_list[0], min_idx[0])
+            profile = ProfileStats(t_new.size)
+        with profiling.span("resample", runs=len(enc_list)):
+            rows = resample_runs(t_new, t_ref, enc_list, t_list, min_idx)
+            profile.add_rows(rows)
+        with profiling.span("troughs", runs=len(enc_list)):
+            if enable_raw_troughs:
+                troughs.extend(first_troughs(enc_list, t_list, min_idx))
+            else:
+                troughs.extend(_resampled_troughs(rows))
+        if enable_spectral:
+            spec.append(spectral.spectra(t_new, rows))
+        temps.extend(tp)
+        hums.extend(hm)
+    if profile is None:
+        raise FileNotFoundError(f"Ingen runs i {directory}")
+    return (t_new, profile, np.asarray(temps, float), np.asarray(hums, float),
+            np.asarray(troughs, float), spectral.Spectra.concat(spec) if spec else None)
+
+
+
+
+# ------------------------------------------------
+# Kjør statistisk analyse og akseptansetest
+# -----------------------------------------------------------------------
+def _new_figure(figsize, headless: bool):
+    """Figur + akse; headless bruker ren Agg-canvas uten pyplot/vindu."""
+    if not headless:
+        import matplotlib.pyplot as plt
+        return plt.subplots(figsize=figsize)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def stats(outdir: str | os.PathLike, user_name: str, *,
+          show: bool = True, save_to: str | os.PathLike | None = None,
+          formats: tuple[str, ...] = ("png",)) -> None:
+    """
+    Kjør analyse + η-beregning på mappen `outdir`.
+
+    show=False tegner uten vindu (blokkerer aldri); save_to lagrer
+    figurene som <save_to>/<user_name>_<figur>.<format>.
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.lines as mlines
+
+    outdir = pathlib.Path(outdir)
+    figures = {}
+
+    # ---- hent dataserien(e), én bit om gangen -------------------------
+    t_new, profile, temps, hums, trough_vals, spec = stream_dataset(outdir)
+
+    # ========= BEREGN η (first-bounce gjennomsnitt) ===================
+    n_trials    = NUM_TESTS_PER_ROT
+    n_rotations = NUM_ROTATIONS
+
+    # Blokkvis gjennomsnitt for alle blokker på én gang (15 er std)
+    series = trough_vals[:n_rotations * n_trials]
+    with profiling.span("block_stats", runs=len(series)):
+        blocks = block_stats(series, n_trials, AVG_TOL)
+    for k in range(blocks.n_blocks):
+        _report_interval(series, blocks, k, AVG_TOL)
+    all_excluded = blocks.excluded_runs()
+    profiling.count("runs_excluded", len(all_excluded))
+
+    overall_mean = float(np.nanmean(blocks.mean))
+    print(f"\nSamlet gjennomsnitt η over {blocks.n_blocks} blokker: "
+          f"{overall_mean:.2f}°")
+
+    if spec is not None:
+        print("\nPeriode og dempning (spektraltopp) per run:")
+        print(spectral.run_table(spec, trough_vals, all_excluded).to_string(
+            index=False, float_format="%.3f"))
+        print(f"\nPer blokk à {n_trials} runs:")
+        print(spectral.block_table(spec, n_trials, blocks.mean).to_string(
+            index=False, float_format="%.3f"))
+
+    if enable_results_db:
+        from .resultdb import record_analysis
+        record_analysis(outdir, source="stats", name=user_name,
+                        files=outdir.glob("*.json"), block_size=n_trials,
+                        tol=AVG_TOL, range_tol=None, eta_mean=overall_mean,
+                        excluded_runs=all_excluded, n_runs=len(series),
+                        n_blocks=blocks.n_blocks, temps=temps, hums=hums,
+                        trough="raw" if enable_raw_troughs else "resampled")
+
+
+
+
+    # ---- (valgfritt) plot mean ±1 SD for hele serien -----------------
+    if profile.n >= 2:
+        mean_enc = profile.mean
+        std_enc  = profile.std()
+        fig, ax = _new_figure((6.4, 4.8), headless=not show)
+        ax.fill_between(t_new, mean_enc - std_enc, mean_enc + std_enc,
+                        alpha=0.25)
+        ax.plot(t_new, mean_enc, label=f"{user_name} (mean ± 1 SD)")
+        ax.set_xlabel("Tid [ms]")
+        ax.set_ylabel("Vinkel [°]")
+        ax.set_title(f"Ring {user_name}: gjennomsnittlig vinkelprofil")
+        ax.legend()
+        fig.tight_layout()
+        figures["vinkelprofil"] = fig
+        
+    
+    # ---------- PLOTT: første sprett + temp/fukt ---------- 
+    if enable_vinkelutslag_enkel:
+        # 1) første trough / utslag og ekskluderte er beregnet over
+         # ---------- fargeskala + grå for ekskluderte -------------  
+        n      = len(trough_vals)
+        cmap   = plt.get_cmap('RdYlGn')
+        base_colours = [cmap(i / (n - 1)) for i in range(n)]
+
+        excl_set = set(all_excluded)                        
+        colours = ['0.5' if (i + 1) in excl_set else base_colours[i]
+                for i in range(n)]                       
+
+        # 3) figur
+        fig, ax = _new_figure((6, 4), headless=not show)
+        ax.scatter(np.arange(n), trough_vals, color=colours, zorder=3)
+
+        ax.set_xlabel("Test #")
+        ax.set_ylabel("Vinkel [°]")
+        ax.set_title(f"{user_name}: Utslagsvinkel etter første støt")
+        ax.set_xticks(np.arange(0, n, tick_size))
+        ax.grid(True, zorder=0)
+
+        # 4) temp + fukt på sekundær akse
+        ax2 = ax.twinx()
+        ax2.set_ylabel("Temp [°C] / RH [%]")
+
+        # → sørg for svart aksisfarge:
+        ax2.tick_params(axis='y', colors='black')           # y-ticks + tall
+        ax2.spines['right'].set_color('black')              # y-akse-linjen
+
+        # nå tegner vi linjene
+        ax2.plot(np.arange(n), hums,  'k--', label='Relativ fukt (%)', linewidth=1.2)
+        ax2.plot(np.arange(n), temps, 'b--', label='Temperatur (°C)',   linewidth=1.2)
+
+
+        # 5) legender
+        excl_pct = 100 * len(excl_set) / n                  
+
+        grey_dot = mlines.Line2D([], [], color='0.5', marker='o',
+                                linestyle='None',
+                                label=f'Ekskludert ({excl_pct:.1f} %)')  
+
+        red_dot   = mlines.Line2D([], [], color=cmap(0.0), marker='o',
+                                  linestyle='None', label='Første test')
+        green_dot = mlines.Line2D([], [], color=cmap(1.0), marker='o',
+                                  linestyle='None', label='Siste test')
+        leg1 = ax.legend(handles=[red_dot, green_dot, grey_dot],     
+                     loc='upper left')
+        leg2 = ax2.legend(loc='upper right')
+        ax.add_artist(leg1)
+
+        fig.tight_layout()
+        figures["forste_utslag"] = fig
+
+    # ---------- lagre / vis --------------------------------------------
+    if save_to is not None:
+        save_to = pathlib.Path(save_to)
+        save_to.mkdir(parents=True, exist_ok=True)
+        for name, fig in figures.items():
+            for fmt in formats:
+                path = save_to / f"{user_name}_{name}.{fmt}"
+                with profiling.span("plot.save", figure=name, format=fmt):
+                    fig.savefig(path, dpi=120)
+                print(f"Figur lagret: {path}")
+    if show:
+        with profiling.span("plot.show"):
+            plt.show()
+
+
+
+
+
+
+
+
+# =======================================================================
+#  MODI                                                                  |
+# =======================================================================
+def run_single_mode(ser, outdir):
+    """
+    Ett sammenhengende sett med tester. Med journal fortsetter
+    nummereringen etter siste lagrede test for ringen, eller – hvis
+    operatøren velger det – starter en ny serie (den gamle journalen
+    legges til side).
+    """
+    date_str  = datetime.now().strftime("%Y%m%d")
+    user_name = input("Angi ringID: ").strip() or "test"
+    base_name = f"{date_str}_ring{user_name}_test"
+
+    journal = None
+    if enable_journal:
+        journal = open_journal(outdir, user_name)
+        if journal.resume_index and input(
+                f"Fortsette {journal.base_name} etter test #{journal.resume_index}? "
+                f"(↵ = ja, n = ny serie) ").strip().lower() == "n":
+            journal.close()
+            journal = open_journal(outdir, user_name, new_series=True)
+        base_name  = journal.base_name
+        test_count = journal.resume_index
+        if test_count:
+            print(f"Fortsetter {base_name} etter test #{test_count}.")
+        if journal.rewound:
+            print(f"Test #{test_count + 1} mangler – {journal.rewound} senere "
+                  f"tester tas på nytt.")
+    else:
+        test_count = int(input("Angi nummer for siste test hvis fortsettelse (↵ = 0): ") or 0)
+    max_tests  = test_count + int(input("Oppgi antall nye tester: ") or 1)
+
+    online = (OnlineBlockStats(NUM_TESTS_PER_ROT, AVG_TOL)
+              if enable_online_stats else None)
+    live = open_live(NUM_TESTS_PER_ROT, max_tests, base_name)
+    if journal is not None:
+        replay_online(journal, online, live)
+    try:
+        _acquire_tests(ser, outdir, base_name,
+                       start_idx=test_count,
+                       stop_idx=max_tests,
+                       online=online, journal=journal, live=live)
+    finally:
+        if journal is not None:
+            journal.close()
+        if live is not None:
+            live.close()
+
+    print(f"\nAlle {max_tests} tester fullført.")
+    # ---- kjør intern analyse -----------------------------------------
+    stats(outdir, user_name, show=enable_plot_window,
+          save_to=os.path.join(outdir, "rapport"), formats=report_formats)
+
+
+def run_series_mode(ser, outdir):
+    """NUM_TESTS_PER_ROT tester × NUM_ROTATIONS med pause/lyd mellom blokkene."""
+    date_str  = datetime.now().strftime("%Y%m%d")
+    ring_id   = input("Angi ringID: ").strip() or "test"
+    base_name = f"{date_str}_ring{ring_id}_test"
+    per_rot, n_rot = NUM_TESTS_PER_ROT, NUM_ROTATIONS
+
+    test_idx = 0
+    journal = None
+    if enable_journal:                 # fortsett der serien stoppet
+        journal = open_journal(outdir, ring_id,
+                               tests_per_rot=per_rot, rotations=n_rot)
+        base_name = journal.base_name
+        per_rot = journal.tests_per_rot or per_rot
+        n_rot   = journal.rotations or n_rot
+        test_idx = min(journal.resume_index, per_rot * n_rot)
+        rot, k = journal.position(test_idx)
+        if test_idx:
+            print(f"Fortsetter {base_name} etter test #{test_idx} "
+                  f"(rotasjon {min(rot, n_rot)}/{n_rot}, {k}/{per_rot} i blokken).")
+        if journal.rewound:
+            beep()
+            input(f"\nTest #{test_idx + 1} mangler – {journal.rewound} senere tester "
+                  f"tas på nytt. Sett ringen i rotasjon {rot}/{n_rot} og trykk ↵ ...")
+        if journal.needs_rotation(test_idx):
+            beep()
+            input("\nForrige rotasjon er ferdig – roter ringen og trykk ↵ ...")
+            journal.mark_rotated(test_idx // per_rot)
+
+    online = (OnlineBlockStats(per_rot, AVG_TOL)
+              if enable_online_stats else None)
+    live = open_live(per_rot, per_rot * n_rot, base_name)
+    if journal is not None:
+        replay_online(journal, online, live)
+
+    try:
+        for rot in range(test_idx // per_rot + 1, n_rot + 1):
+            print(f"\n=== Start rotasjon {rot}/{n_rot} ===")
+            next_idx = rot * per_rot
+            _acquire_tests(ser, outdir, base_name,
+                           start_idx=test_idx,
+                           stop_idx=next_idx,
+                           online=online, journal=journal, live=live)
+            test_idx = next_idx
+
+            if rot < n_rot:            # pause før neste rotasjon
+                beep()
+                input("\nRotasjon ferdig – trykk ↵ for å fortsette ...")
+                if journal is not None:
+                    journal.mark_rotated(rot)
+        if journal is not None and not journal.done:
+            journal.finish()
+    finally:
+        if journal is not None:
+            journal.close()
+        if live is not None:
+            live.close()
+
+    total = per_rot * n_rot
+    print(f"\nAlle {total} tester fullført.")
+    if online is not None:
+        print(f"Fortløpende η over {len(online.block_means)} blokker: "
+              f"{online.overall_mean:.2f}°")
+    # ---- kjør intern analyse -----------------------------------------
+    stats(outdir, ring_id, show=enable_plot_window,
+          save_to=os.path.join(outdir, "rapport"), formats=report_formats)
+
+
+# =======================================================================
+#  HOVEDPROGRAM                                                          |
+# =======================================================================
+def main(outdir: str | None = None, *, port: str = COM_PORT,
+         series: bool | None = None) -> None:
+    """Interaktiv innsamling; spør etter det som ikke er gitt."""
+    ser = None
+    try:
+        # ---------- velg mappe -------------------------------
+        if outdir is None:
+            outdir = input("Oppgi utdatamappe for JSON-filer: ").strip()
+        os.makedirs(outdir, exist_ok=True)
+
+        # ---------- åpne seriell -----------------------------
+        ser = open_serial(port)
+
+        # ---------- velg modus -------------------------------
+        if series is None:
+            series_ans = input("Ønsker du å kjøre testserie? (j/N): ").strip().lower()
+            series = series_ans == "j"
+        if series:
+            run_series_mode(ser, outdir)
+        else:
+            run_single_mode(ser, outdir)
+
+    except KeyboardInterrupt:
+        print("\nAvbrutt av bruker.")
+    finally:
+        if ser is not None:
+            ser.close()
+            print("Serialport lukket.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Miljøkompensasjon: hvor mye η (første bunnpunkt) driver med temperatur
+og fuktighet, estimert over hele arkivet.
+
+Modellen er en lineær regresjon innen hver måleøkt (ring, runde, dato):
+
+    η_i = α_økt + β_T · T_i + β_RH · RH_i + ε_i
+
+Hver økt får sitt eget nivå α (ringene er forskjellige – det er det vi
+måler), så helningene β bestemmes bare av variasjonen *innen* øktene og
+blandes ikke sammen med forskjeller mellom ringer som tilfeldigvis ble
+testet på en varm dag.
+
+Minste kvadraters løsning trenger bare summerte ko-momenter av
+z = (T, RH, η) rundt hver økts middel. Per økt lagres (n, middel,
+ko-momentmatrise 3×3), og modellen holder summen S over øktene:
+
+*  ett nytt run:   Welford-oppdatering av øktens momenter og S – O(1)
+*  en hel ring:    momentene for ringen slås sammen (Chan) – O(n_runs),
+                   uavhengig av hvor mange ringer arkivet har
+*  samme økt igjen: gamle momenter trekkes fra S først (ingen dobbelttelling)
+
+β = S_xx⁻¹ S_xy løses fra 2×2-systemet; historikken refittes aldri.
+
+Modellen får alle runs i ringen, ikke bare de blokkfilteret beholder:
+filteret (±tol rundt typetallene) kutter nettopp den variasjonen
+temperaturen gir og ville gitt for flate helninger. Bare grove feil
+(mer enn OUTLIER_DEG fra ringens median) holdes utenfor.
+Momentene lagres i resultatdatabasen (tabell env_sessions), så modellen
+vokser med hver analyse.
+
+Korrigert η er η omregnet til referanseklima (T_REF, RH_REF):
+
+    η_korr = η - β_T · (T - T_REF) - β_RH · (RH - RH_REF)
+
+og korrigert η̄ er samme blokkfiltrering (block_stats) brukt på η_korr.
+
+`analyze()` skriver korrigert η̄ ved siden av rå η̄ (enable_env_model).
+
+    python -m pendel.miljo                       # vis modellen
+    python -m pendel.miljo ringmappe [...]       # legg til ringer
+"""
+
+import os
+import time
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from .block_stats import block_stats
+from .resultdb import RESULTS_DB, describe_ring
+
+# -----------------------------  PARAMETRE  -----------------------------
+T_REF  = 20.0                # °C, referansetemperatur for korrigert η
+RH_REF = 40.0                # % RH, referansefuktighet
+MIN_DOF = 10                 # færre frihetsgrader: ingen korreksjon
+OUTLIER_DEG = 2.0            # runs lenger fra ringens median [°] brukes ikke
+# -----------------------------------------------------------------------
+
+VARS = ("temp", "hum", "eta")
+_COLS = ("n", "m_t", "m_h", "m_e",
+         "c_tt", "c_th", "c_te", "c_hh", "c_he", "c_ee")
+_IU = np.triu_indices(3)                     # rekkefølgen c_tt … c_ee
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS env_sessions (
+    session    TEXT PRIMARY KEY,             -- ring|runde|dato
+    {', '.join(f'{c} REAL NOT NULL' for c in _COLS)},
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class _Moments:
+    """n, middel og ko-momentmatrise (Σ (z - z̄)(z - z̄)ᵀ) for én økt."""
+
+    __slots__ = ("n", "mean", "C")
+
+    def __init__(self, n=0, mean=None, C=None):
+        self.n = n
+        self.mean = np.zeros(3) if mean is None else mean
+        self.C = np.zeros((3, 3)) if C is None else C
+
+    @classmethod
+    def of(cls, z: np.ndarray) -> "_Moments":
+        if not len(z):
+            return cls()
+        d = z - z.mean(axis=0)
+        return cls(len(z), z.mean(axis=0), d.T @ d)
+
+    def merge(self, other: "_Moments") -> np.ndarray:
+        """Slå sammen med `other`; returnerer endringen i C."""
+        if not other.n:
+            return np.zeros((3, 3))
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        dC = other.C + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean = self.mean + delta * (other.n / n)
+        self.C = self.C + dC
+        self.n = n
+        return dC
+
+    def row(self) -> tuple:
+        return (self.n, *self.mean, *self.C[_IU])
+
+    @classmethod
+    def from_row(cls, row) -> "_Moments":
+        C = np.zeros((3, 3))
+        C[_IU] = row[4:10]
+        C.T[_IU] = row[4:10]
+        return cls(int(row[0]), np.array(row[1:4], float), C)
+
+
+class EnvModel:
+    """
+    Innen-økt minste kvadrater for η mot (T, RH), oppdaterbar run for run.
+
+    Eksempel
+    --------
+    model = EnvModel.load()
+    model.add_ring("7|2|2025-01-01", temps, hums, trough_vals)
+    model.save()
+    eta_corr = model.correct(trough_vals, temps, hums)
+    """
+
+    def __init__(self):
+        self.sessions: dict[str, _Moments] = {}
+        self.S = np.zeros((3, 3))            # Σ over økter av C
+        self.n = 0
+        self._dirty: set[str] = set()
+
+    # ---------------- oppdatering -------------------------------------
+    def _session(self, key: str) -> _Moments:
+        key = str(key)
+        self._dirty.add(key)
+        return self.sessions.setdefault(key, _Moments())
+
+    def add(self, session: str, temp: float, hum: float, eta: float) -> bool:
+        """Ett run (O(1)). False hvis en av verdiene mangler (NaN)."""
+        z = np.array([temp, hum, eta], float)
+        if not np.isfinite(z).all():
+            return False
+        self.S += self._session(session).merge(_Moments(1, z, np.zeros((3, 3))))
+        self.n += 1
+        return True
+
+    def add_ring(self, session: str, temps, hums, etas, *, keep=None,
+                 replace: bool = True) -> int:
+        """
+        Alle runs fra én ring på én gang.
+
+        Parameters
+        ----------
+        keep : bool-array | None
+            Bare disse runs brukes (f.eks. uten grove feil, se
+            within_median).
+        replace : bool
+            Erstatt det økten har fra før (ny analyse av samme ring).
+
+        Returns
+        -------
+        antall runs som ble brukt
+        """
+        z = np.column_stack([np.asarray(v, float) for v in (temps, hums, etas)])
+        ok = np.isfinite(z).all(axis=1)
+        if keep is not None:
+            ok &= np.asarray(keep, bool)
+        if replace:
+            self.remove(session)
+        batch = _Moments.of(z[ok])
+        self.S += self._session(session).merge(batch)
+        self.n += batch.n
+        return batch.n
+
+    def remove(self, session: str) -> None:
+        old = self.sessions.pop(str(session), None)
+        if old is not None:
+            self.S -= old.C
+            self.n -= old.n
+            self._dirty.add(str(session))
+
+    # ---------------- resultat ----------------------------------------
+    @property
+    def dof(self) -> int:
+        """Frihetsgrader: runs - nivåer (én per økt) - helninger."""
+        return self.n - sum(m.n > 0 for m in self.sessions.values()) - 2
+
+    def fit(self) -> dict:
+        """
+        Returns
+        -------
+        dict med beta_t [°/°C], beta_h [°/%RH], se_t, se_h, sigma (rest-SD
+        [°]), r2 (andel av variasjonen innen øktene som forklares),
+        n, sessions og dof. Helninger er NaN med for få frihetsgrader.
+        """
+        out = dict(n=self.n, sessions=len(self.sessions), dof=self.dof,
+                   beta_t=np.nan, beta_h=np.nan, se_t=np.nan, se_h=np.nan,
+                   sigma=np.nan, r2=np.nan)
+        if self.dof < MIN_DOF:
+            return out
+        Sxx, Sxy, Syy = self.S[:2, :2], self.S[:2, 2], self.S[2, 2]
+        inv = np.linalg.pinv(Sxx)            # konstant RH e.l. → helning 0
+        beta = inv @ Sxy
+        sse = max(Syy - beta @ Sxy, 0.0)
+        sigma2 = sse / self.dof
+        se = np.sqrt(np.clip(np.diag(inv) * sigma2, 0, None))
+        out.update(beta_t=float(beta[0]), beta_h=float(beta[1]),
+                   se_t=float(se[0]), se_h=float(se[1]),
+                   sigma=float(np.sqrt(sigma2)),
+                   r2=float(1 - sse / Syy) if Syy > 0 else np.nan)
+        return out
+
+    def correct(self, etas, temps, hums) -> np.ndarray:
+        """
+        η omregnet til (T_REF, RH_REF). Manglende T eller RH korrigeres
+        ikke for den variabelen; uten modell returneres η uendret.
+        """
+        f = self.fit()
+        eta = np.asarray(etas, float)
+        if not np.isfinite(f["beta_t"]):
+            return eta.copy()
+        dt = np.asarray(temps, float) - T_REF
+        dh = np.asarray(hums, float) - RH_REF
+        return (eta - f["beta_t"] * np.where(np.isfinite(dt), dt, 0.0)
+                    - f["beta_h"] * np.where(np.isfinite(dh), dh, 0.0))
+
+    # ---------------- lagring -----------------------------------------
+    @staticmethod
+    def _connect(path) -> sqlite3.Connection:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(path, timeout=60)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+        return db
+
+    @classmethod
+    def load(cls, path: str | os.PathLike = RESULTS_DB) -> "EnvModel":
+        model = cls()
+        db = cls._connect(path)
+        try:
+            for row in db.execute(f"SELECT session, {', '.join(_COLS)} "
+                                  f"FROM env_sessions"):
+                m = model.sessions[row[0]] = _Moments.from_row(row[1:])
+                model.S += m.C
+                model.n += m.n
+        finally:
+            db.close()
+        return model
+
+    def save(self, path: str | os.PathLike = RESULTS_DB) -> None:
+        """Skriv øktene som er endret siden load()."""
+        if not self._dirty:
+            return
+        now = time.time()
+        db = self._connect(path)
+        try:
+            with db:
+                for key in self._dirty:
+                    m = self.sessions.get(key)
+                    if m is None or not m.n:
+                        db.execute("DELETE FROM env_sessions WHERE session = ?", (key,))
+                        continue
+                    db.execute(f"INSERT OR REPLACE INTO env_sessions "
+                               f"(session, {', '.join(_COLS)}, updated_at) "
+                               f"VALUES ({', '.join('?' * (len(_COLS) + 2))})",
+                               (key, *map(float, m.row()), now))
+        finally:
+            db.close()
+        self._dirty.clear()
+
+
+def session_key(directory, files=(), name: str | None = None) -> str:
+    """Øktnøkkel «ring|runde|dato» (samme tolkning som resultatdatabasen)."""
+    return "|".join(map(str, describe_ring(directory, files, name)))
+
+
+def within_median(etas, limit: float = OUTLIER_DEG) -> np.ndarray:
+    """True for runs innenfor ±limit fra medianen (grove feil ute)."""
+    etas = np.asarray(etas, float)
+    if not np.isfinite(etas).any():
+        return np.zeros(etas.size, bool)
+    with np.errstate(invalid="ignore"):
+        return np.abs(etas - np.nanmedian(etas)) <= limit
+
+
+# =======================================================================
+#  FRA ANALYSENE  --------------------------------------------------------
+# =======================================================================
+def compensate(directory, trough_vals, temps, hums, *, block_size: int,
+               tol: float, files=(), name: str | None = None,
+               db_path: str | os.PathLike | None = None) -> dict | None:
+    """
+    Oppdater modellen med én analysert ring og korriger η̄.
+
+    Ringens runs (uten grove feil) legges inn i modellen og erstatter en
+    tidligere analyse av samme økt. Korrigert η̄ er block_stats på η_korr
+    med samme block_size og tol som rå η̄.
+
+    Returns
+    -------
+    dict med fit() og eta_corr (per run), blocks_corr (BlockStats),
+    overall_corr, temp_mean, hum_mean – eller None hvis databasen feiler
+    (analysen stopper ikke).
+    """
+    db_path = db_path or RESULTS_DB
+    try:
+        model = EnvModel.load(db_path)
+        model.add_ring(session_key(directory, files, name), temps, hums,
+                       trough_vals, keep=within_median(trough_vals))
+        model.save(db_path)
+    except sqlite3.Error as e:
+        print(f"⚠️  Miljømodellen ikke oppdatert i {db_path}: {e}")
+        return None
+
+    eta_corr = model.correct(trough_vals, temps, hums)
+    blocks = block_stats(eta_corr, block_size, tol)
+    keep = blocks.keep
+    with np.errstate(invalid="ignore"):
+        temp_mean = float(np.nanmean(np.where(keep, temps, np.nan)))
+        hum_mean = float(np.nanmean(np.where(keep, hums, np.nan)))
+    return dict(model.fit(), eta_corr=eta_corr, blocks_corr=blocks,
+                overall_corr=float(np.nanmean(blocks.mean)),
+                temp_mean=temp_mean, hum_mean=hum_mean)
+
+
+def print_fit(f: dict) -> None:
+    if not np.isfinite(f["beta_t"]):
+        print(f"Miljømodell: for lite data ({f['n']} runs i {f['sessions']} økter, "
+              f"{f['dof']} frihetsgrader < {MIN_DOF})")
+        return
+    print(f"Miljømodell ({f['n']} runs i {f['sessions']} økter): "
+          f"β_T = {f['beta_t']:+.4f} ± {f['se_t']:.4f} °/°C, "
+          f"β_RH = {f['beta_h']:+.4f} ± {f['se_h']:.4f} °/%RH, "
+          f"σ = {f['sigma']:.3f}°, R²(innen økt) = {f['r2']:.2f}")
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Miljøkompensasjon av η (temp/RH)")
+    p.add_argument("directories", nargs="*", help="ringmapper som legges til")
+    p.add_argument("--db", default=None, help=f"databasefil (standard {RESULTS_DB})")
+    args = p.parse_args()
+
+    db_path = args.db or RESULTS_DB
+    if args.directories:
+        from .analyser_ring import load_troughs
+        model = EnvModel.load(db_path)
+        for d in args.directories:
+            trough_vals, temps, hums, files = load_troughs(Path(d))
+            key = session_key(d, files)
+            used = model.add_ring(key, temps, hums, trough_vals,
+                                  keep=within_median(trough_vals))
+            print(f"{key}: {used}/{len(files)} runs")
+        model.save(db_path)
+    else:
+        model = EnvModel.load(db_path)
+    print_fit(model.fit())
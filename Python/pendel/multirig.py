@@ -0,0 +1,270 @@
+"""
+Samtidig datainnsamling fra flere pendelrigger (én ESP32 per serieport).
+
+Hver rigg kjører i sin egen tråd med egen ringID, utdatamappe og
+blokk/rotasjonsplan. Hovedtråden viser en felles fremdriftstabell og
+tar imot bekreftelser på rotasjon: når en rigg er ferdig med en
+rotasjon venter bare den riggen, mens de andre fortsetter.
+
+Konfigurasjon som JSON-fil (liste med rigger):
+
+    [
+      {"port": "COM13", "ring": "7",  "outdir": "data/ring7"},
+      {"port": "COM14", "ring": "12", "outdir": "data/ring12",
+       "tests_per_rot": 15, "rotations": 4}
+    ]
+
+eller direkte på kommandolinjen:
+
+    python -m pendel.multirig --rig COM13:7:data/ring7 --rig COM14:12:data/ring12
+
+Når en rigg ber om rotasjon: roter ringen og skriv ringID + ↵.
+
+Med acq.enable_journal fortsetter hver rigg etter en omstart der serien
+for ringen stoppet (se journal.py).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+from . import main_store_JSON_testserie as acq
+from .online_stats import OnlineBlockStats
+
+# -----------------------------  PARAMETRE  -----------------------------
+REFRESH_S = 2.0          # minste tid mellom to fremdriftsutskrifter
+LOG_DIR   = None         # None → logg per rigg i riggens utdatamappe
+# -----------------------------------------------------------------------
+
+
+class RigConfig(NamedTuple):
+    port: str
+    ring: str
+    outdir: str
+    tests_per_rot: int = acq.NUM_TESTS_PER_ROT
+    rotations: int = acq.NUM_ROTATIONS
+
+
+# =======================================================================
+#  ÉN RIGG  --------------------------------------------------------------
+# =======================================================================
+class RigWorker(threading.Thread):
+    """
+    Kjører hele serien for én rigg. Utskrift fra innsamlingen går til en
+    loggfil per rigg; status leses av hovedtråden via `self.status`.
+    """
+
+    def __init__(self, cfg: RigConfig, prompts: "queue.Queue[RigWorker]",
+                 changed: threading.Event):
+        super().__init__(name=f"rig-{cfg.ring}", daemon=True)
+        self.cfg = cfg
+        self.prompts = prompts
+        self.changed = changed
+        self.resume = threading.Event()
+        self.prompt = ""                        # teksten operatøren får
+        self.online = OnlineBlockStats(cfg.tests_per_rot, acq.AVG_TOL,
+                                       verbose=False)
+        self.status = dict(ring=cfg.ring, port=cfg.port, rot=0, test=0,
+                           state="starter", trough=float("nan"),
+                           excl_pct=0.0, error="")
+        os.makedirs(cfg.outdir, exist_ok=True)
+        log_dir = LOG_DIR or cfg.outdir
+        self._log = open(os.path.join(log_dir, f"ring{cfg.ring}_acquire.log"),
+                         "a", encoding="utf-8")
+
+    def log(self, msg: str) -> None:
+        self._log.write(msg + "\n")
+        self._log.flush()
+
+    def _set(self, **kw) -> None:
+        self.status.update(kw)
+        self.changed.set()
+
+    def _on_test(self, t: dict) -> None:
+        on = t.get("online") or {}
+        self._set(test=t["Test"], trough=on.get("trough", float("nan")),
+                  excl_pct=on.get("excl_pct", 0.0))
+
+    def _wait_operator(self, prompt: str, state: str) -> None:
+        """Vent på operatøren (bare denne riggen)."""
+        self.resume.clear()
+        self.prompt = prompt
+        self._set(state=state)
+        self.prompts.put(self)
+        self.resume.wait()
+
+    def _wait_rotation(self, rot: int) -> None:
+        self._set(rot=rot)
+        self._wait_operator(f"rotasjon {rot} ferdig – roter", "venter på rotasjon")
+        if self.journal is not None:
+            self.journal.mark_rotated(rot)
+
+    def run(self) -> None:
+        cfg = self.cfg
+        base_name = f"{datetime.now().strftime('%Y%m%d')}_ring{cfg.ring}_test"
+        total = cfg.tests_per_rot * cfg.rotations
+        ser = None
+        self.journal = None
+        live = None
+        try:
+            test_idx = 0
+            if acq.enable_journal:              # fortsett der ringen stoppet
+                self.journal = acq.open_journal(
+                    cfg.outdir, cfg.ring, tests_per_rot=cfg.tests_per_rot,
+                    rotations=cfg.rotations, log=self.log)
+                base_name = self.journal.base_name
+                if self.journal.tests_per_rot:      # planen fra serien gjelder
+                    self.cfg = cfg = cfg._replace(
+                        tests_per_rot=self.journal.tests_per_rot,
+                        rotations=self.journal.rotations)
+                    total = cfg.tests_per_rot * cfg.rotations
+                    self.online = OnlineBlockStats(cfg.tests_per_rot, acq.AVG_TOL,
+                                                   verbose=False)
+                test_idx = min(self.journal.resume_index, total)
+            live = acq.open_live(cfg.tests_per_rot, total,
+                                 f"{base_name} ({cfg.port})")
+            if self.journal is not None:
+                acq.replay_online(self.journal, self.online, live)
+                self._set(test=test_idx)
+
+            ser = acq.open_serial(cfg.port, log=self.log)
+            if self.journal is not None and self.journal.rewound:
+                rot = self.journal.position(test_idx)[0]
+                self._set(rot=rot)
+                self._wait_operator(
+                    f"test #{test_idx + 1} mangler, {self.journal.rewound} senere "
+                    f"tas på nytt – sett ringen i rotasjon {rot}", "venter på operatør")
+            if self.journal is not None and self.journal.needs_rotation(test_idx):
+                self._wait_rotation(test_idx // cfg.tests_per_rot)
+
+            for rot in range(test_idx // cfg.tests_per_rot + 1, cfg.rotations + 1):
+                self._set(rot=rot, state="kjører")
+                next_idx = rot * cfg.tests_per_rot
+                acq._acquire_tests(ser, cfg.outdir, base_name,
+                                   start_idx=test_idx, stop_idx=next_idx,
+                                   online=self.online, journal=self.journal,
+                                   log=self.log, on_test=self._on_test,
+                                   live=live)
+                test_idx = next_idx
+
+                if rot < cfg.rotations:         # vent bare på denne riggen
+                    self._wait_rotation(rot)
+
+            if self.journal is not None and not self.journal.done:
+                self.journal.finish()
+            self._set(state="ferdig", test=total)
+        except Exception as e:
+            self._set(state="feil", error=f"{type(e).__name__}: {e}")
+        finally:
+            if ser is not None:
+                ser.close()
+            if self.journal is not None:
+                self.journal.close()
+            if live is not None:
+                live.close()
+            self._log.close()
+
+
+# =======================================================================
+#  FELLES VISNING + INPUT  -----------------------------------------------
+# =======================================================================
+def _stdin_lines(lines: "queue.Queue[str]") -> None:
+    """Les stdin i egen tråd så fremdriften kan oppdateres imens."""
+    for line in sys.stdin:
+        lines.put(line.strip())
+
+
+def _print_progress(workers: list[RigWorker]) -> None:
+    print(f"\n{'Ring':>6} {'Port':>8} {'Rot':>5} {'Test':>9} "
+          f"{'Utslag':>8} {'Ekskl.':>7}  Status")
+    for w in workers:
+        s, c = w.status, w.cfg
+        total = c.tests_per_rot * c.rotations
+        print(f"{s['ring']:>6} {s['port']:>8} {s['rot']:>2}/{c.rotations:<2} "
+              f"{s['test']:>4}/{total:<4} {s['trough']:>7.2f}° "
+              f"{s['excl_pct']:>6.1f}%  {s['state']} {s['error']}")
+
+
+def run_rigs(configs: list[RigConfig]) -> list[RigWorker]:
+    """Start alle rigger, vis fremdrift og håndter rotasjonsbekreftelser."""
+    prompts: queue.Queue[RigWorker] = queue.Queue()
+    changed = threading.Event()
+    workers = [RigWorker(c, prompts, changed) for c in configs]
+    by_ring = {w.cfg.ring: w for w in workers}
+    waiting: dict[str, RigWorker] = {}
+
+    lines: queue.Queue[str] = queue.Queue()
+    threading.Thread(target=_stdin_lines, args=(lines,), daemon=True).start()
+    for w in workers:
+        w.start()
+
+    last = 0.0
+    while any(w.is_alive() for w in workers):
+        # ---- nye rotasjonsforespørsler ------------------------------
+        while not prompts.empty():
+            w = prompts.get()
+            waiting[w.cfg.ring] = w
+            acq.beep()
+            print(f"\n>>> Ring {w.cfg.ring} ({w.cfg.port}): {w.prompt} "
+                  f"og skriv «{w.cfg.ring}» + ↵")
+
+        # ---- operatørens svar ---------------------------------------
+        while not lines.empty():
+            ans = lines.get()
+            if ans in waiting:
+                waiting.pop(ans).resume.set()
+                print(f">>> Ring {ans} fortsetter.")
+            elif ans:
+                known = ", ".join(waiting) or "ingen"
+                print(f">>> «{ans}» venter ikke (venter: {known}).")
+
+        # ---- fremdrift ----------------------------------------------
+        if changed.is_set() and time.monotonic() - last >= REFRESH_S:
+            changed.clear()
+            last = time.monotonic()
+            _print_progress(workers)
+        time.sleep(0.1)
+
+    _print_progress(workers)
+    print("\nFortløpende resultat per ring:")
+    for ring, w in by_ring.items():
+        print(f"  Ring {ring}: η = {w.online.overall_mean:.2f}° over "
+              f"{len(w.online.block_means)} blokker")
+    return workers
+
+
+def load_config(path: str) -> list[RigConfig]:
+    with open(path, encoding="utf-8") as f:
+        return [RigConfig(**{k: (str(v) if k in ("port", "ring", "outdir") else v)
+                             for k, v in entry.items()})
+                for entry in json.load(f)]
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Datainnsamling fra flere rigger samtidig")
+    p.add_argument("config", nargs="?", help="JSON-fil med liste av rigger")
+    p.add_argument("--rig", action="append", default=[],
+                   metavar="PORT:RING:OUTDIR", help="kan gjentas")
+    args = p.parse_args()
+
+    configs = load_config(args.config) if args.config else []
+    configs += [RigConfig(*r.split(":", 2)) for r in args.rig]
+    if not configs:
+        p.error("ingen rigger angitt")
+    if len({c.ring for c in configs}) != len(configs):
+        p.error("ringID må være unik per rigg")
+
+    try:
+        run_rigs(configs)
+    except KeyboardInterrupt:
+        print("\nAvbrutt av bruker.")
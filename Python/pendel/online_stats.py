@@ -0,0 +1,168 @@
+"""
+Fortløpende førstesprett-statistikk under datainnsamling.
+
+`OnlineBlockStats` tar imot én bunnverdi (|første minimum|) per run mens
+testene pågår, og holder blokkvis oppdatert:
+
+*  frekvenstabell over verdiene i blokken
+*  de to typetallene (mode1/mode2) og senteret mellom dem
+*  filtrert middel (verdier innenfor ±tol fra senter) og antall ekskluderte
+
+Typetallene oppdateres i O(1): et antall kan bare øke, så nye topp-2 er
+alltid topp-2 av (gamle topp-2 ∪ verdien som nettopp ble talt). Filtrert
+middel beregnes over blokkens egne verdier (maks block_size), så
+kostnaden per run er uavhengig av hvor mange tester serien har.
+
+Samme regler som `interval_stats`: sortering på (antall synkende,
+verdi stigende), senter = (mode1 + mode2) / 2, inkludert hvis
+|verdi - senter| <= tol.
+"""
+
+import numpy as np
+
+from .block_stats import RESOLUTION
+
+
+class _Block:
+    """Tilstand for én blokk."""
+
+    __slots__ = ("index", "counts", "top", "n", "runs", "values")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.counts: dict[float, int] = {}
+        self.top: list[float] = []           # maks 2 nøkler, best først
+        self.n = 0
+        self.runs: list[int] = []
+        self.values: list[float] = []
+
+    def _rank(self, key: float):
+        return (-self.counts[key], key)
+
+    def add(self, run_no: int, value: float, key: float | None) -> None:
+        self.n += 1
+        self.runs.append(run_no)
+        self.values.append(value)
+        if key is None:                      # NaN: telles, men alltid ekskludert
+            return
+        self.counts[key] = self.counts.get(key, 0) + 1
+        cand = self.top if key in self.top else self.top + [key]
+        self.top = sorted(cand, key=self._rank)[:2]
+
+    @property
+    def center(self) -> float:
+        if not self.top:
+            return np.nan
+        m1 = self.top[0]
+        m2 = self.top[1] if len(self.top) > 1 else m1
+        return (m1 + m2) / 2.0
+
+    def keep_mask(self, tol: float) -> np.ndarray:
+        return np.abs(np.asarray(self.values) - self.center) <= tol
+
+    def filtered(self, tol: float) -> tuple[float, int]:
+        """(filtrert middel, antall ekskluderte) rundt nåværende senter."""
+        vals = np.asarray(self.values)
+        keep = self.keep_mask(tol)
+        mean_val = float(vals[keep].mean()) if keep.any() else np.nan
+        return mean_val, self.n - int(keep.sum())
+
+
+class OnlineBlockStats:
+    """
+    Parameters
+    ----------
+    block_size : int
+        Antall tester per blokk (rotasjon).
+    tol : float
+        ± grense rundt senter.
+    resolution : float | None
+        Bøttebredde før typetall (RESOLUTION = 0.1° som i analyser_ring).
+        None bruker eksakte verdier; bunnverdiene fra first_troughs er
+        parabel-forfinet og ligger sjelden to ganger på samme verdi.
+    verbose : bool
+        Skriv ut status per run og dom per ferdig blokk.
+    """
+
+    def __init__(self, block_size: int, tol: float, *,
+                 resolution: float | None = RESOLUTION, verbose: bool = True):
+        self.block_size = block_size
+        self.tol = tol
+        self.resolution = resolution
+        self.verbose = verbose
+        self.blocks: dict[int, _Block] = {}
+        self.open: set[int] = set()     # blokker som ikke er fulle ennå
+        self.n_runs = 0
+        self.done_excluded = 0          # ekskluderte i ferdige blokker
+        self.block_means: dict[int, float] = {}
+
+    # ------------------------------------------------------------------
+    def _key(self, value: float) -> float:
+        if self.resolution is None:
+            return value
+        scale = 1.0 / self.resolution          # samme bøtter som block_stats
+        return round(value * scale) / scale
+
+    def add(self, run_no: int, trough: float) -> dict:
+        """
+        Registrer bunnverdien for test nr. `run_no` (1-basert).
+
+        Returns
+        -------
+        dict med blokk, senter, filtrert middel, ekskluderte i blokken og
+        samlet ekskluderingsandel så langt.
+        """
+        b = (run_no - 1) // self.block_size
+        blk = self.blocks.get(b)
+        if blk is None:
+            blk = self.blocks[b] = _Block(b)
+            self.open.add(b)
+        blk.add(run_no, trough,
+                self._key(trough) if np.isfinite(trough) else None)
+        self.n_runs += 1
+
+        mean_val, n_excl = blk.filtered(self.tol)
+        open_excl = sum(self.blocks[i].filtered(self.tol)[1]
+                        for i in self.open if i != b) + n_excl
+        excl_pct = 100 * (self.done_excluded + open_excl) / self.n_runs
+
+        status = dict(block=b + 1, run=run_no, trough=trough, center=blk.center,
+                      mean=mean_val, excluded=n_excl, n=blk.n, excl_pct=excl_pct)
+        if self.verbose:
+            print(f"   ↳ utslag {trough:.2f}° | blokk {b+1}: "
+                  f"senter={blk.center:.2f}, η̄={mean_val:.2f}° "
+                  f"({n_excl}/{blk.n} ekskl.) | totalt ekskl. {excl_pct:.1f} %")
+
+        if blk.n == self.block_size:
+            self.finish_block(b)
+        return status
+
+    def finish_block(self, b: int) -> dict:
+        """Avslutt blokk `b` (0-basert) og skriv ut dommen."""
+        blk = self.blocks[b]
+        mean_val, n_excl = blk.filtered(self.tol)
+        self.block_means[b] = mean_val
+        self.done_excluded += n_excl
+        self.open.discard(b)
+
+        c = blk.center
+        excluded = [r for r, k in zip(blk.runs, blk.keep_mask(self.tol)) if not k]
+        m1 = blk.top[0] if blk.top else np.nan
+        m2 = blk.top[1] if len(blk.top) > 1 else m1
+        if self.verbose:
+            first = b * self.block_size + 1
+            print(f"\nInterval {first}–{first + self.block_size - 1}: "
+                  f"mode1={m1:.2f}, mode2={m2:.2f}, "
+                  f"center={c:.2f}, mean etter filter={mean_val:.2f}")
+            if excluded:
+                print(f"   → Ekskluderte målinger (pga ±{self.tol}): "
+                      + ", ".join(map(str, excluded)))
+            else:
+                print("   → Ingen ekskluderte målinger")
+        return dict(mode1=m1, mode2=m2, center=c, mean=mean_val,
+                    excluded_runs=excluded)
+
+    @property
+    def overall_mean(self) -> float:
+        vals = [v for v in self.block_means.values() if np.isfinite(v)]
+        return float(np.mean(vals)) if vals else np.nan
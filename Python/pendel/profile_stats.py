@@ -0,0 +1,75 @@
+"""
+Strømmende middel ± standardavvik for vinkelprofilen.
+
+`ProfileStats` tar imot resamplede runs én og én (eller en bit om
+gangen) og holder bare tre vektorer på lengden av tidsaksen, så minnet
+er konstant uansett hvor mange tester serien har:
+
+*  sum      – summen av radene i testrekkefølge. Middelet sum / n er da
+              bit-identisk med `all_enc.mean(axis=0)`, som også summerer
+              radene én og én
+*  mu, m2   – Welford: løpende middel og sum av kvadrerte avvik, så
+              variansen m2 / n blir numerisk stabil uten å lagre radene
+              (avvik fra `all_enc.std(axis=0)` er i størrelsesorden 1e-13°)
+
+To akkumulatorer (f.eks. fra hver sin prosess) kan slås sammen med
+`merge` (Chan et al.).
+"""
+
+import numpy as np
+
+
+class ProfileStats:
+    """
+    Parameters
+    ----------
+    size : int
+        Lengden av den felles tidsaksen (t_new.size).
+    """
+
+    def __init__(self, size: int):
+        self.n = 0
+        self.sum = np.zeros(size)
+        self.mu = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self._delta = np.empty(size)          # arbeidsbuffere
+        self._tmp = np.empty(size)
+
+    def add(self, row: np.ndarray) -> None:
+        """Legg til ett resamplet run."""
+        self.n += 1
+        self.sum += row
+        delta = np.subtract(row, self.mu, out=self._delta)
+        self.mu += delta / self.n
+        np.subtract(row, self.mu, out=self._tmp)
+        self._tmp *= delta
+        self.m2 += self._tmp
+
+    def add_rows(self, rows: np.ndarray) -> None:
+        """Legg til radene i en (k, size)-matrise i rekkefølge."""
+        for row in rows:
+            self.add(row)
+
+    def merge(self, other: "ProfileStats") -> None:
+        """Slå sammen med en akkumulator for de påfølgende runs."""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mu - self.mu
+        self.m2 += other.m2 + delta ** 2 * (self.n * other.n / n)
+        self.mu += delta * (other.n / n)
+        self.sum += other.sum
+        self.n = n
+
+    @property
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            return self.sum / self.n
+
+    def var(self, ddof: int = 0) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.maximum(self.m2, 0.0) / (self.n - ddof)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        """Standardavvik per tidspunkt (ddof=0 som np.std)."""
+        return np.sqrt(self.var(ddof))
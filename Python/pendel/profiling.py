@@ -0,0 +1,175 @@
+"""
+Lett instrumentering: navngitte spenn rundt hvert trinn og tellere.
+
+Slått av (standard) er `span()` et oppslag og et felles tomt kontekst-
+objekt, og `count()` en enkelt if-test – ingenting lagres. Slått på med
+`pendel --profile …` (eller `enable()`) registreres hvert spenn med
+start, varighet og tråd, og tellerne med løpende verdi:
+
+    with profiling.span("load", runs=len(files)):
+        ...
+    profiling.count("files_parsed")
+    profiling.count("bytes_read", len(raw))
+
+`report(mappe)` skriver (standard i undermappen profiler/, så sporene
+ikke havner blant run-filene i en datamappe)
+
+*  profil_<tid>.trace.json  – Chrome-trace (chrome://tracing, Perfetto):
+                              spenn som «X»-hendelser per tråd, tellere
+                              som «C»-hendelser
+*  profil_<tid>.json        – sammendrag: per spenn antall, total,
+                              middel og maks [s] og andel av veggtid,
+                              samt tellerne
+
+og skriver sammendragstabellen. Bare standardbiblioteket brukes.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+
+PROFILE_DIR = "profiler"                # standardmappe for report()
+
+_NULL = nullcontext()
+_enabled = False
+_t0_ns = 0
+_spans: list[tuple] = []                # (navn, start_ns, varighet_ns, tråd, args)
+_counter_events: list[tuple] = []       # (navn, tid_ns, verdi)
+_counters: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    """Start registrering (nullstiller tidligere data)."""
+    global _enabled, _t0_ns
+    reset()
+    _t0_ns = time.perf_counter_ns()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def reset() -> None:
+    _spans.clear()
+    _counter_events.clear()
+    _counters.clear()
+
+
+class _Span:
+    __slots__ = ("name", "args", "t0")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        t1 = time.perf_counter_ns()
+        _spans.append((self.name, self.t0, t1 - self.t0,
+                       threading.get_ident(), self.args))
+
+
+def span(name: str, **args):
+    """Kontekst for ett trinn; `args` vises i Chrome-trace."""
+    if not _enabled:
+        return _NULL
+    return _Span(name, args)
+
+
+def count(name: str, n: float = 1) -> None:
+    """Øk telleren `name` med n."""
+    if not _enabled:
+        return
+    with _lock:
+        value = _counters[name] = _counters.get(name, 0) + n
+        _counter_events.append((name, time.perf_counter_ns(), value))
+
+
+# =======================================================================
+#  EKSPORT  --------------------------------------------------------------
+# =======================================================================
+def summary() -> tuple[list[dict], dict[str, float]]:
+    """
+    Returns
+    -------
+    rows     : list[dict] per spenn (name, calls, total_s, mean_s,
+               max_s, share), sortert etter total tid
+    counters : dict
+    """
+    wall_ns = max(time.perf_counter_ns() - _t0_ns, 1)
+    acc: dict[str, list] = {}
+    for name, _, dur, _, _ in list(_spans):
+        a = acc.setdefault(name, [0, 0, 0])
+        a[0] += 1
+        a[1] += dur
+        a[2] = max(a[2], dur)
+    rows = [dict(name=name, calls=n, total_s=tot / 1e9, mean_s=tot / n / 1e9,
+                 max_s=mx / 1e9, share=tot / wall_ns)
+            for name, (n, tot, mx) in acc.items()]
+    rows.sort(key=lambda r: r["total_s"], reverse=True)
+    return rows, dict(_counters)
+
+
+def chrome_trace() -> dict:
+    """Hendelsene i Chrome-trace-format (tider i µs fra enable())."""
+    pid = os.getpid()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    tids = {}
+    events = []
+    for name, start, dur, tid, args in list(_spans):
+        tids.setdefault(tid, len(tids))
+        events.append(dict(name=name, ph="X", pid=pid, tid=tids[tid],
+                           ts=(start - _t0_ns) / 1e3, dur=dur / 1e3,
+                           **({"args": args} if args else {})))
+    for tid, i in tids.items():
+        events.append(dict(name="thread_name", ph="M", pid=pid, tid=i,
+                           args={"name": names.get(tid, f"tråd {i}")}))
+    for name, t, value in list(_counter_events):
+        events.append(dict(name=name, ph="C", pid=pid, tid=0,
+                           ts=(t - _t0_ns) / 1e3, args={name: value}))
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def print_summary(rows: list[dict], counters: dict[str, float]) -> None:
+    if rows:
+        print(f"\n{'spenn':28s} {'antall':>7} {'total [s]':>10} "
+              f"{'middel [ms]':>12} {'maks [ms]':>10} {'andel':>7}")
+        for r in rows:
+            print(f"{r['name']:28s} {r['calls']:7d} {r['total_s']:10.3f} "
+                  f"{1e3 * r['mean_s']:12.2f} {1e3 * r['max_s']:10.2f} "
+                  f"{r['share']:7.1%}")
+    if counters:
+        print()
+        for name, value in sorted(counters.items()):
+            print(f"{name:28s} {value:>12,.0f}".replace(",", " "))
+
+
+def report(directory: str | os.PathLike = PROFILE_DIR, *,
+           prefix: str = "profil") -> tuple[Path, Path]:
+    """Skriv Chrome-trace og sammendrag til `directory` og vis tabellen."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    trace_path = directory / f"{prefix}_{stamp}.trace.json"
+    summary_path = directory / f"{prefix}_{stamp}.json"
+    rows, counters = summary()
+    trace_path.write_text(json.dumps(chrome_trace()), encoding="utf-8")
+    summary_path.write_text(json.dumps(dict(spans=rows, counters=counters),
+                                       indent=2, ensure_ascii=False),
+                            encoding="utf-8")
+    print_summary(rows, counters)
+    print(f"\nProfil lagret: {trace_path} (chrome://tracing) og {summary_path}")
+    return trace_path, summary_path
@@ -0,0 +1,132 @@
+"""
+Hodeløs rapportgenerering (PNG/PDF) for én eller mange ringer.
+
+Bruker ingen vinduer: figurene tegnes på en ren Agg-canvas og lagres
+rett til fil, så rapportene kan lages uten tilsyn, i batch og i
+arbeidsprosesser. Hver prosess lager figurmalen (`TestResultsFigure`)
+én gang og gjenbruker den for alle ringene den får.
+
+    python -m pendel.rapport data/ring7            # én ring
+    python -m pendel.rapport data/ --out rapporter --format png pdf --workers 8
+"""
+
+import os
+import sys
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")                  # før pyplot importeres (via analyser_ring)
+
+from .batch_analyse import (discover_rings, DEFAULT_BLOCK_SIZE, DEFAULT_TOL,
+                           DEFAULT_RANGE_TOL)
+
+# -----------------------------  PARAMETRE  -----------------------------
+DEFAULT_FORMATS = ("png", "pdf")
+REPORT_DPI      = 120
+# -----------------------------------------------------------------------
+
+_figure = None                         # figurmal per prosess
+
+
+def _template():
+    global _figure
+    if _figure is None:
+        from .analyser_ring import TestResultsFigure
+        _figure = TestResultsFigure(headless=True)
+    return _figure
+
+
+def render_ring(directory: str | os.PathLike, out_dir: str | os.PathLike, *,
+                name: str | None = None,
+                block_size: int = DEFAULT_BLOCK_SIZE,
+                tol: float = DEFAULT_TOL,
+                range_tol: float = DEFAULT_RANGE_TOL,
+                formats: tuple[str, ...] = DEFAULT_FORMATS) -> list[Path]:
+    """
+    Analyser én ringmappe og lagre testresultat-figuren.
+
+    Returns
+    -------
+    list[Path] – én fil per format: <out_dir>/<name>_testresultat.<format>
+    """
+    from .analyser_ring import compute_ring
+    directory = Path(directory)
+    name = name or directory.name
+    res = compute_ring(directory, block_size=block_size, tol=tol,
+                       range_tol=range_tol)
+    fig = _template()
+    fig.update(res["trough_vals"], res["temps"], res["hums"],
+               res["excluded_runs"], name,
+               overall_mean=res["overall_mean"],
+               range_metric=res["range_metric"],
+               range_tol=range_tol, block_size=block_size,
+               blocks=res["blocks"])
+    return fig.save(Path(out_dir) / f"{name}_testresultat", formats, dpi=REPORT_DPI)
+
+
+def _render_job(job: tuple) -> tuple[str, list[str], str]:
+    directory, out_dir, name, kw = job
+    try:
+        paths = render_ring(directory, out_dir, name=name, **kw)
+        return str(directory), [str(p) for p in paths], ""
+    except Exception as e:
+        return str(directory), [], f"{type(e).__name__}: {e}"
+
+
+def render_many(root: str | os.PathLike, out_dir: str | os.PathLike, *,
+                workers: int | None = None, **kw) -> list[tuple]:
+    """
+    Lag rapport for alle ringmapper under `root` (se discover_rings).
+
+    Filnavnet er mappestien relativt til root med «_» som skille, så
+    «ring7/runde2» blir «ring7_runde2_testresultat.png».
+
+    Returns
+    -------
+    list av (mappe, [filer], feilmelding) i mappe-rekkefølge
+    """
+    root = Path(root).resolve()
+    dirs = discover_rings(root)
+    if not dirs:
+        raise FileNotFoundError(f"Ingen ringmapper under {root}")
+
+    jobs = [(d, out_dir, "_".join(d.relative_to(root).parts) or d.name, kw)
+            for d in dirs]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        return [_render_job(j) for j in jobs]
+    chunk = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(workers) as ex:
+        return list(ex.map(_render_job, jobs, chunksize=chunk))
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Hodeløse PNG/PDF-rapporter per ring")
+    p.add_argument("root", help="ringmappe eller rotmappe med mange ringer")
+    p.add_argument("--out", default="rapporter")
+    p.add_argument("--format", nargs="+", default=list(DEFAULT_FORMATS))
+    p.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    p.add_argument("--tol", type=float, default=DEFAULT_TOL)
+    p.add_argument("--range-tol", type=float, default=DEFAULT_RANGE_TOL)
+    p.add_argument("--workers", type=int, default=None)
+    args = p.parse_args()
+
+    results = render_many(args.root, args.out, workers=args.workers,
+                          block_size=args.block_size, tol=args.tol,
+                          range_tol=args.range_tol, formats=tuple(args.format))
+    n_fail = 0
+    for directory, paths, err in results:
+        if err:
+            n_fail += 1
+            print(f"❌ {directory}: {err}")
+        else:
+            print(f"✅ {directory} → {', '.join(paths)}")
+    if n_fail:
+        print(f"\n{n_fail} av {len(results)} mapper feilet", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,409 @@
+"""
+Lokal resultatdatabase (SQLite) for alle η-analyser.
+
+`analyze()`, `stats()` og batch-analysen skriver hvert resultat hit
+automatisk (enable_results_db), så historikken per ring ikke bare finnes
+som konsollutskrift. Én rad per analyse, nøkkel:
+
+    ring, runde, dato (testene), block_size, tol, range_tol, kilde,
+    bunnpunktmetode (raw | resampled)
+
+– samme analyse kjørt på nytt oppdaterer raden; metodene gir litt ulik η̄
+og holdes derfor adskilt (eldre rader uten metode vises som «–»). Ring og dato hentes fra
+filnavnene (<YYYYMMDD>_ring<ID>_test_<n>.json), runden fra mappenavnet
+(«runde2», «r2», …; 0 hvis ukjent).
+
+Spørringene bruker indeksene og svarer på millisekunder også med titalls
+tusen analyser:
+
+    python -m pendel.resultdb history 7 [--round 2] [--block-size 15] [--tol 0.3]
+    python -m pendel.resultdb summary [--by ring round] [--trough raw]
+    python -m pendel.resultdb rings
+
+(også som `pendel results …`). Bare standardbiblioteket importeres, så
+kommandoene starter umiddelbart.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+from datetime import date as _date, datetime
+from pathlib import Path
+
+# -----------------------------  PARAMETRE  -----------------------------
+RESULTS_DB = Path(os.environ.get("PENDEL_RESULTS",
+                                 Path.home() / ".pendel" / "results.sqlite"))
+# -----------------------------------------------------------------------
+
+RING_RE  = re.compile(r"ring[_\- ]?(\d+)", re.IGNORECASE)
+ROUND_RE = re.compile(r"(?:^|[^a-z])(?:runde|round|r)[_\- ]?(\d+)$", re.IGNORECASE)
+_FILE_RE = re.compile(r"^(\d{8})_ring(.+?)_test", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id            INTEGER PRIMARY KEY,
+    ring          TEXT    NOT NULL,
+    round         INTEGER NOT NULL DEFAULT 0,
+    date          TEXT    NOT NULL,          -- YYYY-MM-DD for testene
+    block_size    INTEGER NOT NULL,
+    tol           REAL    NOT NULL,
+    range_tol     REAL,                      -- NULL: ikke beregnet (stats)
+    source        TEXT    NOT NULL,          -- analyze | stats | batch
+    eta_mean      REAL,
+    range_metric  REAL,
+    range_ok      INTEGER,
+    excl_pct      REAL,
+    excluded_runs TEXT,                      -- JSON-liste, 1-basert
+    n_runs        INTEGER,
+    n_blocks      INTEGER,
+    temp_mean     REAL,
+    hum_mean      REAL,
+    directory     TEXT,
+    analyzed_at   REAL    NOT NULL,
+    eta_lo        REAL,                      -- bootstrap-KI for η̄
+    eta_hi        REAL,
+    range_lo      REAL,                      -- bootstrap-KI for range
+    range_hi      REAL,
+    range_p       REAL,                      -- permutasjons-p for range
+    trough        TEXT                       -- raw | resampled; NULL: ukjent (eldre rad)
+);
+CREATE INDEX IF NOT EXISTS analyses_date ON analyses (date);
+"""
+
+# etter at eldre databaser har fått de nye kolonnene; bunnpunktmetoden er
+# en del av nøkkelen, så rå og resamplede resultater aldri overskriver
+# hverandre
+_INDEXES = """
+DROP INDEX IF EXISTS analyses_key;
+DROP INDEX IF EXISTS analyses_agg;
+CREATE UNIQUE INDEX IF NOT EXISTS analyses_key2 ON analyses
+    (ring, round, date, block_size, tol, IFNULL(range_tol, -1), source,
+     IFNULL(trough, ''));
+-- dekkende indeks: aggregatene leser aldri selve tabellen
+CREATE INDEX IF NOT EXISTS analyses_agg2 ON analyses
+    (ring, round, block_size, tol, range_tol, source, trough, date,
+     eta_mean, excl_pct, range_ok, analyzed_at);
+"""
+
+FIELDS = ("ring", "round", "date", "block_size", "tol", "range_tol", "source",
+          "eta_mean", "range_metric", "range_ok", "excl_pct", "excluded_runs",
+          "n_runs", "n_blocks", "temp_mean", "hum_mean", "directory",
+          "analyzed_at", "eta_lo", "eta_hi", "range_lo", "range_hi", "range_p",
+          "trough")
+_ADDED = ("eta_lo", "eta_hi", "range_lo", "range_hi", "range_p")   # REAL, nyere enn v1
+_ADDED_TEXT = ("trough",)                                          # TEXT, nyere enn v1
+_FILTERS = ("ring", "round", "block_size", "tol", "range_tol", "source", "trough")
+_GROUPS = _FILTERS + ("date",)
+TROUGH_METHODS = ("raw", "resampled")       # first_troughs | resamplet serie
+
+
+def _nanmean(values) -> float | None:
+    vals = [float(v) for v in values if v is not None and not math.isnan(v)]
+    return sum(vals) / len(vals) if vals else None
+
+
+def _finite(x) -> float | None:
+    return None if x is None or math.isnan(x) else float(x)
+
+
+def describe_ring(directory: str | os.PathLike, files=(), name: str | None = None):
+    """
+    (ring, runde, dato) for en ringmappe.
+
+    Ring og dato fra første filnavn i acquire-formatet, ellers «ringN» i
+    `name`/mappenavnet (eller navnet selv). Runde fra mappenavnet, 0 hvis
+    ukjent. Dato er dagens hvis filnavnene ikke har den.
+    """
+    directory = Path(directory)
+    ring = day = None
+    for fn in files:
+        if m := _FILE_RE.match(Path(fn).name):
+            day, ring = m.group(1), m.group(2)
+            break
+    if ring is None:
+        for text in (name or "", *reversed(directory.parts)):
+            if m := RING_RE.search(text):
+                ring = m.group(1)
+                break
+    if ring is None:
+        ring = name or directory.name
+    m = ROUND_RE.search(directory.name)
+    rnd = int(m.group(1)) if m else 0
+    day = (datetime.strptime(day, "%Y%m%d").date() if day else _date.today())
+    return str(ring), rnd, day.isoformat()
+
+
+# =======================================================================
+#  DATABASE  -------------------------------------------------------------
+# =======================================================================
+class ResultsDB:
+    """
+    Eksempel
+    --------
+    with ResultsDB() as db:
+        rows = db.history("7", block_size=15)
+        per_ring = db.summary(by=("ring",))
+    """
+
+    def __init__(self, path: str | os.PathLike = RESULTS_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=60)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        have = {r[1] for r in self.db.execute("PRAGMA table_info(analyses)")}
+        for col in _ADDED:                   # eldre database: legg til kolonnene
+            if col not in have:
+                self.db.execute(f"ALTER TABLE analyses ADD COLUMN {col} REAL")
+        for col in _ADDED_TEXT:
+            if col not in have:
+                self.db.execute(f"ALTER TABLE analyses ADD COLUMN {col} TEXT")
+        self.db.executescript(_INDEXES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    # ---------------- skriving ----------------------------------------
+    def record(self, row: dict) -> None:
+        """Lagre (eller oppdater) én analyse; se FIELDS."""
+        self.record_many([row])
+
+    def record_many(self, rows) -> None:
+        now = time.time()
+        values = []
+        for r in rows:
+            r = dict(r)
+            r.setdefault("analyzed_at", now)
+            if not isinstance(r.get("excluded_runs"), (str, type(None))):
+                r["excluded_runs"] = json.dumps([int(x) for x in r["excluded_runs"]])
+            values.append(tuple(r.get(f) for f in FIELDS))
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO analyses ({', '.join(FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(FIELDS))})", values)
+
+    # ---------------- spørringer --------------------------------------
+    @staticmethod
+    def _where(filters: dict, since: str | None, until: str | None):
+        sql, args = [], []
+        for key in _FILTERS:
+            val = filters.get(key)
+            if val is not None:
+                sql.append(f"{key} = ?")
+                args.append(str(val) if key == "ring" else val)
+        if since:
+            sql.append("date >= ?")
+            args.append(since)
+        if until:
+            sql.append("date <= ?")
+            args.append(until)
+        return (" WHERE " + " AND ".join(sql)) if sql else "", args
+
+    def _rows(self, sql: str, args) -> list[dict]:
+        return [dict(r) for r in self.db.execute(sql, args)]
+
+    def history(self, ring: str, *, since: str | None = None,
+                until: str | None = None, limit: int | None = None,
+                **filters) -> list[dict]:
+        """Alle analyser av `ring` i tidsrekkefølge (dato, runde)."""
+        where, args = self._where(dict(filters, ring=ring), since, until)
+        sql = f"SELECT * FROM analyses{where} ORDER BY date DESC, round DESC, analyzed_at DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._rows(sql, args)[::-1]
+
+    def latest(self, *, since: str | None = None, until: str | None = None,
+               **filters) -> list[dict]:
+        """
+        Siste analyse per (ring, runde, bunnpunktmetode) – grunnlaget for
+        sammenligning; filtrer på `trough` for å ikke blande metodene.
+        """
+        where, args = self._where(filters, since, until)
+        rows = self._rows(f"SELECT *, MAX(analyzed_at) AS _last FROM analyses{where} "
+                          f"GROUP BY ring, round, trough", args)
+        for r in rows:
+            r.pop("_last")
+        return sorted(rows, key=lambda r: (_ring_key(r["ring"]), r["round"]))
+
+    def summary(self, by=("ring", "trough"), *, since: str | None = None,
+                until: str | None = None, **filters) -> list[dict]:
+        """
+        Aggregater per gruppe (`by` ⊆ ring, round, date, block_size, tol,
+        range_tol, source, trough): antall, η̄ (middel, SD, min, maks),
+        ekskludert andel, andel med godkjent indre variasjon og første/siste
+        dato. Standard skiller bunnpunktmetodene, som gir ulik η̄.
+        """
+        cols = [c for c in by if c in _GROUPS]
+        if len(cols) != len(by):
+            raise ValueError(f"Ukjent gruppering i {by}")
+        where, args = self._where(filters, since, until)
+        group = ", ".join(cols)
+        rows = self._rows(
+            f"SELECT {group + ', ' if group else ''}COUNT(*) AS n, "
+            f"AVG(eta_mean) AS eta_mean, NULL AS eta_sd, "
+            f"SUM(eta_mean * eta_mean) AS _sq, COUNT(eta_mean) AS _n, "
+            f"MIN(eta_mean) AS eta_min, MAX(eta_mean) AS eta_max, "
+            f"AVG(excl_pct) AS excl_pct, AVG(range_ok) AS range_ok_share, "
+            f"MIN(date) AS first_date, MAX(date) AS last_date "
+            f"FROM analyses{where}{' GROUP BY ' + group if group else ''}", args)
+        for r in rows:
+            n, sq, m = r.pop("_n"), r.pop("_sq"), r["eta_mean"]
+            r["eta_sd"] = (math.sqrt(max(sq - n * m * m, 0.0) / (n - 1))
+                           if n and n > 1 else None)
+        if "ring" in cols:
+            rows.sort(key=lambda r: (_ring_key(r["ring"]),
+                                     *(_null_last(r[c]) for c in cols if c != "ring")))
+        return rows
+
+    def rings(self) -> list[str]:
+        return sorted((r[0] for r in self.db.execute(
+            "SELECT DISTINCT ring FROM analyses")), key=_ring_key)
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+
+def _ring_key(ring: str):
+    return (0, int(ring), "") if ring.isdigit() else (1, 0, ring)
+
+
+def _null_last(v):
+    return (v is None, v if v is not None else 0)
+
+
+# =======================================================================
+#  FRA ANALYSENE  --------------------------------------------------------
+# =======================================================================
+def record_analysis(directory: str | os.PathLike, *, source: str,
+                    block_size: int, tol: float, range_tol: float | None,
+                    eta_mean: float, excluded_runs, n_runs: int, n_blocks: int,
+                    temps=(), hums=(), files=(), name: str | None = None,
+                    range_metric: float | None = None,
+                    range_ok: bool | None = None, intervals=None,
+                    trough: str | None = None, db_path: str | os.PathLike | None = None) -> dict | None:
+    """
+    Lagre resultatet fra analyze()/stats(). En feil i databasen stopper
+    ikke analysen; den skrives ut og None returneres.
+
+    `intervals` er bootstrap.Intervals (eller None), `trough` metoden for
+    første bunnpunkt (TROUGH_METHODS).
+    """
+    ring, rnd, day = describe_ring(directory, files, name)
+    excluded_runs = [int(x) for x in excluded_runs]
+    row = dict(ring=ring, round=rnd, date=day, block_size=int(block_size),
+               tol=float(tol),
+               range_tol=None if range_tol is None else float(range_tol),
+               source=source, eta_mean=_finite(eta_mean),
+               range_metric=None if range_metric is None else _finite(range_metric),
+               range_ok=None if range_ok is None else int(bool(range_ok)),
+               excl_pct=100 * len(excluded_runs) / n_runs if n_runs else None,
+               excluded_runs=excluded_runs, n_runs=int(n_runs),
+               n_blocks=int(n_blocks), temp_mean=_nanmean(temps),
+               hum_mean=_nanmean(hums),
+               directory=str(Path(directory).resolve()), trough=trough)
+    if intervals is not None:
+        row.update({c: _finite(getattr(intervals, c)) for c in _ADDED})
+    try:
+        with ResultsDB(db_path or RESULTS_DB) as db:
+            db.record(row)
+    except sqlite3.Error as e:
+        print(f"⚠️  Resultat ikke lagret i {db_path or RESULTS_DB}: {e}")
+        return None
+    return row
+
+
+# =======================================================================
+#  KOMMANDOLINJE  --------------------------------------------------------
+# =======================================================================
+_SHOW = {
+    "history": ("date", "round", "block_size", "tol", "range_tol", "source",
+                "trough", "eta_mean", "eta_lo", "eta_hi", "range_metric", "range_p",
+                "excl_pct", "n_runs", "temp_mean", "hum_mean"),
+}
+
+
+def _fmt(v) -> str:
+    if v is None:
+        return "–"
+    if isinstance(v, float):
+        return f"{v:.3f}"
+    return str(v)
+
+
+def print_rows(rows: list[dict], cols=None) -> None:
+    if not rows:
+        print("(ingen treff)")
+        return
+    cols = cols or list(rows[0])
+    table = [[_fmt(r.get(c)) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(t[i]) for t in table)) for i, c in enumerate(cols)]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for t in table:
+        print("  ".join(v.rjust(w) for v, w in zip(t, widths)))
+
+
+def add_arguments(p) -> None:
+    """Argumenter for `python -m pendel.resultdb` og `pendel results`."""
+    p.add_argument("--db", default=None, help=f"databasefil (standard {RESULTS_DB})")
+    sub = p.add_subparsers(dest="query", required=True)
+    h = sub.add_parser("history", help="alle analyser av én ring")
+    h.add_argument("ring")
+    h.add_argument("--limit", type=int, default=None, help="bare de n siste")
+    s = sub.add_parser("summary", help="aggregater per ring (eller annen gruppering)")
+    s.add_argument("--by", nargs="+", default=["ring", "trough"],
+                   choices=["ring", "round", "date", "block_size", "tol",
+                            "range_tol", "source", "trough"])
+    sub.add_parser("latest", help="siste analyse per ring og runde")
+    sub.add_parser("rings", help="alle ringer i databasen")
+    for q in (h, s, sub.choices["latest"]):
+        q.add_argument("--round", type=int, default=None)
+        q.add_argument("--block-size", type=int, default=None)
+        q.add_argument("--tol", type=float, default=None)
+        q.add_argument("--range-tol", type=float, default=None)
+        q.add_argument("--source", default=None, choices=["analyze", "stats", "batch"])
+        q.add_argument("--trough", default=None, choices=TROUGH_METHODS,
+                       help="bunnpunktmetode (rå eller resamplet serie)")
+        q.add_argument("--since", default=None, help="fra dato (YYYY-MM-DD)")
+        q.add_argument("--until", default=None, help="til dato (YYYY-MM-DD)")
+
+
+def run_query(args) -> None:
+    with ResultsDB(args.db or RESULTS_DB) as db:
+        if args.query == "rings":
+            print(" ".join(db.rings()) or "(tom database)")
+            return
+        filters = dict(round=args.round, block_size=args.block_size, tol=args.tol,
+                       range_tol=args.range_tol, source=args.source,
+                       trough=args.trough, since=args.since, until=args.until)
+        t0 = time.perf_counter()
+        if args.query == "history":
+            rows = db.history(args.ring, limit=args.limit, **filters)
+            cols = _SHOW["history"]
+        elif args.query == "latest":
+            rows = db.latest(**filters)
+            cols = ("ring",) + _SHOW["history"]
+        else:
+            rows = db.summary(tuple(args.by), **filters)
+            cols = None
+        dt = time.perf_counter() - t0
+        print_rows(rows, cols)
+        print(f"\n{len(rows)} rader på {dt * 1000:.1f} ms "
+              f"({db.count()} analyser i {db.path})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Spørringer mot resultatdatabasen")
+    add_arguments(p)
+    run_query(p.parse_args())
@@ -0,0 +1,400 @@
+"""
+Persistent mellomlager for parsede runs (SQLite).
+
+For hver JSON-fil lagres de parsede arrayene (encoder + tid), temp/hum,
+indeksen til første minimum og |første bunnpunkt| på rå samples
+(`alignment.first_troughs`, det `load_troughs` returnerer). Nøkkel er
+filsti + størrelse + mtime + innholds-hash:
+
+*  lik størrelse og mtime          → treff uten å lese filen
+*  endret størrelse/mtime          → filen hashes; lik hash gir treff
+                                     (kun mtime oppdateres), ellers
+                                     parses den på nytt
+*  ny fil                          → parses og legges inn
+
+Lageret har en størrelsesgrense og kaster ut minst nylig brukte runs
+(LRU). Tøm det fra kommandolinjen:
+
+    python -m pendel.runcache clear [mappe]   # alt, eller bare én ring
+    python -m pendel.runcache info
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from .runstore import (read_json_run, list_json_files, load_runs,
+                      is_store, RunStore, STORE_NAME, store_is_current,
+                      skip_bad, BAD_RUN_ERRORS)
+from .alignment import first_minima, first_troughs
+from .parallel_load import parse_files
+from . import profiling
+
+# -----------------------------  PARAMETRE  -----------------------------
+CACHE_PATH      = Path(os.environ.get("PENDEL_CACHE",
+                                      Path.home() / ".pendel" / "runcache.sqlite"))
+CACHE_MAX_BYTES = 512 * 2**20     # 512 MiB før LRU-utkasting
+CHUNK_RUNS      = 128             # runs per bit i iter_dataset
+# -----------------------------------------------------------------------
+
+_VERSION = 2        # 2: trough er raffinert rått bunnpunkt (first_troughs)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    digest    TEXT    NOT NULL,
+    encoder   BLOB    NOT NULL,
+    time      BLOB    NOT NULL,
+    temp      REAL,
+    hum       REAL,
+    min_idx   INTEGER NOT NULL,
+    trough    REAL,                    -- |første bunnpunkt|, NULL for tomme runs
+    nbytes    INTEGER NOT NULL,
+    last_used REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_last_used ON runs(last_used);
+"""
+
+
+def _digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class RunCache:
+    """
+    Mellomlager for parsede runs.
+
+    Eksempel
+    --------
+    with RunCache() as cache:
+        runs = cache.get_runs("data/ring7")
+    """
+
+    def __init__(self, path: str | os.PathLike = CACHE_PATH,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=60)   # flere prosesser (batch)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < _VERSION:
+            # eldre lager har en annen bunnverdi – bygges opp på nytt
+            self.db.executescript(f"DROP TABLE IF EXISTS runs; "
+                                  f"PRAGMA user_version = {_VERSION};")
+        self.db.executescript(_SCHEMA)
+        self.hits = self.misses = 0
+        self.skipped: list[str] = []        # ødelagte filer i siste get_runs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    # ------------------------------------------------------------------
+    def get_runs(self, directory: str | os.PathLike,
+                 files: list[str] | None = None) -> list[tuple]:
+        """
+        Hent alle runs i `directory` (natural_key-rekkefølge).
+
+        Returns
+        -------
+        list av (encoder, tid, temp, hum, min_idx, trough), én per fil;
+        ødelagte filer hoppes over og står i `self.skipped`.
+        """
+        directory = Path(directory).resolve()
+        if files is None:
+            files = list_json_files(directory)
+
+        now = time.time()
+        self.skipped = []
+        out, touched, fresh, pending = [], [], [], []
+        for fn in files:
+            fpath = directory / fn
+            st = os.stat(fpath)
+            key = str(fpath)
+            row = self.db.execute(
+                "SELECT size, mtime_ns, digest, encoder, time, temp, hum, "
+                "min_idx, trough FROM runs WHERE path = ?", (key,)).fetchone()
+
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                out.append(self._unpack(row))
+                touched.append((now, key))
+                self.hits += 1
+                continue
+            out.append(None)                          # fylles inn under
+            pending.append((len(out) - 1, fpath, key, st, row))
+
+        # nye/endrede filer: les og pars parallelt (parallel_load)
+        parsed = parse_files([p[1] for p in pending], digest=True)
+        for (pos, fpath, key, st, row), r in zip(pending, parsed):
+            if row and row[2] == r.digest:            # bare mtime endret
+                out[pos] = self._unpack(row)
+                self.db.execute("UPDATE runs SET size=?, mtime_ns=?, last_used=? "
+                                "WHERE path=?", (st.st_size, st.st_mtime_ns, now, key))
+                self.hits += 1
+                continue
+            if r.error is not None:                   # avkuttet/ødelagt
+                skip_bad(fpath, r.error)
+                self.skipped.append(fpath.name)
+                continue
+            fresh.append((pos, key, st, r))
+            self.misses += 1
+
+        # bunnpunktene for alle nye runs på én gang (vektorisert)
+        new = [r for *_, r in fresh]
+        min_idx = first_minima([r.enc for r in new])
+        troughs = first_troughs([r.enc for r in new], [r.t for r in new], min_idx)
+        rows = []
+        for (pos, key, st, r), i, trough in zip(fresh, min_idx.tolist(), troughs.tolist()):
+            out[pos] = (r.enc, r.t, r.temp, r.hum, i, trough)
+            rows.append((key, st.st_size, st.st_mtime_ns, r.digest,
+                         r.enc.tobytes(), r.t.tobytes(), r.temp, r.hum,
+                         i, None if np.isnan(trough) else trough,
+                         r.enc.nbytes + r.t.nbytes, now))
+        out = [r for r in out if r is not None]
+
+        profiling.count("cache_hits", len(touched))
+        with self.db:
+            self.db.executemany("UPDATE runs SET last_used=? WHERE path=?", touched)
+            self.db.executemany("INSERT OR REPLACE INTO runs VALUES "
+                                "(?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+        if rows:
+            self.evict()
+        return out
+
+    @staticmethod
+    def _unpack(row) -> tuple:
+        enc = np.frombuffer(row[3], float)
+        t   = np.frombuffer(row[4], float)
+        temp = row[5] if row[5] is not None else np.nan
+        hum  = row[6] if row[6] is not None else np.nan
+        trough = row[8] if row[8] is not None else np.nan
+        return enc, t, temp, hum, row[7], trough
+
+    # ------------------------------------------------------------------
+    def total_bytes(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM runs").fetchone()[0]
+
+    def evict(self) -> int:
+        """Kast ut minst nylig brukte runs til lageret er under grensen."""
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+        victims, freed = [], 0
+        for path, nbytes in self.db.execute(
+                "SELECT path, nbytes FROM runs ORDER BY last_used"):
+            victims.append((path,))
+            freed += nbytes
+            if freed >= excess:
+                break
+        with self.db:
+            self.db.executemany("DELETE FROM runs WHERE path = ?", victims)
+        return len(victims)
+
+    def clear(self, directory: str | os.PathLike | None = None) -> int:
+        """Slett alt, eller bare runs under `directory`. Returnerer antall."""
+        with self.db:
+            if directory is None:
+                cur = self.db.execute("DELETE FROM runs")
+            else:
+                prefix = str(Path(directory).resolve()) + os.sep
+                cur = self.db.execute("DELETE FROM runs WHERE substr(path, 1, ?) = ?",
+                                      (len(prefix), prefix))
+        self.db.execute("VACUUM")
+        return cur.rowcount
+
+    def info(self) -> dict:
+        n = self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return dict(path=str(self.path), runs=n, bytes=self.total_bytes(),
+                    max_bytes=self.max_bytes)
+
+
+# =======================================================================
+#  FELLES INNLESING FOR ANALYSEN  ----------------------------------------
+# =======================================================================
+def load_dataset(directory: str | os.PathLike, *,
+                 cache: "RunCache | bool | None" = True,
+                 compact: bool = False):
+    """
+    Som `runstore.load_runs`, men bruker mellomlageret for JSON-mapper
+    og returnerer i tillegg indeksen til første minimum per run.
+
+    `cache=True` bruker standardlageret, en RunCache brukes som den er,
+    og False/None leser uten mellomlager.
+
+    Med `compact=True` pakkes runs i en compact.RunSet (pulstall + ms-
+    delta) etter hvert som de leses; enc_list og t_list er da late
+    float64-visninger av den, med samme verdier.
+
+    Returns
+    -------
+    enc_list, t_list, temps, hums, names, min_idx
+    """
+    with profiling.span("load", directory=str(directory)):
+        return _load_dataset(Path(directory), cache, compact)
+
+
+def _load_dataset(directory: Path, cache, compact: bool):
+    if compact:
+        from .compact import pack_dataset
+        runs, min_idx = pack_dataset(directory, cache=cache)
+        return (runs.enc_list, runs.t_list, np.array(runs.temps),
+                np.array(runs.hums), runs.names, min_idx)
+    files = [] if is_store(directory) else list_json_files(directory)
+    use_store = (not files or
+                 store_is_current(directory, directory / STORE_NAME, files))
+
+    if use_store or not cache:
+        enc_list, t_list, temps, hums, names = load_runs(directory)
+        return enc_list, t_list, temps, hums, names, first_minima(enc_list)
+
+    own = cache is True
+    rc = RunCache() if own else cache
+    try:
+        runs = rc.get_runs(directory, files)
+    finally:
+        if own:
+            rc.close()
+
+    if rc.skipped:                            # ødelagte filer hoppet over
+        files = [fn for fn in files if fn not in set(rc.skipped)]
+
+    enc_list = [r[0] for r in runs]
+    t_list   = [r[1] for r in runs]
+    temps    = np.array([r[2] for r in runs], float)
+    hums     = np.array([r[3] for r in runs], float)
+    min_idx  = np.array([r[4] for r in runs], np.int64)
+    return enc_list, t_list, temps, hums, files, min_idx
+
+
+def load_troughs(directory: str | os.PathLike, *,
+                 cache: "RunCache | bool | None" = True):
+    """
+    |Første bunnpunkt| per run (`alignment.first_troughs`). Fra
+    mellomlageret er verdiene allerede beregnet og rådata beholdes ikke;
+    ellers leses runs bit for bit (iter_dataset) og bunnpunktet beregnes.
+
+    Returns
+    -------
+    trough_vals, temps, hums, names
+    """
+    directory = Path(directory)
+    with profiling.span("load", directory=str(directory)):
+        files = [] if is_store(directory) else list_json_files(directory)
+        if (cache and files and
+                not store_is_current(directory, directory / STORE_NAME, files)):
+            own = cache is True
+            rc = RunCache() if own else cache
+            try:
+                runs = rc.get_runs(directory, files)
+            finally:
+                if own:
+                    rc.close()
+            skipped = set(rc.skipped)
+            return (np.array([r[5] for r in runs], float),
+                    np.array([r[2] for r in runs], float),
+                    np.array([r[3] for r in runs], float),
+                    [fn for fn in files if fn not in skipped])
+
+        parts = []
+        for enc_list, t_list, temps, hums, names, idx in iter_dataset(
+                directory, cache=None):
+            parts.append((first_troughs(enc_list, t_list, idx), temps, hums, names))
+    if not parts:
+        return np.zeros(0), np.zeros(0), np.zeros(0), []
+    vals, temps, hums, names = zip(*parts)
+    return (np.concatenate(vals), np.concatenate(temps), np.concatenate(hums),
+            [n for part in names for n in part])
+
+
+def iter_dataset(directory: str | os.PathLike, *,
+                 cache: "RunCache | bool | None" = True,
+                 chunk: int = CHUNK_RUNS):
+    """
+    Som `load_dataset`, men i biter på maks `chunk` runs i testrekkefølge,
+    så minnebruken ikke vokser med antall runs.
+
+    Yields
+    ------
+    enc_list, t_list, temps, hums, names, min_idx   (for én bit)
+    """
+    directory = Path(directory)
+    files = [] if is_store(directory) else list_json_files(directory)
+    if not files:
+        store = RunStore(directory) if is_store(directory) else None
+    elif store_is_current(directory, directory / STORE_NAME, files):
+        store = RunStore(directory / STORE_NAME)
+    else:
+        store = None
+
+    if store is not None:                     # utsnitt av memmap, ingen kopi
+        for s in range(0, len(store), chunk):
+            rows = range(s, min(s + chunk, len(store)))
+            with profiling.span("load.chunk", runs=len(rows)):
+                enc_list = [store.run(i)[0] for i in rows]
+                part = (enc_list, [store.run(i)[1] for i in rows],
+                        np.asarray(store.temps[s:s + chunk]),
+                        np.asarray(store.hums[s:s + chunk]),
+                        store.names[s:s + chunk], first_minima(enc_list))
+            yield part
+        return
+
+    own = cache is True
+    rc = RunCache() if own else (cache or None)
+    try:
+        for s in range(0, len(files), chunk):
+            part = files[s:s + chunk]
+            with profiling.span("load.chunk", runs=len(part)):
+                if rc is not None:
+                    runs = rc.get_runs(directory, part)
+                    if rc.skipped:                # ødelagte filer hoppet over
+                        part = [fn for fn in part if fn not in set(rc.skipped)]
+                    min_idx = np.array([r[4] for r in runs], np.int64)
+                else:
+                    runs, kept = [], []
+                    for fn in part:
+                        try:
+                            runs.append(read_json_run(directory / fn))
+                        except BAD_RUN_ERRORS as e:
+                            skip_bad(directory / fn, f"{type(e).__name__}: {e}")
+                            continue
+                        kept.append(fn)
+                    part = kept
+                    min_idx = first_minima([r[0] for r in runs])
+            yield ([r[0] for r in runs], [r[1] for r in runs],
+                   np.array([r[2] for r in runs], float),
+                   np.array([r[3] for r in runs], float), part, min_idx)
+    finally:
+        if own:
+            rc.close()
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Administrer analyse-mellomlageret")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("clear", help="tøm lageret (eventuelt bare én mappe)")
+    c.add_argument("directory", nargs="?", default=None)
+    sub.add_parser("info", help="vis størrelse og antall runs")
+    args = p.parse_args()
+
+    with RunCache() as rc:
+        if args.cmd == "clear":
+            n = rc.clear(args.directory)
+            print(f"Slettet {n} runs fra {rc.path}")
+        else:
+            for k, v in rc.info().items():
+                print(f"{k:10s}: {v}")
@@ -0,0 +1,391 @@
+"""
+Kolonnebasert, minnemappbar lagring av alle tester for én ring.
+
+I stedet for én innrykket JSON-fil per test lagres hele ringen som
+noen få rå binærfiler i en katalog (``<ring>/runs.pstore``):
+
+    meta.json     navn på testene + antall committede runs
+    encoder.f8    alle encoder-verdier etter hverandre   (float64)
+    time.f8       alle test_time_ms etter hverandre      (float64)
+    offsets.i8    startindeks per run, lengde n_runs + 1 (int64)
+    temp.f8       én temperatur per run                  (float64)
+    hum.f8        én fuktighet per run                   (float64)
+
+Kolonnene åpnes med ``np.memmap`` og hvert run er bare et utsnitt
+(``encoder[off[i]:off[i+1]]``) – ingen kopiering, ingen JSON-parsing.
+
+Bruk fra kommandolinjen for å importere en eksisterende JSON-mappe:
+
+    python -m pendel.runstore <json-mappe> [lagringssti]
+"""
+
+import os
+import re
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from . import profiling
+
+# -----------------------------  PARAMETRE  -----------------------------
+STORE_NAME    = "runs.pstore"     # standardnavn inne i ringmappen
+STORE_MAGIC   = "pendel-runstore"
+STORE_VERSION = 1
+QUARANTINE    = "karantene"       # undermappe for ødelagte JSON-filer
+
+_COLUMNS = {                      # filnavn → dtype (little-endian)
+    "encoder": ("encoder.f8", "<f8"),
+    "time":    ("time.f8",    "<f8"),
+    "offsets": ("offsets.i8", "<i8"),
+    "temp":    ("temp.f8",    "<f8"),
+    "hum":     ("hum.f8",     "<f8"),
+}
+# -----------------------------------------------------------------------
+
+
+# =======================================================================
+#  JSON-FORMATET (som sendt fra ESP32)  -----------------------------------
+# =======================================================================
+def natural_key(fn: str) -> int:
+    """Siste tall i filnavnet, brukes for å sortere på testnummer."""
+    nums = re.findall(r"\d+", fn)
+    return int(nums[-1]) if nums else -1
+
+
+def list_json_files(directory: str | os.PathLike) -> list[str]:
+    """Alle .json-filer i `directory`, sortert på testnummer."""
+    return sorted(
+        (f for f in os.listdir(directory) if f.lower().endswith(".json")),
+        key=natural_key
+    )
+
+
+def parse_run(data: dict) -> tuple[np.ndarray, np.ndarray, float, float]:
+    """
+    Gjør om ett JSON-objekt fra ESP32 til (encoder, tid, temp, hum).
+
+    Samme regler som `process_dataset` alltid har brukt: skalar encoder
+    blir lengde 1, manglende tid blir 0..n-1, og temp/hum som liste
+    reduseres til første element (NaN hvis tom/mangler).
+    """
+    enc = np.asarray(data["encoder"], float)
+    if enc.ndim == 0:
+        enc = enc.reshape(1)
+
+    t = np.asarray(data.get("test_time_ms") or range(enc.size), float)
+    if t.size != enc.size:
+        t = np.resize(t, enc.size)
+
+    temp = data.get("temp")
+    hum  = data.get("hum")
+    if isinstance(temp, list):
+        temp = temp[0] if temp else np.nan
+    if isinstance(hum, list):
+        hum = hum[0] if hum else np.nan
+    temp = float(temp) if temp is not None else np.nan
+    hum  = float(hum)  if hum  is not None else np.nan
+
+    return enc, t, temp, hum
+
+
+def read_json_run(path: str | os.PathLike):
+    """Les og pars én JSON-fil. Se `parse_run`."""
+    with open(path, encoding="utf-8") as f:
+        profiling.count("bytes_read", os.fstat(f.fileno()).st_size)
+        run = parse_run(json.load(f))
+    profiling.count("files_parsed")
+    return run
+
+
+# feil som betyr at en JSON-fil er avkuttet eller ødelagt
+BAD_RUN_ERRORS = (ValueError, KeyError, TypeError, UnicodeDecodeError)
+
+
+def skip_bad(path: str | os.PathLike, reason: str, *, log=print) -> None:
+    """
+    Meld fra om en ødelagt fil som hoppes over ved innlesing. Filen
+    røres ikke: analysen skal aldri endre dataene (mappen kan dessuten
+    være skrivebeskyttet, eller inneholde andre JSON-filer).
+    """
+    log(f"Hopper over {Path(path).name} ({reason})")
+    profiling.count("runs_skipped")
+
+
+def quarantine(path: str | os.PathLike, reason: str, *, log=print) -> Path:
+    """
+    Flytt en ødelagt fil til <mappe>/karantene/ og logg årsaken i
+    karantene/karantene.log. Brukes bare av innsamlingsjournalen, for
+    filene i dens egen serie (se journal.py); innlesing bruker `skip_bad`.
+    """
+    path = Path(path)
+    qdir = path.parent / QUARANTINE
+    qdir.mkdir(exist_ok=True)
+    dest = qdir / path.name
+    n = 1
+    while dest.exists():                    # behold tidligere utgaver
+        dest = qdir / f"{path.name}.{n}"
+        n += 1
+    shutil.move(path, dest)
+    with open(qdir / "karantene.log", "a", encoding="utf-8") as f:
+        f.write(f"{datetime.now().isoformat(timespec='seconds')}\t"
+                f"{path.name}\t{reason}\n")
+    log(f"Karantene: {path.name} ({reason}) → {dest}")
+    profiling.count("runs_quarantined")
+    return dest
+
+
+# =======================================================================
+#  KOLONNELAGER  ---------------------------------------------------------
+# =======================================================================
+def is_store(path: str | os.PathLike) -> bool:
+    """True hvis `path` er en runstore-katalog."""
+    meta = Path(path) / "meta.json"
+    if not meta.is_file():
+        return False
+    try:
+        with open(meta, encoding="utf-8") as f:
+            return json.load(f).get("magic") == STORE_MAGIC
+    except (OSError, ValueError):
+        return False
+
+
+def _read_meta(path: Path) -> dict:
+    with open(path / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("magic") != STORE_MAGIC:
+        raise ValueError(f"«{path}» er ikke en runstore")
+    if meta.get("version") != STORE_VERSION:
+        raise ValueError(f"Ukjent runstore-versjon {meta.get('version')} i «{path}»")
+    return meta
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    # meta.json er commit-punktet: skrives atomisk til slutt
+    tmp = path / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, path / "meta.json")
+
+
+def create_store(path: str | os.PathLike, *, overwrite: bool = False) -> Path:
+    """Opprett en tom runstore i `path`."""
+    path = Path(path)
+    if path.exists() and not overwrite and any(path.iterdir()):
+        raise FileExistsError(f"«{path}» finnes allerede")
+    path.mkdir(parents=True, exist_ok=True)
+
+    for fname, _ in _COLUMNS.values():
+        open(path / fname, "wb").close()
+    np.zeros(1, "<i8").tofile(path / _COLUMNS["offsets"][0])
+
+    _write_meta(path, dict(magic=STORE_MAGIC, version=STORE_VERSION,
+                           n_runs=0, n_samples=0, names=[]))
+    return path
+
+
+def append_runs(path: str | os.PathLike, runs) -> int:
+    """
+    Legg til runs på slutten av en eksisterende runstore.
+
+    Parameters
+    ----------
+    path : str | PathLike
+        Runstore-katalogen.
+    runs : iterable av (name, encoder, time, temp, hum)
+
+    Returns
+    -------
+    int
+        Antall runs i lageret etterpå.
+
+    Kolonnefilene kuttes først ned til det meta.json sier er committet,
+    slik at et avbrutt tidligere forsøk ikke etterlater søppel.
+    """
+    path = Path(path)
+    meta = _read_meta(path)
+    n_runs, n_samples = meta["n_runs"], meta["n_samples"]
+
+    committed = {"encoder": n_samples, "time": n_samples,
+                 "offsets": n_runs + 1, "temp": n_runs, "hum": n_runs}
+    handles = {}
+    try:
+        for col, (fname, dtype) in _COLUMNS.items():
+            fh = open(path / fname, "r+b")
+            fh.truncate(committed[col] * np.dtype(dtype).itemsize)
+            fh.seek(0, os.SEEK_END)
+            handles[col] = fh
+
+        names = list(meta["names"])
+        for name, enc, t, temp, hum in runs:
+            enc = np.asarray(enc, "<f8").reshape(-1)
+            t   = np.asarray(t,   "<f8").reshape(-1)
+            if t.size != enc.size:
+                raise ValueError(f"{name}: encoder og tid har ulik lengde")
+            handles["encoder"].write(enc.tobytes())
+            handles["time"].write(t.tobytes())
+            n_samples += enc.size
+            handles["offsets"].write(np.array([n_samples], "<i8").tobytes())
+            handles["temp"].write(np.array([temp], "<f8").tobytes())
+            handles["hum"].write(np.array([hum], "<f8").tobytes())
+            names.append(str(name))
+    finally:
+        for fh in handles.values():
+            fh.flush()
+            os.fsync(fh.fileno())
+            fh.close()
+
+    meta.update(n_runs=len(names), n_samples=n_samples, names=names)
+    _write_meta(path, meta)
+    return len(names)
+
+
+class RunStore:
+    """
+    Minnemappet, skrivebeskyttet visning av en runstore.
+
+    Eksempel
+    --------
+    store = RunStore("ring7/runs.pstore")
+    enc, t = store.run(0)           # utsnitt, ingen kopi
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        meta = _read_meta(self.path)
+        self.names: list[str] = list(meta["names"])
+        self.n_runs: int = meta["n_runs"]
+        n_samples: int = meta["n_samples"]
+
+        self.encoder = self._map("encoder", n_samples)
+        self.time    = self._map("time", n_samples)
+        self.offsets = self._map("offsets", self.n_runs + 1)
+        self.temps   = self._map("temp", self.n_runs)
+        self.hums    = self._map("hum", self.n_runs)
+
+    def _map(self, col: str, count: int) -> np.ndarray:
+        fname, dtype = _COLUMNS[col]
+        if count == 0:                      # np.memmap tåler ikke tomme filer
+            return np.zeros(0, dtype)
+        return np.memmap(self.path / fname, dtype=dtype, mode="r",
+                         shape=(count,))
+
+    def __len__(self) -> int:
+        return self.n_runs
+
+    def run(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """(encoder, tid) for run nr. `i` (0-basert) som utsnitt."""
+        s, e = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.encoder[s:e], self.time[s:e]
+
+    def lengths(self) -> np.ndarray:
+        """Antall samples per run."""
+        return np.diff(self.offsets)
+
+    def enc_list(self) -> list[np.ndarray]:
+        return [self.run(i)[0] for i in range(self.n_runs)]
+
+    def t_list(self) -> list[np.ndarray]:
+        return [self.run(i)[1] for i in range(self.n_runs)]
+
+
+# =======================================================================
+#  IMPORT + TRANSPARENT LESING  ------------------------------------------
+# =======================================================================
+def import_json_dir(json_dir: str | os.PathLike,
+                    store_path: str | os.PathLike | None = None,
+                    *, overwrite: bool = True) -> Path:
+    """
+    Konverter en katalog med JSON-filer til en runstore.
+
+    Standard plassering er ``<json_dir>/runs.pstore``. Rekkefølgen er
+    den samme som `process_dataset` bruker (natural_key). Ødelagte
+    JSON-filer meldes, tas ikke med og står i meta["skipped"], så
+    `store_is_current` fortsatt kjenner igjen mappen.
+    """
+    json_dir = Path(json_dir)
+    store_path = Path(store_path) if store_path else json_dir / STORE_NAME
+    files = list_json_files(json_dir)
+    skipped = []
+
+    def runs():
+        for fn in files:
+            try:
+                yield (fn, *read_json_run(json_dir / fn))
+            except BAD_RUN_ERRORS as e:
+                skip_bad(json_dir / fn, f"{type(e).__name__}: {e}")
+                skipped.append(fn)
+
+    create_store(store_path, overwrite=overwrite)
+    append_runs(store_path, runs())
+    if skipped:
+        meta = _read_meta(store_path)
+        meta["skipped"] = skipped
+        _write_meta(store_path, meta)
+    return store_path
+
+
+def store_is_current(directory: Path, store_path: Path,
+                      files: list[str]) -> bool:
+    """
+    Lageret dekker nøyaktig de samme filene – utenom de som ble hoppet
+    over ved importen (meta["skipped"]) – og er nyere enn alle.
+    """
+    try:
+        meta = _read_meta(store_path)
+        store_mtime = (store_path / "meta.json").stat().st_mtime
+    except (OSError, ValueError):
+        return False
+    skipped = set(meta.get("skipped", ()))
+    if meta["names"] != [fn for fn in files if fn not in skipped]:
+        return False
+    return all(os.stat(directory / fn).st_mtime <= store_mtime for fn in files)
+
+
+def load_runs(directory: str | os.PathLike):
+    """
+    Les alle runs for én ring, uansett format.
+
+    `directory` kan være en runstore, eller en JSON-mappe. En JSON-mappe
+    med en oppdatert ``runs.pstore`` (samme filer, nyere enn alle) leses
+    fra lageret; ellers parses JSON-filene som før.
+
+    Returns
+    -------
+    enc_list, t_list : list[np.ndarray]
+    temps, hums      : np.ndarray
+    names            : list[str]     (filnavn i testrekkefølge)
+    """
+    directory = Path(directory)
+
+    if is_store(directory):
+        store = RunStore(directory)
+    else:
+        files = list_json_files(directory)
+        store_path = directory / STORE_NAME
+        if files and store_is_current(directory, store_path, files):
+            store = RunStore(store_path)
+        else:                               # parallelt for store mapper
+            from .parallel_load import load_json_runs
+            return load_json_runs(directory, files)
+
+    return (store.enc_list(), store.t_list(),
+            np.asarray(store.temps), np.asarray(store.hums), store.names)
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Importer JSON-mappe til runstore")
+    p.add_argument("json_dir", help="mappe med .json-filer for én ring")
+    p.add_argument("store", nargs="?", default=None,
+                   help=f"sti for lageret (standard: <json_dir>/{STORE_NAME})")
+    args = p.parse_args()
+
+    out = import_json_dir(args.json_dir, args.store)
+    print(f"Importerte {len(RunStore(out))} runs til {out}")
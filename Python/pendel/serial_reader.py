@@ -0,0 +1,176 @@
+"""
+Bakgrunnstråder for seriell mottak og lagring under datainnsamling.
+
+*  SerialReader  – leser rå bytes fra porten i en egen tråd, deler dem i
+                   linjer og binære rammer (binframe.StreamDecoder) og
+                   legger dem i en begrenset kø. Nyttelasten (JSON-linje
+                   eller COBS-ramme) dekodes aldri her; den leveres som
+                   bytes.
+*  FileWriter    – skriver mottatte nyttelaster til disk i en egen tråd,
+                   slik at neste START kan sendes med en gang. Filene
+                   skrives atomisk og kan føres i en journal (journal.py).
+
+Begge registrerer tidsstempler (time.perf_counter) slik at
+`_acquire_tests` kan rapportere START → første byte, overføringstid
+og skrivetid per test.
+"""
+
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+from .binframe import StreamDecoder
+from .journal import write_atomic
+from . import profiling
+
+
+class Frame(NamedTuple):
+    """Én komplett linje eller binær ramme fra ESP32."""
+    kind: str                    # "json", "bin" eller "line"
+    data: bytes                  # linjen uten \r\n / COBS-bytes uten 0x00
+    t_first_byte: float | None   # første byte etter siste arm()
+    t_start: float               # første byte i denne linjen
+    t_end: float                 # linjeskift mottatt
+
+
+class SerialReader(threading.Thread):
+    """
+    Leser kontinuerlig fra `ser` og legger Frame-objekter i `self.queue`.
+
+    Kall `arm()` rett før START sendes: gamle, uleste linjer kastes og
+    tiden til første byte måles fra da av.
+
+    Feiler porten (f.eks. USB-kabelen trukket ut), stopper tråden og
+    feilen ligger i `self.error`; `get()` kaster den videre når køen er
+    tom, så innsamlingen stopper i stedet for å vente for alltid.
+    """
+
+    def __init__(self, ser, *, maxsize: int = 64):
+        super().__init__(name="serial-reader", daemon=True)
+        self.ser = ser
+        self.queue: queue.Queue[Frame] = queue.Queue(maxsize)
+        self._halt = threading.Event()
+        self._lock = threading.Lock()
+        self._decoder = StreamDecoder()
+        self._line_t0 = float("nan")
+        self._armed = False
+        self._first_byte: float | None = None
+        self.error: BaseException | None = None
+
+    # ------------------------------------------------------------------
+    def arm(self) -> None:
+        """Forkast gamle data og start ny måling av første byte."""
+        with self._lock:
+            self._decoder.clear()
+            self._armed = True
+            self._first_byte = None
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join(timeout=2)
+
+    def get(self, timeout: float = 0.5) -> Frame | None:
+        """Neste ramme, eller None etter `timeout` (holder Ctrl-C levende)."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            if self.error is not None:
+                raise self.error
+            if not self.is_alive():
+                raise RuntimeError("SerialReader er stoppet")
+            return None
+
+    # ------------------------------------------------------------------
+    def run(self) -> None:
+        try:
+            self._read_loop()
+        except Exception as e:                 # SerialException er en OSError
+            self.error = e
+
+    def _read_loop(self) -> None:
+        while not self._halt.is_set():
+            data = self.ser.read(max(1, self.ser.in_waiting))   # ≤ ser.timeout
+            if not data:
+                continue
+            now = time.perf_counter()
+            with self._lock:
+                if self._armed and self._first_byte is None:
+                    self._first_byte = now
+                frames = self._feed(data, now)
+            for fr in frames:
+                while not self._halt.is_set():
+                    try:
+                        self.queue.put(fr, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+    def _feed(self, data: bytes, now: float) -> list[Frame]:
+        """Legg til bytes og returner alle linjer/rammer som nå er komplette."""
+        if not self._decoder.buf:
+            self._line_t0 = now
+        frames = [Frame(kind, item, self._first_byte, self._line_t0, now)
+                  for kind, item in self._decoder.feed(data)]
+        if frames:
+            self._line_t0 = now
+        return frames
+
+
+class FileWriter(threading.Thread):
+    """
+    Skriver (filsti, bytes) til disk i bakgrunnen.
+
+    Hver fil skrives atomisk (write_atomic), så en avbrutt skriving aldri
+    etterlater en avkuttet JSON. Med `journal` registreres filene der og
+    fsynces i puljer; `close()` fsyncer resten.
+
+    `close()` venter til køen er tom og returnerer skrivetid per fil.
+    Feil i skrivetråden kastes videre fra `close()`.
+    """
+
+    def __init__(self, *, maxsize: int = 64, journal=None):
+        super().__init__(name="file-writer", daemon=True)
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.journal = journal
+        self.write_times: dict[str, float] = {}
+        self._error: BaseException | None = None
+
+    def submit(self, filepath: str, payload: bytes) -> None:
+        if self._error is not None:
+            raise self._error
+        self.queue.put((filepath, payload))
+
+    def run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                if self.journal is not None and self._error is None:
+                    try:
+                        self.journal.commit()
+                    except BaseException as e:  # rapporteres i close()
+                        self._error = e
+                return
+            filepath, payload = item
+            try:
+                t0 = time.perf_counter()
+                with profiling.span("file.write", bytes=len(payload)):
+                    write_atomic(filepath, payload)
+                    if self.journal is not None:
+                        self.journal.add_run(filepath, payload)
+                self.write_times[filepath] = time.perf_counter() - t0
+                profiling.count("bytes_written", len(payload))
+            except BaseException as e:          # rapporteres i close()
+                self._error = e
+
+    def close(self) -> dict[str, float]:
+        self.queue.put(None)
+        self.join()
+        if self._error is not None:
+            raise self._error
+        return self.write_times
@@ -0,0 +1,285 @@
+"""
+Virtuell ESP32 på en Linux-pty – test av datainnsamlingen uten rigg.
+
+Simulatoren åpner et pseudoterminal-par og oppfører seg som firmwaren
+sett fra serieporten:
+
+*  handleSerialCommands: START / DROP / BIN / JSON (store/små bokstaver,
+   trim), kvittert med «CMD: … mottatt»
+*  run_test(): samme debuglinjer som raise_arm() og testløkka, deretter
+   «Data Collection Complete:» og nyttelasten – binær ramme (binframe)
+   eller én JSON-linje (serializeJson), valgt med BIN/JSON som i firmware
+*  testStart nullstilles når testen starter (som i run_test()), så en
+   START som kommer mens testen pågår gir en ny test etterpå
+
+Runs hentes enten fra en mappe med innspilte JSON-filer (i rekkefølge,
+om igjen fra start) eller genereres fortløpende med syntetisk.py.
+
+Tidsbruk per test følger firmware (SimTiming) og skaleres med `speed`;
+speed=0 gir null forsinkelse, så hundrevis av tester kjøres på sekunder:
+
+    python -m pendel.simulator --speed 0                 # syntetiske runs
+    python -m pendel.simulator --replay data/ring7 --link /tmp/esp32
+    pendel acquire data/test --port /tmp/esp32
+
+Fra Python (f.eks. i CI):
+
+    with Simulator(speed=0) as sim:
+        ser = serial.Serial(sim.port, 115200, timeout=1)
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .binframe import encode_json_run, to_json_bytes
+from .syntetisk import SynthConfig, generate_run
+
+
+# -----------------------------  PARAMETRE  -----------------------------
+class SimTiming(NamedTuple):
+    """Tidsbruk [s] i firmware ved speed=1."""
+    start_delay: float = 0.1     # delay(100) før raise_arm()
+    pulse: float = 0.5           # arm_cmd_sign HIGH
+    ext_wait: float = 1.5        # til ext-sensoren trigger
+    settle: float = 4.0          # vTaskDelay(4000)
+    ret_wait: float = 0.5        # til ret-sensoren trigger
+    arm_done: float = 1.0        # vTaskDelay(1000) etter «Arm hevet»
+    collect: float = 6.0         # data_collection_time
+    drop: float = 0.5            # relé HIGH ved DROP
+    baud: int | None = 115200    # bytetakt for nyttelasten (None: ingen)
+# -----------------------------------------------------------------------
+
+
+BOOT_LINES = ("SPI begin", "TFT begin", "TFT init", "TFT test draw")
+
+
+# =======================================================================
+#  KILDER FOR RUNS  ------------------------------------------------------
+# =======================================================================
+def replay_runs(directory: str | os.PathLike):
+    """Innspilte runs fra `directory` i testrekkefølge, om og om igjen."""
+    from .runstore import natural_key
+    files = sorted(Path(directory).glob("*.json"), key=lambda f: natural_key(f.name))
+    if not files:
+        raise FileNotFoundError(f"Ingen .json-filer i {directory}")
+    while True:
+        for f in files:
+            yield json.loads(f.read_text(encoding="utf-8"))
+
+
+def synthetic_runs(cfg: SynthConfig | None = None):
+    """Uendelig strøm av syntetiske runs (syntetisk.generate_run)."""
+    cfg = cfg or SynthConfig()
+    rng = np.random.default_rng(cfg.seed)
+    while True:
+        temp = cfg.temp + rng.normal(0, 0.05)
+        hum = cfg.hum + rng.normal(0, 0.3)
+        yield generate_run(cfg, rng, temp, hum)
+
+
+# =======================================================================
+#  SIMULATOR  ------------------------------------------------------------
+# =======================================================================
+class Simulator:
+    """
+    ESP32-simulator på en pty. `port` er slave-enheten (/dev/pts/N) som
+    åpnes med pyserial som en vanlig serieport.
+
+    Parameters
+    ----------
+    replay : str | None
+        Mappe med innspilte JSON-runs; None gir syntetiske runs.
+    synth : SynthConfig | None
+        Oppsett for syntetiske runs.
+    speed : float
+        Skalering av all ventetid (1 = som riggen, 0 = ingen ventetid).
+    binary : bool
+        Startverdi for binaryOutput (firmware: true).
+    link : str | None
+        Lag en symlink til pty-en (stabilt portnavn for CLI/konfig).
+    """
+
+    def __init__(self, replay: str | os.PathLike | None = None, *,
+                 synth: SynthConfig | None = None, timing: SimTiming = SimTiming(),
+                 speed: float = 1.0, binary: bool = True,
+                 link: str | os.PathLike | None = None):
+        self.runs = replay_runs(replay) if replay is not None else synthetic_runs(synth)
+        self.timing = timing
+        self.speed = speed
+        self.binary = binary
+        self.link = Path(link) if link is not None else None
+        self.tests_run = 0
+        self._test_start = threading.Event()
+        self._mag_drop = threading.Event()
+        self._halt = threading.Event()
+        self._write_lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self.port: str | None = None
+
+    # ------------------------------------------------------------------
+    def start(self) -> "Simulator":
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)              # ingen ekko / CRLF-oversettelse
+        self.port = os.ttyname(self._slave)
+        if self.link is not None:
+            self.link.unlink(missing_ok=True)
+            self.link.symlink_to(self.port)
+        for line in BOOT_LINES:
+            self._println(line)
+        for target, name in ((self._commands, "sim-commands"),
+                             (self._core1, "sim-core1")):
+            th = threading.Thread(target=target, name=name, daemon=True)
+            th.start()
+            self._threads.append(th)
+        return self
+
+    def stop(self) -> None:
+        self._halt.set()
+        for th in self._threads:
+            th.join(timeout=2)
+        if self.link is not None:
+            self.link.unlink(missing_ok=True)
+        os.close(self._slave)                # holdt åpen: ingen EIO/hangup
+        os.close(self._master)
+
+    def __enter__(self) -> "Simulator":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    def _sleep(self, seconds: float) -> None:
+        if self.speed > 0 and seconds > 0:
+            self._halt.wait(seconds * self.speed)
+
+    def _write(self, data: bytes, *, paced: bool = False) -> None:
+        """Skriv til pty; `paced` sender i takt med baudraten (10 bit/byte)."""
+        baud = self.timing.baud
+        chunk = len(data) or 1
+        if paced and baud and self.speed > 0:
+            chunk = max(1, baud // 1000)             # bytes per ca. 10 ms
+        with self._write_lock:
+            for i in range(0, len(data), chunk):
+                part = memoryview(data)[i:i + chunk]
+                n_bytes = len(part)
+                while part:
+                    part = part[os.write(self._master, part):]
+                if chunk < len(data):
+                    self._sleep(n_bytes * 10 / baud)
+
+    def _println(self, text: str) -> None:
+        self._write(text.encode() + b"\r\n")
+
+    # ---------------- handleSerialCommands (kjerne 0) -----------------
+    def _commands(self) -> None:
+        import select
+        buf = bytearray()
+        while not self._halt.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                buf += os.read(self._master, 1024)
+            except OSError:
+                continue
+            while b"\n" in buf:
+                line, _, rest = bytes(buf).partition(b"\n")
+                buf[:] = rest
+                self._handle(line.decode(errors="replace").strip())
+
+    def _handle(self, cmd: str) -> None:
+        cmd = cmd.upper()
+        if cmd == "START":
+            self._test_start.set()
+        elif cmd == "DROP":
+            self._mag_drop.set()
+        elif cmd == "BIN":
+            self.binary = True
+        elif cmd == "JSON":
+            self.binary = False
+        else:
+            return                           # ukjente kommandoer ignoreres
+        self._println(f"CMD: {cmd} mottatt")
+
+    # ---------------- loop_core_1 -------------------------------------
+    def _core1(self) -> None:
+        while not self._halt.is_set():
+            if self._test_start.wait(0.01):
+                self._run_test()
+            if self._mag_drop.is_set():
+                self._sleep(self.timing.drop)
+                self._mag_drop.clear()
+
+    def _run_test(self) -> None:
+        tm = self.timing
+        self._test_start.clear()             # testStart = false
+        self._sleep(tm.start_delay)
+        # raise_arm()
+        self._sleep(tm.pulse)
+        self._println("Hever arm......")
+        self._println("Venter på arm hevet sensor")
+        self._sleep(tm.ext_wait)
+        self._println("Ext-sensor trigget!")
+        self._sleep(tm.settle)
+        self._println("Venter på linear aktuator reset")
+        self._sleep(tm.ret_wait)
+        self._println("Ret-sensor trigget!")
+        self._println("Arm hevet")
+        self._sleep(tm.arm_done)
+        self._println("raise_arm() completed")
+
+        self._println("Starter test...")
+        self._println("Relay pin set to LOW")
+        self._println("Test while loop")
+        run = next(self.runs)
+        self._sleep(tm.collect)
+
+        self._println("Data Collection Complete:")
+        if self.binary:
+            try:
+                self._write(encode_json_run(run), paced=True)
+            except OverflowError:            # som firmware: JSON som reserve
+                self._write(to_json_bytes(run) + b"\r\n", paced=True)
+        else:
+            self._write(to_json_bytes(run) + b"\r\n", paced=True)
+        self.tests_run += 1
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Virtuell ESP32 på pty")
+    p.add_argument("--replay", default=None, help="mappe med innspilte JSON-runs")
+    p.add_argument("--speed", type=float, default=1.0,
+                   help="skalering av ventetid (0 = ingen ventetid)")
+    p.add_argument("--json", action="store_true", help="start i JSON-modus")
+    p.add_argument("--no-pacing", action="store_true", help="ingen baudrate-takt")
+    p.add_argument("--link", default=None, help="symlink til pty, f.eks. /tmp/esp32")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    timing = SimTiming(baud=None) if args.no_pacing else SimTiming()
+    sim = Simulator(args.replay, synth=SynthConfig(seed=args.seed), timing=timing,
+                    speed=args.speed, binary=not args.json, link=args.link)
+    sim.start()
+    print(f"Simulator klar på {args.link or sim.port} "
+          f"({'innspilt: ' + args.replay if args.replay else 'syntetisk'}, "
+          f"speed={args.speed}) – Ctrl-C avslutter")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n{sim.tests_run} tester kjørt.")
+    finally:
+        sim.stop()
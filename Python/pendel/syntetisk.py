@@ -0,0 +1,126 @@
+"""
+Syntetiske runs i nøyaktig samme format som ESP32-firmwaren.
+
+Hver run er ett JSON-objekt slik `run_test()` serialiserer det:
+
+    {"encoder": [...], "test_time_ms": [...], "temp": [t], "hum": [rh]}
+
+*  encoder      – vinkel i grader kvantisert til CPR (2048) pulser,
+                   dvs. n * 360/2048, som `readEncoderAngle()`
+*  test_time_ms – heltall millis() - startTime, steg `step_ms` pluss
+                   tilfeldig ekstra ms (loop-jitter)
+*  temp / hum   – én avlesning etter testen (BME280)
+
+Bevegelsen er en dempet svingning med skarpe vendepunkter (støt) som
+starter etter en tilfeldig forsinkelse; første bunnpunkt treffer
+|η| = `eta` (± `eta_sd` per run), så analysen har en kjent fasit.
+Filnavn som fra datainnsamlingen: «<dato>_ring<ID>_test_<n>.json».
+
+    python -m pendel.syntetisk data/syn_ring7 --runs 60
+    python -m pendel.syntetisk data/big --runs 6000 --samples 3000 --noise 0.5
+"""
+
+import os
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+# -----------------------------  PARAMETRE  -----------------------------
+CPR     = 2048               # encoder-pulser per omdreining (firmware)
+STEP_MS = 1                  # step_length i firmware
+# -----------------------------------------------------------------------
+
+
+@dataclass
+class SynthConfig:
+    runs: int = 60               # antall runs (filer)
+    samples: int = 6000          # samples per run (data_collection_time / step)
+    step_ms: int = STEP_MS
+    jitter: float = 0.3          # middel ekstra ms per sample (Poisson)
+    noise: float = 0.3           # støy i encoder-pulser (SD før kvantisering)
+    damping_ms: float = 2500.0   # tidskonstant τ for amplituden
+    period_ms: float = 700.0     # svingeperiode
+    delay_ms: float = 50.0       # maks tilfeldig forsinkelse før bevegelsen
+    eta: float = 54.0            # fasit for |første bunnpunkt| [°]
+    eta_sd: float = 0.15         # spredning i første bunnpunkt per run [°]
+    temp: float = 21.0           # °C (langsom drift + støy rundt denne)
+    hum: float = 40.0            # % RH
+    seed: int | None = 0
+
+
+def generate_run(cfg: SynthConfig, rng: np.random.Generator,
+                 temp: float, hum: float) -> dict:
+    """Én run som dict i firmware-format."""
+    # millis() - startTime: første sample tas rett etter start
+    dt = cfg.step_ms + rng.poisson(cfg.jitter, cfg.samples)
+    t = np.cumsum(dt) - dt[0]
+
+    # Støtet gir en skarp vending: trekantbølge (ikke sinus), så vinkelen
+    # endres med > 1 puls/ms helt inn i bunnpunktet – som på riggen
+    t0 = rng.uniform(0, cfg.delay_ms)
+    eta = cfg.eta + rng.normal(0, cfg.eta_sd)
+    tau, P = cfg.damping_ms, cfg.period_ms
+    amp = eta * np.exp((P / 4) / tau)        # bunn ved t0 + P/4 blir -eta
+    s = np.clip(t - t0, 0, None)
+    tri = (2 / np.pi) * np.arcsin(np.sin(2 * np.pi * s / P))
+    angle = -amp * np.exp(-s / tau) * tri
+
+    # støy bare mens armen beveger seg – i ro står telleren på 0
+    noise = np.where(s > 0, rng.normal(0, cfg.noise, t.size), 0.0)
+    counts = np.round(angle / 360 * CPR + noise)
+    enc = counts * (360 / CPR) + 0.0           # + 0.0: ingen «-0.0»
+    return {"encoder": enc.tolist(), "test_time_ms": t.tolist(),
+            "temp": [round(temp, 2)], "hum": [round(hum, 2)]}
+
+
+def generate_runs(cfg: SynthConfig):
+    """Generator over cfg.runs runs (dict i firmware-format)."""
+    rng = np.random.default_rng(cfg.seed)
+    drift = np.linspace(0, 0.5, cfg.runs)              # svak oppvarming
+    for i in range(cfg.runs):
+        temp = cfg.temp + drift[i] + rng.normal(0, 0.05)
+        hum  = cfg.hum - 2 * drift[i] + rng.normal(0, 0.3)
+        yield generate_run(cfg, rng, temp, hum)
+
+
+def write_ring(out_dir: str | os.PathLike, cfg: SynthConfig | None = None, *,
+               ring_id: str = "0", date_str: str = "20250101") -> list[Path]:
+    """
+    Skriv cfg.runs JSON-filer til `out_dir` (kompakt som serializeJson).
+
+    Returns
+    -------
+    list[Path] i testrekkefølge
+    """
+    cfg = cfg or SynthConfig()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, run in enumerate(generate_runs(cfg), start=1):
+        p = out_dir / f"{date_str}_ring{ring_id}_test_{i}.json"
+        p.write_text(json.dumps(run, separators=(",", ":")), encoding="utf-8")
+        paths.append(p)
+    return paths
+
+
+# =======================================================================
+#  HOVEDPROGRAM  ---------------------------------------------------------
+# =======================================================================
+if __name__ == "__main__":
+    import argparse
+    from dataclasses import fields
+
+    p = argparse.ArgumentParser(description="Syntetiske runs i firmware-format")
+    p.add_argument("out_dir")
+    p.add_argument("--ring", default="0", help="ringID i filnavnet")
+    for f in fields(SynthConfig):
+        kind = int if f.name in ("runs", "samples", "step_ms", "seed") else float
+        p.add_argument(f"--{f.name.replace('_', '-')}", type=kind, default=f.default)
+    args = p.parse_args()
+
+    cfg = SynthConfig(**{f.name: getattr(args, f.name) for f in fields(SynthConfig)})
+    paths = write_ring(args.out_dir, cfg, ring_id=args.ring)
+    size = sum(p.stat().st_size for p in paths)
+    print(f"Skrev {len(paths)} runs ({size / 2**20:.1f} MiB) til {args.out_dir}")
@@ -0,0 +1,32 @@
+"""
+Felles oppsett for testene: mellomlageret legges i en midlertidig mappe
+(før pendel importeres), og syntetiske ringer skrives én gang per økt.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+os.environ["PENDEL_CACHE"] = str(Path(tempfile.mkdtemp()) / "runcache.sqlite")
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import pytest
+
+from pendel.syntetisk import SynthConfig, write_ring
+
+
+@pytest.fixture(scope="session")
+def ring_dir(tmp_path_factory) -> Path:
+    """60 runs med loop-jitter (hver run har sitt eget tidsmønster)."""
+    out = tmp_path_factory.mktemp("ring7")
+    write_ring(out, SynthConfig(runs=60, samples=2000, seed=1), ring_id="7")
+    return out
+
+
+@pytest.fixture(scope="session")
+def even_ring_dir(tmp_path_factory) -> Path:
+    """30 runs uten jitter (delte tidsmønstre, gruppert resampling)."""
+    out = tmp_path_factory.mktemp("ring8")
+    write_ring(out, SynthConfig(runs=30, samples=2000, jitter=0.0, seed=2),
+               ring_id="8")
+    return out
@@ -0,0 +1,100 @@
+"""
+Fasejustering + resampling (alignment.align_and_resample) skal gi
+bit-identisk resultat med den opprinnelige løkken i process_dataset.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from pendel import analyser_ring
+from pendel import main_store_JSON_testserie as acq
+from pendel.alignment import align_and_resample
+from pendel.runstore import import_json_dir, natural_key
+
+
+def baseline_process_dataset(directory):
+    """process_dataset slik den var før alignment (referanse)."""
+    file_list = sorted(
+        (f for f in os.listdir(directory) if f.lower().endswith(".json")),
+        key=natural_key
+    )
+    enc_list, t_list = [], []
+    temps, hums = [], []
+    for fn in file_list:
+        with open(os.path.join(directory, fn), encoding="utf-8") as f:
+            data = json.load(f)
+        enc = np.asarray(data["encoder"], float)
+        if enc.ndim == 0:
+            enc = enc.reshape(1)
+        enc_list.append(enc)
+        t = np.asarray(data.get("test_time_ms") or range(enc.size), float)
+        if t.size != enc.size:
+            t = np.resize(t, enc.size)
+        t_list.append(t)
+        temp = data.get("temp")
+        hum  = data.get("hum")
+        if isinstance(temp, list):
+            temp = temp[0] if temp else np.nan
+        if isinstance(hum, list):
+            hum = hum[0] if hum else np.nan
+        temps.append(float(temp) if temp is not None else np.nan)
+        hums.append(float(hum)  if hum  is not None else np.nan)
+
+    minima = [np.where((np.diff(e)[:-1] < 0) & (np.diff(e)[1:] >= 0))[0]
+              for e in enc_list]
+    minima_idx = [(m[0] + 1) if m.size else 0 for m in minima]
+    ref_t0 = t_list[0][minima_idx[0]]
+    shifted_t = [t + (ref_t0 - t[i]) for t, i in zip(t_list, minima_idx)]
+
+    dt    = np.mean(np.diff(shifted_t[0]))
+    t_new = np.arange(min(shifted_t[0]), max(shifted_t[0]), dt)
+    encoder = np.array([np.interp(t_new, st, e)
+                        for st, e in zip(shifted_t, enc_list)])
+    return (t_new, encoder, np.array(temps), np.array(hums), file_list,
+            enc_list, t_list)
+
+
+def _same(a, b) -> bool:
+    return a.dtype == b.dtype and np.array_equal(a, b, equal_nan=True)
+
+
+@pytest.fixture(params=["ring_dir", "even_ring_dir"])
+def ring(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_align_and_resample_bit_identical(ring):
+    t_ref, enc_ref, *_, enc_list, t_list = baseline_process_dataset(ring)
+    t_new, encoder = align_and_resample(enc_list, t_list)
+    assert _same(t_new, t_ref)
+    assert _same(encoder, enc_ref)
+
+
+@pytest.mark.parametrize("cache", [False, True, True], ids=["ingen", "kald", "varm"])
+def test_analyser_process_dataset_bit_identical(ring, cache, monkeypatch):
+    monkeypatch.setattr(analyser_ring, "enable_cache", cache)
+    ref = baseline_process_dataset(ring)
+    t_new, encoder, temps, hums, files = analyser_ring.process_dataset(ring)
+    assert _same(t_new, ref[0]) and _same(encoder, ref[1])
+    assert _same(temps, ref[2]) and _same(hums, ref[3])
+    assert list(files) == ref[4]
+
+
+def test_acquisition_process_dataset_bit_identical(ring):
+    ref = baseline_process_dataset(ring)
+    t_new, all_enc, temps, hums = acq.process_dataset(ring)
+    assert _same(t_new, ref[0]) and _same(all_enc, ref[1])
+    assert _same(temps, ref[2]) and _same(hums, ref[3])
+
+
+def test_runstore_bit_identical(ring, tmp_path):
+    ref = baseline_process_dataset(ring)
+    shutil.copytree(ring, tmp_path / "ring", dirs_exist_ok=True)
+    import_json_dir(tmp_path / "ring")
+    t_new, encoder, temps, hums, files = analyser_ring.process_dataset(tmp_path / "ring")
+    assert _same(t_new, ref[0]) and _same(encoder, ref[1])
+    assert _same(temps, ref[2]) and _same(hums, ref[3])
@@ -0,0 +1,77 @@
+"""
+block_stats (alle blokker samtidig) mot de opprinnelige per-blokk-
+løkkene: identiske inkluderingsmasker, middel likt opp til avrunding.
+"""
+
+import numpy as np
+import pytest
+
+from pendel.block_stats import block_stats
+from pendel.runcache import load_troughs
+
+
+def baseline_interval_stats(block_vals, tol):
+    """interval_stats fra analyser_ring (typetall på 0.1°)."""
+    clean = block_vals[~np.isnan(block_vals)]
+    if clean.size == 0:
+        return np.nan, np.ones_like(block_vals, dtype=bool)
+    uniq, cnt = np.unique(np.round(clean, 1), return_counts=True)
+    order = np.lexsort((uniq, -cnt))
+    center = (uniq[order[0]] + (uniq[order[1]] if len(order) > 1 else uniq[order[0]])) / 2
+    keep_mask = np.abs(block_vals - center) <= tol
+    mean_val  = float(block_vals[keep_mask].mean()) if keep_mask.any() else np.nan
+    return mean_val, ~keep_mask
+
+
+def baseline_interval_stats_exact(block, tol):
+    """interval_stats fra main_store_JSON_testserie (eksakte typetall)."""
+    unique_vals, counts = np.unique(block, return_counts=True)
+    order = np.lexsort((unique_vals, -counts))
+    mode1 = unique_vals[order[0]]
+    mode2 = unique_vals[order[1]] if len(order) > 1 else mode1
+    center = (mode1 + mode2) / 2.0
+    mask   = np.abs(block - center) <= tol
+    mean_val = float(block[mask].mean()) if mask.any() else np.nan
+    return mean_val, ~mask
+
+
+def _check(values, block_size, tol, baseline, **kw):
+    blk = block_stats(values, block_size, tol, **kw)
+    for b, s in enumerate(range(0, values.size, block_size)):
+        mean, excl = baseline(values[s:s + block_size], tol)
+        np.testing.assert_array_equal(blk.excl_mask(b), excl)
+        np.testing.assert_allclose(blk.mean[b], mean, rtol=0, atol=1e-12)
+    assert blk.n_blocks == -(-values.size // block_size)
+
+
+def _quantized(seed: int, n: int, nan_share: float = 0.0) -> np.ndarray:
+    """Bunnverdier på encoder-rutenettet (360/2048°), mange like verdier."""
+    rng = np.random.default_rng(seed)
+    vals = np.round(rng.normal(54.0, 0.4, n) / (360 / 2048)) * (360 / 2048)
+    vals[rng.random(n) < nan_share] = np.nan
+    return vals
+
+
+@pytest.mark.parametrize("block_size", [15, 10, 7])
+@pytest.mark.parametrize("tol", [0.25, 0.3])
+def test_matches_interval_stats(block_size, tol):
+    _check(_quantized(block_size, 300 + 4), block_size, tol, baseline_interval_stats)
+
+
+def test_matches_interval_stats_with_nan():
+    vals = _quantized(3, 95, nan_share=0.1)
+    vals[15:30] = np.nan                              # en blokk uten verdier
+    _check(vals, 15, 0.25, baseline_interval_stats)
+
+
+@pytest.mark.parametrize("block_size", [15, 6])
+def test_matches_exact_interval_stats(block_size):
+    _check(_quantized(5, 121), block_size, 0.3, baseline_interval_stats_exact,
+           resolution=None)
+
+
+def test_matches_interval_stats_on_troughs(ring_dir, even_ring_dir):
+    for d in (ring_dir, even_ring_dir):
+        troughs = load_troughs(d, cache=False)[0]
+        _check(troughs, 15, 0.25, baseline_interval_stats)
+        _check(troughs, 15, 0.3, baseline_interval_stats_exact, resolution=None)
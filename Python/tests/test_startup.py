@@ -0,0 +1,52 @@
+"""
+`pendel --help` og hjelpeteksten til hver underkommando skal ikke laste
+tunge moduler (lat import i pendel.cli, se bench.STARTUP_FORBIDDEN).
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pendel.bench import STARTUP_FORBIDDEN
+from pendel.cli import COMMAND_MODULES
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# kjører `python -m pendel <argv>` og skriver ut toppnivåmodulene som ble lastet
+_SNIPPET = """
+import json, runpy, sys
+sys.argv = ["pendel", *json.loads(sys.argv[1])]
+try:
+    runpy.run_module("pendel", run_name="__main__", alter_sys=True)
+except SystemExit:
+    pass
+print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))
+"""
+
+
+def _loaded(argv: list[str]) -> set[str]:
+    out = subprocess.run([sys.executable, "-c", _SNIPPET, json.dumps(argv)],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(json.loads(out.stdout.strip().splitlines()[-1]))
+
+
+@pytest.mark.parametrize("argv", [["--help"], *([cmd, "--help"] for cmd in COMMAND_MODULES)],
+                         ids=lambda argv: " ".join(argv))
+def test_help_is_lightweight(argv):
+    loaded = _loaded(argv)
+    assert not loaded & set(STARTUP_FORBIDDEN["--help"])
+
+
+@pytest.mark.parametrize("cmd", sorted(COMMAND_MODULES))
+def test_command_modules_skip_forbidden(cmd):
+    snippet = ("import importlib, json, sys\n"
+               f"for m in {COMMAND_MODULES[cmd]!r}:\n"
+               "    importlib.import_module(m)\n"
+               "print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))")
+    out = subprocess.run([sys.executable, "-c", snippet], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    loaded = set(json.loads(out.stdout.strip().splitlines()[-1]))
+    assert not loaded & set(STARTUP_FORBIDDEN[cmd])